@@ -0,0 +1,286 @@
+import argparse
+import hashlib
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+
+from transcript_store import atomic_write
+
+logger = logging.getLogger("artifact-store")
+logger.setLevel(logging.INFO)
+
+ARTIFACT_DIR = os.environ.get("INTERVIEW_ARTIFACT_DIR", os.path.join("example", "artifacts"))
+RETENTION_DAYS = float(os.environ.get("ARTIFACT_RETENTION_DAYS", "30"))
+MAX_JOBS = int(os.environ.get("ARTIFACT_MAX_JOBS", "1000"))
+PRUNE_INTERVAL = 3600.0  # each process prunes at most this often
+
+# File name per artifact kind
+ARTIFACT_FILES = {
+    "assessment": "assessment.md",
+    "transcript": "transcript.json",
+}
+
+_UNSAFE_CHARS_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def _safe_name(value: str) -> str:
+    safe = _UNSAFE_CHARS_RE.sub("_", value)
+    if safe != value or not safe:
+        # Keep distinct ids distinct after sanitizing
+        safe = f"{safe}-{hashlib.sha1(value.encode()).hexdigest()[:8]}"
+    return safe
+
+
+class ArtifactStore:
+    """Per-job output files (assessment, transcript) with an index for the latest ones.
+
+    Layout under `root`:
+        jobs/<job_id>/<artifact file>   written atomically, never shared between jobs
+        index.sqlite3                   jobs (room, candidate, documents) and the latest
+                                        job per room/candidate/documents and artifact kind
+
+    `documents` is the session key of the uploaded resume and JD
+    (document_store.documents_key). latest() is a primary-key lookup for one of
+    these keys, however many sessions are stored; there is deliberately no
+    "latest of any session". Jobs older than `retention_days`, or beyond the
+    newest `max_jobs`, are pruned.
+    """
+
+    def __init__(
+        self,
+        root: str = ARTIFACT_DIR,
+        *,
+        retention_days: float = RETENTION_DAYS,
+        max_jobs: int = MAX_JOBS,
+    ):
+        self.root = root
+        self.jobs_dir = os.path.join(root, "jobs")
+        self.index_path = os.path.join(root, "index.sqlite3")
+        self.retention_days = retention_days
+        self.max_jobs = max_jobs
+        self._ready = False
+        self._last_prune = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            os.makedirs(self.root, exist_ok=True)
+        conn = sqlite3.connect(self.index_path, timeout=10.0)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY,"
+                " room TEXT,"
+                " candidate TEXT,"
+                " documents TEXT,"
+                " created_at REAL NOT NULL)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "documents" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN documents TEXT")
+                conn.execute("DELETE FROM latest WHERE scope = 'all'")  # no longer looked up
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                " job_id TEXT NOT NULL,"
+                " kind TEXT NOT NULL,"
+                " path TEXT NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (job_id, kind))"
+            )
+            # scope is "room", "candidate" or "documents"
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS latest ("
+                " scope TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " kind TEXT NOT NULL,"
+                " job_id TEXT NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (scope, value, kind))"
+            )
+            conn.commit()
+            self._ready = True
+        return conn
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, _safe_name(job_id))
+
+    def path(self, job_id: str, kind: str) -> str:
+        return os.path.join(self.job_dir(job_id), ARTIFACT_FILES[kind])
+
+    def register_job(
+        self,
+        job_id: str,
+        *,
+        room: str | None = None,
+        candidate: str | None = None,
+        documents: str | None = None,
+    ):
+        """Records (or updates) who a job belongs to; artifacts written later are indexed under it."""
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (job_id, room, candidate, documents, created_at) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (job_id) DO UPDATE SET"
+                " room = COALESCE(excluded.room, jobs.room),"
+                " candidate = COALESCE(excluded.candidate, jobs.candidate),"
+                " documents = COALESCE(excluded.documents, jobs.documents)",
+                (job_id, room, candidate, documents, time.time()),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self.maybe_prune()
+
+    def put(self, job_id: str, kind: str, data: str) -> str:
+        """Writes one artifact of a job atomically and makes it the latest for its room/candidate."""
+        path = self.path(job_id, kind)
+        atomic_write(path, data)
+
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT room, candidate, documents FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                conn.execute("INSERT INTO jobs (job_id, created_at) VALUES (?, ?)", (job_id, now))
+                row = (None, None, None)
+            conn.execute(
+                "INSERT OR REPLACE INTO artifacts (job_id, kind, path, updated_at) VALUES (?, ?, ?, ?)",
+                (job_id, kind, path, now),
+            )
+            scopes = [(scope, value) for scope, value in zip(("room", "candidate", "documents"), row) if value]
+            conn.executemany(
+                "INSERT OR REPLACE INTO latest (scope, value, kind, job_id, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(scope, value, kind, job_id, now) for scope, value in scopes],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        logger.info(f"Stored {kind} for {job_id} at {path}")
+        return path
+
+    def get(self, job_id: str, kind: str) -> str | None:
+        try:
+            with open(self.path(job_id, kind), "r") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def latest(
+        self,
+        kind: str,
+        *,
+        room: str | None = None,
+        candidate: str | None = None,
+        documents: str | None = None,
+    ) -> str | None:
+        """job_id of the newest `kind` artifact for a room, candidate or documents key."""
+        if room:
+            scope, value = "room", room
+        elif candidate:
+            scope, value = "candidate", candidate
+        elif documents:
+            scope, value = "documents", documents
+        else:
+            raise ValueError("latest() needs a room, candidate or documents key")
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT job_id FROM latest WHERE scope = ? AND value = ? AND kind = ?", (scope, value, kind)
+            ).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def recent_jobs(self, limit: int = 20) -> list[dict]:
+        """Newest jobs first, with the artifact kinds each one has."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT j.job_id, j.room, j.candidate, j.documents, j.created_at, GROUP_CONCAT(a.kind)"
+                " FROM jobs j LEFT JOIN artifacts a ON a.job_id = j.job_id"
+                " GROUP BY j.job_id ORDER BY j.created_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [
+            {
+                "job_id": job_id,
+                "room": room,
+                "candidate": candidate,
+                "documents": documents,
+                "created_at": created_at,
+                "artifacts": sorted(kinds.split(",")) if kinds else [],
+            }
+            for job_id, room, candidate, documents, created_at, kinds in rows
+        ]
+
+    def maybe_prune(self):
+        with self._lock:
+            if time.time() - self._last_prune < PRUNE_INTERVAL:
+                return
+            self._last_prune = time.time()
+        try:
+            self.prune()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Artifact retention pass failed: {e}")
+
+    def prune(self) -> int:
+        """Deletes jobs past the retention age or beyond the newest max_jobs. Returns how many."""
+        cutoff = time.time() - self.retention_days * 86400
+        conn = self._connect()
+        try:
+            expired = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT job_id FROM jobs WHERE created_at < ? OR job_id IN ("
+                    " SELECT job_id FROM jobs ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (cutoff, self.max_jobs),
+                ).fetchall()
+            ]
+            for job_id in expired:
+                conn.execute("DELETE FROM artifacts WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM latest WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+            conn.commit()
+        finally:
+            conn.close()
+
+        for job_id in expired:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        if expired:
+            logger.info(f"Pruned {len(expired)} expired job(s) from the artifact store")
+        return len(expired)
+
+
+_default_store: ArtifactStore | None = None
+
+
+def get_default_store() -> ArtifactStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = ArtifactStore()
+    return _default_store
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Inspect or prune the interview artifact store.")
+    parser.add_argument("--root", default=ARTIFACT_DIR)
+    parser.add_argument("command", choices=["list", "prune"])
+    args = parser.parse_args()
+
+    store = ArtifactStore(args.root)
+    if args.command == "list":
+        for job in store.recent_jobs(limit=50):
+            print(job)
+    else:
+        print(f"pruned {store.prune()} job(s)")
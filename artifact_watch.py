@@ -0,0 +1,74 @@
+import logging
+import os
+import threading
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+from artifact_store import ARTIFACT_FILES, ArtifactStore
+
+logger = logging.getLogger("artifact-watch")
+logger.setLevel(logging.INFO)
+
+_KINDS_BY_FILE = {name: kind for kind, name in ARTIFACT_FILES.items()}
+
+
+class _Handler(FileSystemEventHandler):
+    def __init__(self, watcher: "ArtifactWatcher"):
+        self._watcher = watcher
+
+    def on_any_event(self, event: FileSystemEvent):
+        if event.is_directory or event.event_type not in ("created", "modified", "moved"):
+            return
+        # artifacts are written to a temp file and renamed into place
+        path = getattr(event, "dest_path", "") or event.src_path
+        kind = _KINDS_BY_FILE.get(os.path.basename(path))
+        if kind is not None:
+            self._watcher._notify(kind)
+
+
+class ArtifactWatcher:
+    """Readiness signal for the UI: a counter per artifact kind, bumped when one is written.
+
+    Watches the store's job directories with watchdog, so callers compare versions
+    instead of re-reading files. If the observer can't start (e.g. no inotify
+    watches left), `running` is False and callers should look up the index instead.
+    """
+
+    def __init__(self, store: ArtifactStore):
+        self.store = store
+        self._versions = {kind: 0 for kind in ARTIFACT_FILES}
+        self._lock = threading.Lock()
+        self._observer = None
+
+    @property
+    def running(self) -> bool:
+        return self._observer is not None and self._observer.is_alive()
+
+    def start(self) -> bool:
+        os.makedirs(self.store.jobs_dir, exist_ok=True)
+        observer = Observer()
+        observer.daemon = True
+        try:
+            observer.schedule(_Handler(self), self.store.jobs_dir, recursive=True)
+            observer.start()
+        except OSError as e:
+            logger.warning(f"Could not watch {self.store.jobs_dir}, falling back to index lookups: {e}")
+            return False
+        self._observer = observer
+        logger.info(f"Watching {self.store.jobs_dir} for new artifacts")
+        return True
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=2.0)
+            self._observer = None
+
+    def version(self, kind: str) -> int:
+        with self._lock:
+            return self._versions[kind]
+
+    def _notify(self, kind: str):
+        with self._lock:
+            self._versions[kind] += 1
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import time
+
+from livekit.agents import llm
+
+from completion import CHARS_PER_TOKEN, complete
+
+logger = logging.getLogger("assessment")
+logger.setLevel(logging.INFO)
+
+SEGMENT_TOKENS = 1500  # transcript tokens per evidence-extraction call
+MAX_CONCURRENT_SEGMENTS = 4
+JD_CHARS = 1500
+EVIDENCE_MAX_TOKENS = 600
+SEGMENT_DEADLINE = 60.0
+REPORT_DEADLINE = 120.0
+
+TRANSCRIPT_ROLES = ("user", "assistant")
+SPEAKERS = {"user": "Candidate", "assistant": "Interviewer"}
+
+EVIDENCE_PROMPT = """
+You are helping a hiring manager review part of a job interview.
+
+JOB DESCRIPTION:
+{jd}
+
+INTERVIEW EXCERPT ({index} of {count}):
+{excerpt}
+
+TASK:
+List the evidence in this excerpt that matters for the hiring decision, as short bullet points:
+- claims about experience, skills and projects, with a short quote where possible,
+- how well each answer addressed the question,
+- strengths and concerns relative to the job requirements.
+Only use what is in the excerpt. If there is nothing relevant, return "No evidence."
+"""
+
+REPORT_PROMPT = """
+You are a hiring manager making a decision.
+
+JOB DESCRIPTION:
+{jd}
+
+{material_title}:
+{material}
+
+TASK:
+Evaluate the candidate. Produce a markdown report named 'Assessment'.
+
+Format:
+# Interview Assessment
+
+**Decision**: [Proceed / Hold / Reject]
+
+**Reasoning**:
+[Detailed explanation citing specific evidence from the transcript and matching it to JD requirements]
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def transcript_lines(transcript: list[dict] | str) -> list[str]:
+    """Candidate/interviewer lines only; system instructions and tool calls are dropped.
+
+    Accepts the structured transcript (get_transcript_json) or the legacy
+    "role: content" string.
+    """
+    if isinstance(transcript, str):
+        entries = []
+        for line in transcript.replace("\\n", "\n").splitlines():
+            role, sep, content = line.partition(": ")
+            entries.append({"role": role, "content": content} if sep else {"role": "", "content": line})
+    else:
+        entries = transcript
+
+    lines = []
+    for entry in entries:
+        content = entry.get("content")
+        if entry.get("role") not in TRANSCRIPT_ROLES or not isinstance(content, str) or not content.strip():
+            continue
+        lines.append(f"{SPEAKERS[entry['role']]}: {content.strip()}")
+    return lines
+
+
+def split_segments(lines: list[str], max_tokens: int = SEGMENT_TOKENS) -> list[str]:
+    """Groups lines into segments of about max_tokens, starting a new one at an interviewer line when possible."""
+    segments: list[list[str]] = [[]]
+    size = 0
+    for line in lines:
+        tokens = estimate_tokens(line)
+        current = segments[-1]
+        if current and size + tokens > max_tokens:
+            # move the trailing interviewer question along, so it stays with its answer
+            carry = [current.pop()] if len(current) > 1 and current[-1].startswith(SPEAKERS["assistant"]) else []
+            segments.append(carry)
+            size = sum(estimate_tokens(l) for l in carry)
+        segments[-1].append(line)
+        size += tokens
+    return ["\n".join(segment) for segment in segments if segment]
+
+
+class AssessmentPipeline:
+    """Map-reduce assessment: evidence is extracted from transcript segments
+    concurrently, then reduced into the Proceed/Hold/Reject report.
+
+    A transcript that fits in one segment skips the map step and goes straight
+    into the report prompt. Token counts are estimated from characters.
+    """
+
+    def __init__(
+        self,
+        llm_client: llm.LLM,
+        *,
+        segment_tokens: int = SEGMENT_TOKENS,
+        max_concurrency: int = MAX_CONCURRENT_SEGMENTS,
+    ):
+        self._llm = llm_client
+        self.segment_tokens = segment_tokens
+        self.max_concurrency = max_concurrency
+        self.stats: dict = {}
+
+    async def run(self, jd_text: str, transcript: list[dict] | str) -> str:
+        started = time.perf_counter()
+        jd = jd_text[:JD_CHARS]
+        lines = transcript_lines(transcript)
+        segments = split_segments(lines, self.segment_tokens)
+        stats = self.stats = {
+            "transcript_lines": len(lines),
+            "transcript_tokens": sum(estimate_tokens(l) for l in lines),
+            "segments": len(segments),
+            "segment_seconds": [],
+            "map_prompt_tokens": 0,
+            "map_output_tokens": 0,
+            "failed_segments": 0,
+        }
+
+        if len(segments) > 1:
+            map_started = time.perf_counter()
+            evidence = await self._extract_evidence(jd, segments)
+            stats["map_seconds"] = time.perf_counter() - map_started
+            material_title = "EVIDENCE FROM THE INTERVIEW (in order)"
+            material = "\n\n".join(f"Part {i + 1}:\n{notes}" for i, notes in enumerate(evidence))
+        else:
+            material_title = "INTERVIEW TRANSCRIPT"
+            material = segments[0] if segments else "(empty transcript)"
+
+        prompt = REPORT_PROMPT.format(jd=jd, material_title=material_title, material=material)
+        reduce_started = time.perf_counter()
+        # no token cap: a cut-off report is worse than a slow one, REPORT_DEADLINE bounds it
+        result = await complete(self._llm, prompt, label="assessment_report", deadline=REPORT_DEADLINE)
+        report = result.text
+        if not result.finished:
+            # raised so the assessment queue retries the job instead of storing half a report
+            logger.warning(f"Assessment report cut off ({result.stop_reason}) after {estimate_tokens(report)} tokens")
+            raise RuntimeError(f"assessment report cut off ({result.stop_reason})")
+        stats["reduce_seconds"] = time.perf_counter() - reduce_started
+        stats["reduce_ttft"] = result.ttft
+        stats["reduce_prompt_tokens"] = estimate_tokens(prompt)
+        stats["report_tokens"] = estimate_tokens(report)
+        stats["total_seconds"] = time.perf_counter() - started
+
+        logger.info(
+            f"Assessment generated in {stats['total_seconds']:.2f}s: {stats['transcript_tokens']} transcript tokens "
+            f"in {len(segments)} segment(s), map {stats.get('map_seconds', 0.0):.2f}s "
+            f"({stats['map_prompt_tokens']} -> {stats['map_output_tokens']} tokens), "
+            f"reduce {stats['reduce_seconds']:.2f}s ({stats['reduce_prompt_tokens']} -> {stats['report_tokens']} tokens)"
+        )
+        return report
+
+    async def _extract_evidence(self, jd: str, segments: list[str]) -> list[str]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        stats = self.stats
+        stats["segment_seconds"] = [0.0] * len(segments)
+
+        async def _extract(index: int, segment: str) -> str:
+            prompt = EVIDENCE_PROMPT.format(jd=jd, index=index + 1, count=len(segments), excerpt=segment)
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    result = await complete(
+                        self._llm,
+                        prompt,
+                        label="assessment_evidence",
+                        max_tokens=EVIDENCE_MAX_TOKENS,
+                        deadline=SEGMENT_DEADLINE,
+                    )
+                except Exception as e:
+                    logger.warning(f"Evidence extraction failed for segment {index + 1}/{len(segments)}: {e}")
+                    stats["failed_segments"] += 1
+                    return f"(This part could not be analyzed, excerpt follows.)\n{segment}"
+                finally:
+                    stats["segment_seconds"][index] = time.perf_counter() - started
+            notes = result.text
+            stats["map_prompt_tokens"] += estimate_tokens(prompt)
+            stats["map_output_tokens"] += estimate_tokens(notes)
+            return notes.strip() or "No evidence."
+
+        return await asyncio.gather(*(_extract(i, s) for i, s in enumerate(segments)))
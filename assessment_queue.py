@@ -0,0 +1,323 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import sys
+import time
+
+from artifact_store import ArtifactStore, get_default_store
+from assessment import AssessmentPipeline
+
+logger = logging.getLogger("assessment-queue")
+logger.setLevel(logging.INFO)
+
+ASSESSMENT_DIR = os.path.join("example", "assessments")
+QUEUE_PATH = os.environ.get("ASSESSMENT_QUEUE_PATH", os.path.join(ASSESSMENT_DIR, "queue.sqlite3"))
+
+DEFAULT_CONCURRENCY = 2
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 5.0  # seconds before the first retry, doubled after each failure
+BACKOFF_MAX = 300.0
+LEASE = 120.0  # a running job whose consumer stops renewing this is picked up again
+POLL_INTERVAL = 2.0
+WORKER_BACKOFF_MAX = 60.0  # a worker whose queue calls keep failing waits at most this long between tries
+
+
+class AssessmentQueue:
+    """Durable assessment work queue in SQLite, keyed by job_id.
+
+    Agent jobs enqueue() and return; consumers (possibly in other processes)
+    claim() jobs under a lease, so a job whose consumer crashed is retried once
+    the lease runs out. Enqueueing the same job_id twice is a no-op.
+    """
+
+    def __init__(self, path: str = QUEUE_PATH):
+        self.path = path
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " status TEXT NOT NULL,"  # pending | running | done | failed
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " next_attempt_at REAL NOT NULL,"
+                " lease_until REAL,"
+                " consumer TEXT,"
+                " last_error TEXT,"
+                " report_path TEXT,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_attempt_at)")
+            self._ready = True
+        return conn
+
+    def enqueue(self, job_id: str, payload: dict) -> bool:
+        """Adds a job; returns False if this job_id was already queued (or done)."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            added = conn.execute(
+                "INSERT INTO jobs (job_id, payload, status, next_attempt_at, created_at, updated_at)"
+                " VALUES (?, ?, 'pending', ?, ?, ?) ON CONFLICT (job_id) DO NOTHING",
+                (job_id, json.dumps(payload), now, now, now),
+            ).rowcount
+        finally:
+            conn.close()
+        if added:
+            logger.info(f"Queued assessment for {job_id}")
+        else:
+            logger.info(f"Assessment for {job_id} is already queued, ignoring.")
+        return bool(added)
+
+    def claim(
+        self, consumer: str, lease: float = LEASE, max_attempts: int = MAX_ATTEMPTS
+    ) -> tuple[str, dict, int] | None:
+        """Takes the oldest due job (or one whose lease expired). Returns (job_id, payload, attempt).
+
+        Only the consumer holding the lease can complete or fail the job afterwards.
+        Every claim counts as an attempt, so a job whose lease expired after its
+        last attempt (e.g. it keeps crashing the consumer) is failed, not re-run.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            gave_up = conn.execute(
+                "UPDATE jobs SET status = 'failed', lease_until = NULL,"
+                " last_error = 'lease expired on the last attempt', updated_at = ?"
+                " WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, now, max_attempts),
+            ).rowcount
+            row = conn.execute(
+                "SELECT job_id, payload, attempts FROM jobs"
+                " WHERE (status = 'pending' AND next_attempt_at <= ?)"
+                " OR (status = 'running' AND lease_until < ?)"
+                " ORDER BY next_attempt_at LIMIT 1",
+                (now, now),
+            ).fetchone()
+            if row is not None:
+                job_id, payload, attempts = row
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = ?, lease_until = ?, consumer = ?, updated_at = ?"
+                    " WHERE job_id = ?",
+                    (attempts + 1, now + lease, consumer, now, job_id),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        if gave_up:
+            logger.error(f"Gave up on {gave_up} assessment(s) whose lease expired after {max_attempts} attempts")
+        if row is None:
+            return None
+        return job_id, json.loads(payload), attempts + 1
+
+    def renew(self, job_id: str, consumer: str, lease: float = LEASE) -> bool:
+        now = time.time()
+        conn = self._connect()
+        try:
+            return bool(conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? WHERE job_id = ? AND consumer = ? AND status = 'running'",
+                (now + lease, now, job_id, consumer),
+            ).rowcount)
+        finally:
+            conn.close()
+
+    def complete(self, job_id: str, consumer: str, report_path: str) -> bool:
+        """Marks the job done; False if `consumer` no longer holds its lease."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            return bool(conn.execute(
+                "UPDATE jobs SET status = 'done', lease_until = NULL, last_error = NULL, report_path = ?, updated_at = ?"
+                " WHERE job_id = ? AND consumer = ? AND status = 'running'",
+                (report_path, now, job_id, consumer),
+            ).rowcount)
+        finally:
+            conn.close()
+
+    def fail(self, job_id: str, consumer: str, attempt: int, error: str, max_attempts: int = MAX_ATTEMPTS) -> float | None:
+        """Schedules a retry with exponential backoff; returns the delay, or None once the job gave up."""
+        now = time.time()
+        delay = None
+        if attempt < max_attempts:
+            delay = min(BACKOFF_BASE * 2 ** (attempt - 1), BACKOFF_MAX)
+        conn = self._connect()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ?, next_attempt_at = ?, lease_until = NULL, last_error = ?, updated_at = ?"
+                " WHERE job_id = ? AND consumer = ? AND status = 'running'",
+                ("pending" if delay is not None else "failed", now + (delay or 0.0), error, now, job_id, consumer),
+            )
+        finally:
+            conn.close()
+        return delay
+
+    def retry(self, job_id: str) -> bool:
+        """Puts a failed job back in the queue."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            return bool(conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0, next_attempt_at = ?, updated_at = ?"
+                " WHERE job_id = ? AND status = 'failed'",
+                (now, now, job_id),
+            ).rowcount)
+        finally:
+            conn.close()
+
+    def status(self) -> dict:
+        conn = self._connect()
+        try:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            failed = conn.execute(
+                "SELECT job_id, attempts, last_error FROM jobs WHERE status = 'failed' ORDER BY updated_at DESC LIMIT 10"
+            ).fetchall()
+        finally:
+            conn.close()
+        return {"counts": counts, "recent_failures": [list(row) for row in failed]}
+
+
+class AssessmentConsumer:
+    """Runs queued assessments with bounded concurrency, outside the agent's job processes."""
+
+    def __init__(
+        self,
+        queue: AssessmentQueue,
+        llm_client,
+        *,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        artifacts: ArtifactStore | None = None,
+    ):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.artifacts = artifacts or get_default_store()
+        self._llm = llm_client
+        self._name = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def run(self, *, once: bool = False) -> bool:
+        """Consumes forever, or until the queue has no due job when `once` is set.
+
+        With `once`, a worker stops at its first error instead of backing off, and
+        run() returns False if any worker did.
+        """
+        logger.info(f"Assessment consumer {self._name} started (concurrency={self.concurrency}, queue={self.queue.path})")
+        return all(await asyncio.gather(*(self._worker(i, once) for i in range(self.concurrency))))
+
+    async def _worker(self, index: int, once: bool) -> bool:
+        consumer = f"{self._name}/{index}"
+        errors = 0
+        while True:
+            # a locked or unavailable queue must not end the worker (and with it run())
+            try:
+                claimed = await asyncio.to_thread(self.queue.claim, consumer)
+                errors = 0
+                if claimed is None:
+                    if once:
+                        return True
+                    await asyncio.sleep(POLL_INTERVAL)
+                    continue
+                await self._process(consumer, *claimed)
+            except Exception as e:
+                if once:
+                    logger.error(f"Assessment worker {consumer} failed ({type(e).__name__}: {e}), stopping")
+                    return False
+                errors += 1
+                delay = min(POLL_INTERVAL * 2 ** errors, WORKER_BACKOFF_MAX)
+                logger.error(f"Assessment worker {consumer} failed ({type(e).__name__}: {e}), retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+
+    async def _process(self, consumer: str, job_id: str, payload: dict, attempt: int):
+        logger.info(f"Generating assessment for {job_id} (attempt {attempt}/{MAX_ATTEMPTS})")
+        work = asyncio.create_task(self._generate(job_id, payload))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, consumer))
+        try:
+            # the heartbeat only returns once the lease is lost
+            await asyncio.wait({work, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            heartbeat.cancel()
+            if not work.done():
+                work.cancel()
+                await asyncio.wait({work})
+        if work.cancelled():
+            logger.warning(f"Lost the lease on {job_id} to another consumer, stopped generating its assessment")
+            return
+
+        try:
+            path = work.result()
+        except Exception as e:
+            delay = await asyncio.to_thread(self.queue.fail, job_id, consumer, attempt, f"{type(e).__name__}: {e}")
+            if delay is None:
+                logger.error(f"Assessment for {job_id} failed after {attempt} attempts: {e}")
+            else:
+                logger.warning(f"Assessment for {job_id} failed ({e}), retrying in {delay:.0f}s")
+            return
+        if await asyncio.to_thread(self.queue.complete, job_id, consumer, path):
+            logger.info(f"Assessment for {job_id} written to {path}")
+        else:
+            logger.warning(f"Assessment for {job_id} written to {path}, but its lease had passed to another consumer")
+
+    async def _generate(self, job_id: str, payload: dict) -> str:
+        pipeline = AssessmentPipeline(self._llm)
+        report = await pipeline.run(payload.get("jd_text", ""), payload.get("transcript", []))
+        if not report.strip():
+            raise ValueError("empty report")
+        return await asyncio.to_thread(self.artifacts.put, job_id, "assessment", report)
+
+    async def _heartbeat(self, job_id: str, consumer: str):
+        while True:
+            await asyncio.sleep(LEASE / 3)
+            try:
+                renewed = await asyncio.to_thread(self.queue.renew, job_id, consumer)
+            except Exception as e:
+                # the lease outlasts a few missed renewals
+                logger.warning(f"Could not renew the lease on {job_id}: {e}")
+                continue
+            if not renewed:
+                return
+
+
+async def _consume(args) -> bool:
+    from client_registry import get_registry
+
+    consumer = AssessmentConsumer(AssessmentQueue(args.queue), get_registry().llm(), concurrency=args.concurrency)
+    return await consumer.run(once=args.once)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Durable queue for interview assessments.")
+    parser.add_argument("--queue", default=QUEUE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    consume = sub.add_parser("consume", help="generate queued assessments")
+    consume.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    consume.add_argument("--once", action="store_true", help="exit when no job is due (non-zero after a worker error)")
+    sub.add_parser("status", help="show queue counts and recent failures")
+    retry = sub.add_parser("retry", help="re-queue a failed job")
+    retry.add_argument("job_id")
+    args = parser.parse_args()
+
+    if args.command == "consume":
+        if not asyncio.run(_consume(args)):
+            sys.exit(1)
+    elif args.command == "status":
+        print(json.dumps(AssessmentQueue(args.queue).status(), indent=2))
+    elif args.command == "retry":
+        print("re-queued" if AssessmentQueue(args.queue).retry(args.job_id) else "no failed job with that id")
@@ -0,0 +1,195 @@
+"""Checks the adaptive end-of-turn windows against scripted pause fixtures.
+
+Each fixture is a sequence of (seconds, raw speech probability) segments. They are
+run window by window through the same smoothing (ExpFilter, alpha 0.35) and
+speaking/silence accounting as the patched VADStream, with the real
+EndpointingPolicy, and the silence at which each turn ended is compared with
+the expected one. A mid-answer pause must never end the turn, and a speaker
+without pause history must always get the stage's full base window. Every
+fixture is also played through two streams sharing the policy (the
+assistant's VAD and the STT's), which must end the turns at the same silence
+and record each one once.
+Exits non-zero if any check fails.
+
+Usage:
+    python bench_endpointing.py
+"""
+import argparse
+import sys
+from dataclasses import dataclass
+
+from livekit.agents import utils
+
+from endpointing import EndpointingPolicy
+
+SAMPLE_RATE = 16000
+WINDOW_SAMPLES = 512  # Silero window at 16 kHz
+WINDOW = WINDOW_SAMPLES / SAMPLE_RATE
+ACTIVATION_THRESHOLD = 0.6  # the interview's VAD options
+MIN_SPEECH_DURATION = 0.05
+SPEECH_P = 0.9
+SILENCE_P = 0.02
+
+
+def speech(seconds: float) -> tuple[float, float]:
+    return seconds, SPEECH_P
+
+
+def pause(seconds: float) -> tuple[float, float]:
+    return seconds, SILENCE_P
+
+
+@dataclass
+class Fixture:
+    name: str
+    stage: str
+    segments: list[tuple[float, float]]
+    expected_ends: list[float]  # silence (s) at which each turn must end, in order
+
+
+# Pauses the speaker resumed after are what the policy learns from, so the
+# "history" fixtures start with an answer containing a few of them.
+FIXTURES = [
+    Fixture(
+        "no history: full window",
+        "PAST_EXPERIENCE",
+        [speech(3.0), pause(3.0)],
+        [2.0],
+    ),
+    Fixture(
+        "no history: mid-answer pause keeps the turn",
+        "PAST_EXPERIENCE",
+        [speech(3.0), pause(1.8), speech(3.0), pause(3.0)],
+        [2.0],
+    ),
+    Fixture(
+        "long resumed pauses: mid-answer pause keeps the turn",
+        "PAST_EXPERIENCE",
+        [speech(2.0), pause(0.6), speech(2.0), pause(0.9), speech(2.0), pause(1.2), speech(2.0),
+         pause(1.6), speech(2.0), pause(3.0)],
+        [2.0],
+    ),
+    Fixture(
+        "short resumed pauses: finished answer ends early",
+        "PAST_EXPERIENCE",
+        [speech(2.0), pause(0.4), speech(2.0), pause(0.5), speech(2.0), pause(0.6), speech(2.0), pause(3.0)],
+        [1.4],
+    ),
+    Fixture(
+        "short resumed pauses: mid-answer pause within the margin keeps the turn",
+        "PAST_EXPERIENCE",
+        [speech(2.0), pause(0.4), speech(2.0), pause(0.5), speech(2.0), pause(0.6), speech(2.0),
+         pause(1.0), speech(2.0), pause(3.0)],
+        [1.55],  # the 1.0s pause measures ~1.05s (smoothing), plus PAUSE_MARGIN
+    ),
+    Fixture(
+        "history carries over to the next turn",
+        "SELF_INTRODUCTION",
+        [speech(2.0), pause(0.4), speech(2.0), pause(0.5), speech(2.0), pause(0.6), speech(2.0), pause(3.0),
+         speech(3.0), pause(3.0)],
+        [1.2, 1.2],
+    ),
+    Fixture(
+        "short utterance keeps the full window",
+        "PAST_EXPERIENCE",
+        [speech(2.0), pause(0.4), speech(2.0), pause(0.5), speech(2.0), pause(0.6), speech(2.0), pause(3.0),
+         speech(1.0), pause(3.0)],
+        [1.4, 2.0],
+    ),
+]
+
+
+class SimulatedStream:
+    """One VAD stream's smoothing and speaking/silence accounting around a tracker."""
+
+    def __init__(self, tracker, samples_offset: int = 0):
+        self.tracker = tracker
+        self.exp_filter = utils.ExpFilter(alpha=0.35)
+        self.speaking = False
+        self.speech_duration = 0.0
+        self.speech_threshold = 0.0
+        self.silence_threshold = 0.0
+        self.samples_index = samples_offset  # streams started at different times count differently
+        self.ends: list[float] = []  # silence at which each turn ended
+
+    def push(self, raw_p: float):
+        p = self.exp_filter.apply(exp=1.0, sample=raw_p)
+        self.samples_index += WINDOW_SAMPLES
+        if self.speaking:
+            self.speech_duration += WINDOW
+
+        if p >= ACTIVATION_THRESHOLD:
+            self.speech_threshold += WINDOW
+            self.silence_threshold = 0.0
+            if not self.speaking and self.speech_threshold >= MIN_SPEECH_DURATION:
+                self.speaking = True
+                self.speech_duration = self.speech_threshold
+            if self.speaking:
+                self.tracker.update(self.samples_index, p, self.speech_duration, 0.0)
+        else:
+            self.silence_threshold += WINDOW
+            self.speech_threshold = 0.0
+            if self.speaking:
+                window = self.tracker.update(self.samples_index, p, self.speech_duration, self.silence_threshold)
+                if self.silence_threshold >= window:
+                    self.tracker.end_of_speech(self.samples_index, self.speech_duration)
+                    self.ends.append(self.silence_threshold)
+                    self.speaking = False
+                    self.speech_duration = 0.0
+
+
+def run_fixture(fixture: Fixture, streams: int = 1) -> tuple[list[list[float]], dict]:
+    """Returns the silence at which each turn ended, per stream, and the policy's stats.
+
+    With several streams (the assistant's VAD and the STT's), all see the same
+    audio; the first one records into the policy, the others only read it.
+    """
+    policy = EndpointingPolicy(stage=fixture.stage, session_id="bench")
+    simulated = [
+        SimulatedStream(policy.tracker(records=i == 0), samples_offset=i * 1234) for i in range(streams)
+    ]
+    for seconds, raw_p in fixture.segments:
+        for _ in range(round(seconds / WINDOW)):
+            for stream in simulated:
+                stream.push(raw_p)
+    return [stream.ends for stream in simulated], policy.stats()
+
+
+def check(ends: list[float], expected: list[float]) -> bool:
+    return len(ends) == len(expected) and all(
+        abs(end - want) <= WINDOW + 1e-9 for end, want in zip(ends, expected)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    failed = 0
+    for fixture in FIXTURES:
+        (ends,), _ = run_fixture(fixture)
+        ok = check(ends, fixture.expected_ends)
+        failed += not ok
+        got = ", ".join(f"{end:.2f}s" for end in ends) or "no end"
+        want = ", ".join(f"{end:.2f}s" for end in fixture.expected_ends)
+        print(f"{'ok  ' if ok else 'FAIL'} {fixture.name:<72} ends at {got:<16} expected {want}")
+
+    # two streams of a session share the policy: both end each turn where a single
+    # stream would, and every pause and turn is counted once
+    for fixture in FIXTURES:
+        ends_per_stream, stats = run_fixture(fixture, streams=2)
+        ok = all(check(ends, fixture.expected_ends) for ends in ends_per_stream) and stats["turns"] == len(
+            fixture.expected_ends
+        )
+        failed += not ok
+        got = " / ".join(", ".join(f"{end:.2f}s" for end in ends) or "no end" for ends in ends_per_stream)
+        name = f"two streams, {fixture.name}"
+        print(f"{'ok  ' if ok else 'FAIL'} {name[:72]:<72} ends at {got}, {stats['turns']} turn(s) recorded")
+
+    if failed:
+        print(f"{failed} endpointing check(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Measures speculative transcription against a local fake STT.
+
+Plays labeled fixtures (see bench_vad.py) in real time, optionally sped up, through
+livekit's plain stt.StreamAdapter and through SpeculativeSTT, with the interview's
+2s end-of-speech silence. The fake STT sleeps for a fixed latency and "transcribes"
+by counting voiced 100ms blocks, so both adapters must produce the same transcripts.
+Reports the delay from END_OF_SPEECH to the final transcript for each, and the
+audio each one sent to STT: speculations that get discarded are sent again.
+
+Usage:
+    python bench_speculative_stt.py --stt-latency 0.8 --speed 4
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import stt, utils
+from livekit.plugins import silero
+
+from bench_vad import FRAME_MS, synthetic_fixtures
+from speculative_stt import (
+    DEFAULT_MAX_SPECULATIONS,
+    DEFAULT_SPECULATIVE_LEAD,
+    DEFAULT_SPECULATIVE_PAUSE,
+    SpeculativeSTT,
+)
+from vad_runtime import InterviewVAD
+
+
+class FakeSTT(stt.STT):
+    """Non-streaming STT stand-in: fixed latency, deterministic text from the audio."""
+
+    def __init__(self, latency: float):
+        super().__init__(capabilities=stt.STTCapabilities(streaming=False, interim_results=False))
+        self.latency = latency
+        self.calls = 0
+        self.audio_seconds = 0.0  # audio sent to recognize(), billed by real STT APIs
+
+    async def recognize(self, buffer: utils.AudioBuffer, *, language: str | None = None) -> stt.SpeechEvent:
+        self.calls += 1
+        frame = utils.merge_frames(buffer)
+        self.audio_seconds += frame.samples_per_channel / frame.sample_rate
+        samples = np.frombuffer(frame.data, dtype=np.int16).astype(np.float32)
+        block = frame.sample_rate // 10
+        blocks = samples[: len(samples) // block * block].reshape(-1, block)
+        voiced = int((np.sqrt((blocks**2).mean(axis=1)) > 500).sum()) if len(blocks) else 0
+        await asyncio.sleep(self.latency)
+        return stt.SpeechEvent(
+            type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+            alternatives=[stt.SpeechData(language=language or "en", text=f"{voiced} voiced blocks")],
+        )
+
+
+async def run(adapter: stt.STT, audio: np.ndarray, sample_rate: int, speed: float) -> list[tuple[str, float]]:
+    """Pushes audio at `speed`x real time; returns (transcript, end-of-speech -> final delay)."""
+    stream = adapter.stream()
+    samples = sample_rate * FRAME_MS // 1000
+    results = []
+
+    async def _push():
+        start = time.perf_counter()
+        for n, i in enumerate(range(0, len(audio) - samples + 1, samples)):
+            stream.push_frame(rtc.AudioFrame(audio[i : i + samples].tobytes(), sample_rate, 1, samples))
+            delay = start + (n + 1) * FRAME_MS / 1000 / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        stream.end_input()
+
+    async def _read():
+        ended_at = None
+        async for ev in stream:
+            if ev.type == stt.SpeechEventType.END_OF_SPEECH:
+                ended_at = time.perf_counter()
+            elif ev.type == stt.SpeechEventType.FINAL_TRANSCRIPT:
+                results.append((ev.alternatives[0].text, (time.perf_counter() - ended_at) * speed))
+
+    await asyncio.gather(_push(), _read())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stt-latency", type=float, default=0.8, help="fake STT round trip, in audio seconds")
+    parser.add_argument("--speed", type=float, default=4.0, help="playback speed (1 = real time)")
+    parser.add_argument("--pause", type=float, default=DEFAULT_SPECULATIVE_PAUSE)
+    parser.add_argument("--lead", type=float, default=DEFAULT_SPECULATIVE_LEAD)
+    parser.add_argument("--max-speculations", type=int, default=DEFAULT_MAX_SPECULATIONS)
+    args = parser.parse_args()
+
+    async def _bench():
+        base = silero.VAD.load(min_silence_duration=2.0, activation_threshold=0.6)
+        plain_vad = InterviewVAD(session=base._onnx_session, opts=base._opts)
+        spec_vad = InterviewVAD(session=base._onnx_session, opts=base._opts, inference_frames="lazy")
+
+        plain_delays, spec_delays, mismatches = [], [], 0
+        plain_audio = spec_audio = 0.0
+        for fixture in synthetic_fixtures(sample_rate=16000):
+            plain_stt = FakeSTT(args.stt_latency / args.speed)
+            plain = await run(stt.StreamAdapter(stt=plain_stt, vad=plain_vad), fixture["audio"], 16000, args.speed)
+            spec_stt = FakeSTT(args.stt_latency / args.speed)
+            adapter = SpeculativeSTT(
+                stt=spec_stt,
+                vad=spec_vad,
+                speculative_pause=args.pause,
+                speculative_lead=args.lead,
+                max_speculations=args.max_speculations,
+            )
+            spec = await run(adapter, fixture["audio"], 16000, args.speed)
+
+            mismatches += sum(a[0] != b[0] for a, b in zip(plain, spec)) + abs(len(plain) - len(spec))
+            plain_delays += [d for _, d in plain]
+            spec_delays += [d for _, d in spec]
+            plain_audio += plain_stt.audio_seconds
+            spec_audio += spec_stt.audio_seconds
+            print(f"{fixture['name']:<14} turns={len(spec)}  {adapter.stats()}")
+
+        print(
+            f"end of speech -> transcript: plain p50={statistics.median(plain_delays):.3f}s  "
+            f"speculative p50={statistics.median(spec_delays):.3f}s  transcript mismatches={mismatches}"
+        )
+        extra = spec_audio - plain_audio
+        print(
+            f"STT audio: plain {plain_audio:.1f}s  speculative {spec_audio:.1f}s  "
+            f"extra {extra:.1f}s ({extra / plain_audio:+.0%})"
+        )
+        return mismatches
+
+    raise SystemExit(1 if asyncio.run(_bench()) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""Offline benchmark and regression check for the (patched) Silero VADStream.
+
+Plays labeled WAV fixtures through a VADStream faster than real time at each
+sample rate and reports real-time factor, per-window latency percentiles,
+allocations per window and peak RSS. START/END_OF_SPEECH events are checked
+against the fixture labels.
+
+Fixtures: `<name>.wav` (mono or stereo int16) next to `<name>.json` holding
+`{"speech": [[start_s, end_s], ...]}`. Without a fixture directory, a set of
+synthetic voiced-tone fixtures with exact labels is generated in memory.
+
+Usage:
+    python bench_vad.py                                  # installed vad.py
+    python bench_vad.py --save-baseline vad_baseline.json
+    python bench_vad.py --baseline vad_baseline.json     # exits 1 on regression
+    python bench_vad.py --vad-module /path/to/other/vad.py --engine
+    python bench_vad.py --inference-frames copy lazy none  # patched VADStream only
+"""
+import argparse
+import asyncio
+import gc
+import importlib.util
+import inspect
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+import wave
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import vad as agents_vad
+from livekit.plugins.silero import onnx_model
+from livekit.plugins.silero import vad as installed_vad
+
+from bench_vad_load import current_rss_mb
+
+FIXTURE_DIR = os.path.join("example", "vad_fixtures")
+RATES = (16000, 24000, 48000)
+FRAME_MS = 10
+
+# metrics where higher is worse, compared against the baseline
+REGRESSION_METRICS = ("rtf", "latency_p95_ms", "alloc_blocks_per_window")
+
+
+def load_vad_module(path: str | None):
+    """The installed silero vad.py, or another copy of it to compare against."""
+    if path is None:
+        return installed_vad
+    name = "livekit.plugins.silero._bench_vad"
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def read_wav(path: str) -> tuple[np.ndarray, int]:
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM is supported")
+        sample_rate = f.getframerate()
+        channels = f.getnchannels()
+        audio = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return audio, sample_rate
+
+
+def resample(audio: np.ndarray, from_rate: int, to_rate: int) -> np.ndarray:
+    if from_rate == to_rate:
+        return audio
+    # linear interpolation is plenty for a VAD benchmark
+    n = int(len(audio) * to_rate / from_rate)
+    positions = np.arange(n) * (from_rate / to_rate)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.int16)
+
+
+def load_fixtures(directory: str) -> list[dict]:
+    fixtures = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".wav"):
+            continue
+        base = os.path.join(directory, name[:-4])
+        if not os.path.exists(base + ".json"):
+            print(f"Skipping {name}: no {os.path.basename(base)}.json labels")
+            continue
+        audio, sample_rate = read_wav(base + ".wav")
+        with open(base + ".json") as f:
+            speech = [tuple(s) for s in json.load(f)["speech"]]
+        fixtures.append({"name": name[:-4], "audio": audio, "sample_rate": sample_rate, "speech": speech})
+    return fixtures
+
+
+def synthetic_fixtures(count: int = 3, sample_rate: int = 48000) -> list[dict]:
+    """Harmonic, amplitude-modulated tones between silences. Silero reads them as speech."""
+    fixtures = []
+    for seed in range(count):
+        rng = np.random.default_rng(seed)
+        parts, speech, t = [], [], 0.0
+        for _ in range(5):
+            silence = rng.uniform(0.8, 2.0)
+            parts.append(rng.normal(0, 30, int(silence * sample_rate)))
+            t += silence
+            duration = rng.uniform(1.0, 3.0)
+            n = int(duration * sample_rate)
+            tt = np.arange(n) / sample_rate
+            f0 = 120 + 40 * np.sin(2 * np.pi * 0.7 * tt)
+            phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+            voiced = sum(np.sin(k * phase) / k for k in range(1, 25))
+            envelope = (0.5 + 0.5 * np.sin(2 * np.pi * 4 * tt)) ** 2
+            parts.append(voiced * envelope * 6000 + rng.normal(0, 200, n))
+            speech.append((round(t, 3), round(t + duration, 3)))
+            t += duration
+        parts.append(rng.normal(0, 30, int(2.5 * sample_rate)))
+        audio = np.clip(np.concatenate(parts), -32767, 32767).astype(np.int16)
+        fixtures.append({"name": f"synthetic-{seed}", "audio": audio, "sample_rate": sample_rate, "speech": speech})
+    return fixtures
+
+
+def make_stream(vad_module, session, opts, engine, inference_frames=None):
+    vad = vad_module.VAD(session=session, opts=opts)
+    model = onnx_model.OnnxModel(onnx_session=session, sample_rate=opts.sample_rate)
+    params = inspect.signature(vad_module.VADStream.__init__).parameters
+    kwargs = {}
+    if "max_backlog" in params:
+        kwargs["max_backlog"] = None  # audio is pushed all at once, never coalesce
+    if engine is not None:
+        if "inference_engine" not in params:
+            raise SystemExit("--engine needs the patched VADStream (run patch_vad_class.py)")
+        kwargs["inference_engine"] = engine
+    if inference_frames is not None:
+        if "inference_frames" not in params:
+            raise SystemExit("--inference-frames needs the patched VADStream (run patch_vad_class.py)")
+        kwargs["inference_frames"] = inference_frames
+    return vad_module.VADStream(vad, opts, model, **kwargs)
+
+
+async def play(stream, audio: np.ndarray, sample_rate: int) -> tuple[list, float]:
+    """Pushes every frame at once (faster than real time) and collects the events."""
+    samples = sample_rate * FRAME_MS // 1000
+    start = time.perf_counter()
+    for i in range(0, len(audio) - samples + 1, samples):
+        chunk = audio[i : i + samples]
+        stream.push_frame(rtc.AudioFrame(chunk.tobytes(), sample_rate, 1, samples))
+    stream.end_input()
+    events = [ev async for ev in stream]
+    return events, time.perf_counter() - start
+
+
+def check_timing(events: list, speech: list[tuple], opts, model_rate: int, tolerance: float) -> dict:
+    """Matches START/END_OF_SPEECH events to labeled segments, in order."""
+    starts = [ev.samples_index / model_rate for ev in events if ev.type == agents_vad.VADEventType.START_OF_SPEECH]
+    # END fires after min_silence_duration of silence; compare the speech end it implies
+    ends = [
+        ev.samples_index / model_rate - opts.min_silence_duration
+        for ev in events
+        if ev.type == agents_vad.VADEventType.END_OF_SPEECH
+    ]
+    start_offsets = [start - label[0] for label, start in zip(speech, starts)]
+    end_offsets = [end - label[1] for label, end in zip(speech, ends)]
+    errors = [abs(o) for o in start_offsets + end_offsets]
+    ok = len(starts) == len(speech) and len(ends) == len(speech) and all(e <= tolerance for e in errors)
+    return {
+        "segments": len(speech),
+        "starts": len(starts),
+        "ends": len(ends),
+        # signed: positive means the event came late
+        "start_offset_ms": statistics.mean(start_offsets) * 1000 if start_offsets else None,
+        "end_offset_ms": statistics.mean(end_offsets) * 1000 if end_offsets else None,
+        "max_error_ms": max(errors) * 1000 if errors else None,
+        "ok": ok,
+    }
+
+
+async def bench_rate(vad_module, fixtures: list[dict], rate: int, args, engine, inference_frames: str | None) -> dict:
+    opts = vad_module._VADOptions(
+        min_speech_duration=args.min_speech,
+        min_silence_duration=args.min_silence,
+        prefix_padding_duration=0.5,
+        max_buffered_speech=args.max_buffered_speech,
+        activation_threshold=args.threshold,
+        sample_rate=16000,
+    )
+    session = onnx_model.new_inference_session(True)
+
+    audios = [resample(f["audio"], f["sample_rate"], rate) for f in fixtures]
+    audio_seconds = sum(len(audio) / rate for audio in audios)
+
+    # timings are noisy on shared machines: keep the best of `repeat` runs
+    best_wall, best_latencies = float("inf"), []
+    for _ in range(args.repeat):
+        wall, latencies, timing = 0.0, [], []
+        for fixture, audio in zip(fixtures, audios):
+            events, elapsed = await play(make_stream(vad_module, session, opts, engine, inference_frames), audio, rate)
+            wall += elapsed
+            latencies.extend(
+                ev.inference_duration for ev in events if ev.type == agents_vad.VADEventType.INFERENCE_DONE
+            )
+            result = check_timing(events, fixture["speech"], opts, opts.sample_rate, args.tolerance)
+            result["fixture"] = fixture["name"]
+            timing.append(result)
+        if wall < best_wall:
+            best_wall, best_latencies = wall, latencies
+
+    # second pass under tracemalloc (it slows everything down, so it is not timed).
+    # Events are kept, so this counts what a consumer holding them retains per window.
+    audio = audios[0]
+    stream = make_stream(vad_module, session, opts, engine, inference_frames)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    events, _ = await play(stream, audio, rate)
+    after = tracemalloc.take_snapshot()
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    windows = sum(1 for ev in events if ev.type == agents_vad.VADEventType.INFERENCE_DONE) or 1
+    alloc_blocks = sum(max(stat.count_diff, 0) for stat in diff)
+    alloc_bytes = sum(max(stat.size_diff, 0) for stat in diff)
+    del events, stream
+
+    latencies_ms = sorted(l * 1000 for l in best_latencies)
+    quantiles = statistics.quantiles(latencies_ms, n=100) if len(latencies_ms) > 1 else latencies_ms * 99
+    return {
+        "rate": rate,
+        "audio_s": audio_seconds,
+        "rtf": best_wall / audio_seconds,
+        "windows": len(latencies_ms),
+        "latency_p50_ms": quantiles[49],
+        "latency_p95_ms": quantiles[94],
+        "latency_p99_ms": quantiles[98],
+        "alloc_blocks_per_window": alloc_blocks / windows,
+        "alloc_kib_per_window": alloc_bytes / windows / 1024,
+        "traced_peak_mib": traced_peak / (1024 * 1024),
+        "rss_mb": current_rss_mb(),
+        "timing": timing,
+    }
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list[str]:
+    failures = []
+    for rate, current in results["rates"].items():
+        base = baseline.get("rates", {}).get(rate)
+        if base is None:
+            continue
+        for metric in REGRESSION_METRICS:
+            # small absolute slack so near-zero values don't fail on noise
+            limit = base[metric] * (1 + max_regression) + 1e-3
+            if current[metric] > limit:
+                failures.append(f"{rate}Hz {metric}: {current[metric]:.4f} > {limit:.4f} (baseline {base[metric]:.4f})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=FIXTURE_DIR, help="directory of labeled WAV fixtures")
+    parser.add_argument("--rates", type=int, nargs="+", default=list(RATES))
+    parser.add_argument("--vad-module", help="path to another copy of silero vad.py (e.g. a previous patch)")
+    parser.add_argument("--engine", action="store_true", help="run windows through vad_engine.BatchedVADEngine")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per rate; the fastest one is reported")
+    parser.add_argument(
+        "--inference-frames",
+        choices=("copy", "lazy", "none"),
+        nargs="+",
+        help="per-window frame payloads; several modes are benchmarked (and timing-checked) one after the other",
+    )
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--min-speech", type=float, default=0.05)
+    parser.add_argument("--min-silence", type=float, default=0.5)
+    parser.add_argument("--max-buffered-speech", type=float, default=60.0)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed START/END error in seconds")
+    parser.add_argument("--baseline", help="baseline JSON to compare against; exits 1 on regression")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed relative slowdown (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    vad_module = load_vad_module(args.vad_module)
+    if os.path.isdir(args.fixtures) and any(n.endswith(".wav") for n in os.listdir(args.fixtures)):
+        fixtures = load_fixtures(args.fixtures)
+    else:
+        print(f"No fixtures in {args.fixtures}, using synthetic ones.")
+        fixtures = synthetic_fixtures()
+
+    engine = None
+    if args.engine:
+        from vad_engine import BatchedVADEngine
+
+        engine = BatchedVADEngine(onnx_model.new_inference_session(True))
+
+    async def _bench() -> dict:
+        rates = {}
+        modes = args.inference_frames or [None]
+        for rate, mode in [(rate, mode) for rate in args.rates for mode in modes]:
+            r = await bench_rate(vad_module, fixtures, rate, args, engine, mode)
+            # a single mode keeps the plain rate keys, so existing baselines still compare
+            key = str(rate) if len(modes) == 1 else f"{rate}/{mode}"
+            rates[key] = r
+            print(
+                f"{rate:>6}Hz{'' if len(modes) == 1 else f' {mode:<4}'}  RTF={r['rtf']:.4f}  latency p50/p95/p99="
+                f"{r['latency_p50_ms']:.2f}/{r['latency_p95_ms']:.2f}/{r['latency_p99_ms']:.2f}ms  "
+                f"alloc/window={r['alloc_blocks_per_window']:.1f} blocks ({r['alloc_kib_per_window']:.2f}KiB)  "
+                f"RSS={r['rss_mb']:.1f}MB"
+            )
+            for t in r["timing"]:
+                status = "ok" if t["ok"] else "FAIL"
+                error = (
+                    f"start {t['start_offset_ms']:+.0f}ms end {t['end_offset_ms']:+.0f}ms max err {t['max_error_ms']:.0f}ms"
+                    if t["max_error_ms"] is not None
+                    else "no events"
+                )
+                print(f"          {t['fixture']:<24} {t['starts']}/{t['ends']} of {t['segments']} segments, {error}  {status}")
+        return {"vad_module": vad_module.__file__, "engine": args.engine, "peak_rss_mb": peak_rss_mb(), "rates": rates}
+
+    results = asyncio.run(_bench())
+    print(f"Peak RSS: {results['peak_rss_mb']:.1f}MB")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    failures = [
+        f"{rate}Hz {t['fixture']}: START/END timing off"
+        for rate, r in results["rates"].items()
+        for t in r["timing"]
+        if not t["ok"]
+    ]
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures += compare(results, json.load(f), args.max_regression)
+
+    if failures:
+        print("Regressions:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""Checks the patched VADStream against a reference merge_frames implementation.
+
+The same synthetic speech is played at 16, 24 and 48 kHz, in 10 ms frames and in
+bursts larger than the ring buffers' 0.5 s of headroom, through the patched
+VADStream (ring buffers) and through a reference that runs upstream's loop: the
+pending frames are merged with utils.merge_frames for every window, and what the
+window did not use is carried over, at sample offsets. Event types, sample
+indexes, speaking state and durations, probabilities and the audio carried by
+every event must match, with the frames copied and read lazily. With
+vad_engine.BatchedVADEngine, only the speech boundaries are compared, within
+ENGINE_BOUNDARY_TOLERANCE. Separately, the windows' frames must cover the input
+at sample offsets, without gaps or repeats. Exits non-zero on a mismatch.
+
+The patched module is the installed vad.py if it is patched, otherwise a
+temporary copy patched with patch_vad_class.py.
+
+Usage:
+    python bench_vad_equivalence.py
+    python bench_vad_equivalence.py --vad-module /path/to/patched/vad.py
+"""
+import argparse
+import asyncio
+import inspect
+import logging
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import utils
+from livekit.plugins.silero import onnx_model
+from livekit.plugins.silero import vad as installed_vad
+
+from bench_vad import load_vad_module, make_stream, resample, synthetic_fixtures
+from vad_engine import BatchedVADEngine
+
+RATES = (16000, 24000, 48000)
+MODEL_RATE = 16000
+WINDOW_SAMPLES = 512  # Silero window at 16 kHz
+
+# (frame ms, max_buffered_speech): regular frames, bursts that make the rings
+# grow, and a speech buffer small enough to fill up mid-utterance
+CASES = ((10, 60.0), (700, 60.0), (10, 1.0))
+# every event's audio must match whether the frames are copied or read lazily
+FRAME_MODES = ("copy", "lazy")
+
+# Probabilities must be identical at the model's rate. Resampled input goes through
+# a separate rtc.AudioResampler on each side, and two resamplers dither the same
+# input differently (by a couple of LSB), which moves probabilities by ~1e-3.
+PROB_TOLERANCE = {MODEL_RATE: 0.0}
+RESAMPLED_PROB_TOLERANCE = 5e-3
+# vad_engine.BatchedVADEngine carries Silero's recurrent state from window to
+# window; the stock OnnxModel stores the returned state as `_state` but feeds
+# `_rnn_state` (always zeros) back. The probabilities differ, so only the speech
+# boundaries are compared: same count and order, each within this many seconds
+# (over 8 synthetic fixtures they land up to 0.32s, 10 windows, apart; the
+# engine's starts are usually the closer ones to the labels).
+ENGINE_BOUNDARY_TOLERANCE = 0.4
+DURATION_TOLERANCE = 1e-9
+
+
+def patched_vad_module(path: str | None):
+    if path is not None:
+        return load_vad_module(path)
+    if "inference_frames" in inspect.signature(installed_vad.VADStream.__init__).parameters:
+        return installed_vad
+    tmp_dir = tempfile.mkdtemp(prefix="vad-equivalence-")
+    copy = os.path.join(tmp_dir, "vad.py")
+    shutil.copy(installed_vad.__file__, copy)
+    subprocess.run([sys.executable, "patch_vad_class.py", copy], check=True, stdout=subprocess.DEVNULL)
+    return load_vad_module(copy)
+
+
+def samples(frames) -> np.ndarray:
+    if not frames:
+        return np.empty(0, dtype=np.int16)
+    return np.concatenate([np.frombuffer(frame.data, dtype=np.int16) for frame in frames])
+
+
+def event(type: str, samples_index: int, speaking: bool, speech: float, silence: float, frames,
+          probability: float | None = None) -> dict:
+    return {
+        "type": type,
+        "samples_index": samples_index,
+        "speaking": speaking,
+        "speech_duration": speech,
+        "silence_duration": silence,
+        "probability": probability,
+        "audio": samples(frames),
+    }
+
+
+def reference_events(model: onnx_model.OnnxModel, opts, frames: list[rtc.AudioFrame]) -> list[dict]:
+    """Upstream's VADStream loop, without the event channel and the executor."""
+    window = model.window_size_samples
+    window_duration = window / opts.sample_rate
+    input_rate = frames[0].sample_rate
+    prefix_padding = int(opts.prefix_padding_duration * input_rate)
+    speech_buffer = np.empty(int(opts.max_buffered_speech * input_rate) + prefix_padding, dtype=np.int16)
+    speech_index = 0
+    exp_filter = utils.ExpFilter(alpha=0.35)
+    resampler = None
+    if input_rate != opts.sample_rate:
+        resampler = rtc.AudioResampler(
+            input_rate=input_rate, output_rate=opts.sample_rate, quality=rtc.AudioResamplerQuality.QUICK
+        )
+
+    speaking = False
+    speech_duration = silence_duration = 0.0
+    current_sample = 0
+    speech_threshold = silence_threshold = 0.0
+    copy_fract = 0.0
+    input_frames, inference_frames = [], []
+    events = []
+
+    def reset_write_cursor():
+        nonlocal speech_index
+        if speech_index <= prefix_padding:
+            return
+        speech_buffer[:prefix_padding] = speech_buffer[speech_index - prefix_padding : speech_index]
+        speech_index = prefix_padding
+
+    for frame in frames:
+        input_frames.append(frame)
+        inference_frames.extend(resampler.push(frame) if resampler else [frame])
+        while sum(f.samples_per_channel for f in inference_frames) >= window:
+            input_frame = utils.merge_frames(input_frames)
+            inference_frame = utils.merge_frames(inference_frames)
+            data = np.frombuffer(inference_frame.data, dtype=np.int16)[:window]
+            p = exp_filter.apply(exp=1.0, sample=model(data.astype(np.float32) / np.iinfo(np.int16).max))
+            current_sample += window
+
+            to_copy = window * input_rate / model.sample_rate + copy_fract
+            to_copy_int = int(to_copy)
+            copy_fract = to_copy - to_copy_int
+            input_data = np.frombuffer(input_frame.data, dtype=np.int16)
+            to_copy_buffer = min(to_copy_int, len(speech_buffer) - speech_index)
+            if to_copy_buffer > 0:
+                copied = input_data[:to_copy_buffer]
+                speech_buffer[speech_index : speech_index + len(copied)] = copied
+                speech_index += len(copied)
+
+            if speaking:
+                speech_duration += window_duration
+            else:
+                silence_duration += window_duration
+            events.append(
+                event("INFERENCE_DONE", current_sample, speaking, speech_duration, silence_duration,
+                      [rtc.AudioFrame(input_data[:to_copy_int].tobytes(), input_rate, 1, len(input_data[:to_copy_int]))],
+                      probability=p)
+            )
+
+            if p >= opts.activation_threshold:
+                speech_threshold += window_duration
+                silence_threshold = 0.0
+                if not speaking and speech_threshold >= opts.min_speech_duration:
+                    speaking = True
+                    silence_duration = 0.0
+                    speech_duration = speech_threshold
+                    events.append(
+                        event("START_OF_SPEECH", current_sample, True, speech_duration, silence_duration,
+                              [rtc.AudioFrame(speech_buffer[:speech_index].tobytes(), input_rate, 1, speech_index)])
+                    )
+            else:
+                silence_threshold += window_duration
+                speech_threshold = 0.0
+                if not speaking:
+                    reset_write_cursor()
+                if speaking and silence_threshold >= opts.min_silence_duration:
+                    speaking = False
+                    speech_duration = 0.0
+                    silence_duration = silence_threshold
+                    events.append(
+                        event("END_OF_SPEECH", current_sample, False, speech_duration, silence_duration,
+                              [rtc.AudioFrame(speech_buffer[:speech_index].tobytes(), input_rate, 1, speech_index)])
+                    )
+                    reset_write_cursor()
+
+            # keep what this window did not use, as upstream does: at sample offsets
+            input_frames, inference_frames = [], []
+            if len(input_data) > to_copy_int:
+                rest = input_data[to_copy_int:]
+                input_frames.append(rtc.AudioFrame(rest.tobytes(), input_rate, 1, len(rest)))
+            inference_data = np.frombuffer(inference_frame.data, dtype=np.int16)
+            if len(inference_data) > window:
+                rest = inference_data[window:]
+                inference_frames.append(rtc.AudioFrame(rest.tobytes(), opts.sample_rate, 1, len(rest)))
+    return events
+
+
+async def patched_events(
+    vad_module, session, opts, frames: list[rtc.AudioFrame], inference_frames: str, engine=None
+) -> list[dict]:
+    stream = make_stream(vad_module, session, opts, engine, inference_frames)
+    for frame in frames:
+        stream.push_frame(frame)
+    stream.end_input()
+    return [
+        event(ev.type.name, ev.samples_index, ev.speaking, ev.speech_duration, ev.silence_duration, ev.frames,
+              probability=ev.probability if ev.type.name == "INFERENCE_DONE" else None)
+        async for ev in stream
+    ]
+
+
+def split_frames(audio: np.ndarray, rate: int, frame_ms: int) -> list[rtc.AudioFrame]:
+    n = rate * frame_ms // 1000
+    return [
+        rtc.AudioFrame(audio[i : i + n].tobytes(), rate, 1, len(audio[i : i + n]))
+        for i in range(0, len(audio), n)
+    ]
+
+
+def compare(expected: list[dict], got: list[dict], prob_tolerance: float) -> tuple[str | None, float]:
+    """The first mismatch (None if the events match) and the largest probability difference."""
+    max_diff = 0.0
+    for i, (want, ev) in enumerate(zip(expected, got)):
+        where = f"event {i} ({want['type']} at sample {want['samples_index']})"
+        for key in ("type", "samples_index", "speaking"):
+            if ev[key] != want[key]:
+                return f"{where}: {key} {ev[key]!r}, expected {want[key]!r}", max_diff
+        for key in ("speech_duration", "silence_duration"):
+            if abs(ev[key] - want[key]) > DURATION_TOLERANCE:
+                return f"{where}: {key} {ev[key]:.6f}, expected {want[key]:.6f}", max_diff
+        if want["probability"] is not None:
+            diff = abs(ev["probability"] - want["probability"])
+            max_diff = max(max_diff, diff)
+            if diff > prob_tolerance:
+                return f"{where}: probability off by {diff:.2e}", max_diff
+        if not np.array_equal(ev["audio"], want["audio"]):
+            return f"{where}: frames differ ({len(ev['audio'])} samples, expected {len(want['audio'])})", max_diff
+    if len(expected) != len(got):
+        return f"{len(got)} events, expected {len(expected)}", max_diff
+    return None, max_diff
+
+
+def compare_boundaries(expected: list[dict], got: list[dict], tolerance: float) -> tuple[str | None, float]:
+    """The first START/END_OF_SPEECH mismatch beyond `tolerance` seconds (None if all
+    match) and the largest boundary offset."""
+    want = [ev for ev in expected if ev["type"] in ("START_OF_SPEECH", "END_OF_SPEECH")]
+    have = [ev for ev in got if ev["type"] in ("START_OF_SPEECH", "END_OF_SPEECH")]
+    max_offset = 0.0
+    for i, (w, ev) in enumerate(zip(want, have)):
+        if ev["type"] != w["type"]:
+            return f"boundary {i}: {ev['type']}, expected {w['type']}", max_offset
+        offset = abs(ev["samples_index"] - w["samples_index"]) / MODEL_RATE
+        max_offset = max(max_offset, offset)
+        if offset > tolerance:
+            return f"boundary {i} ({w['type']} at sample {w['samples_index']}): off by {offset * 1000:.0f}ms", max_offset
+    if len(want) != len(have):
+        return f"{len(have)} speech boundaries, expected {len(want)}", max_offset
+    return None, max_offset
+
+
+def check_sample_offsets(events: list[dict], audio: np.ndarray, rate: int) -> str | None:
+    """One window per WINDOW_SAMPLES of model-rate audio, each carrying the input
+    samples of that window, in order and without gaps or repeats.
+
+    The baseline patch sliced the int16 frames at '*2' byte offsets: every window
+    consumed two windows' worth of inference audio and carried more input than
+    it covered, so inference ran on about 20% fewer windows than the audio holds.
+    """
+    windows = [ev for ev in events if ev["type"] == "INFERENCE_DONE"]
+    expected_windows = len(audio) * MODEL_RATE // rate // WINDOW_SAMPLES
+    # the resampler holds back a few samples of latency
+    if not expected_windows - 1 <= len(windows) <= expected_windows:
+        return f"{len(windows)} windows, expected {expected_windows}"
+
+    per_window = WINDOW_SAMPLES * rate / MODEL_RATE
+    sizes = {len(ev["audio"]) for ev in windows}
+    if not sizes <= {math.floor(per_window), math.ceil(per_window)}:
+        return f"windows carry {sorted(sizes)} input samples, expected {per_window:g}"
+    covered = np.concatenate([ev["audio"] for ev in windows]) if windows else samples([])
+    if not np.array_equal(covered, audio[: len(covered)]):
+        return f"window audio diverges from the input at sample {int(np.argmax(covered != audio[: len(covered)]))}"
+    return None
+
+
+async def run(vad_module, fixtures: list[dict]) -> int:
+    session = onnx_model.new_inference_session(True)
+    engine = BatchedVADEngine(session, sample_rate=MODEL_RATE)
+    failed = 0
+    for rate in RATES:
+        prob_tolerance = PROB_TOLERANCE.get(rate, RESAMPLED_PROB_TOLERANCE)
+        for frame_ms, max_buffered_speech in CASES:
+            opts = vad_module._VADOptions(
+                min_speech_duration=0.05,
+                min_silence_duration=0.55,
+                prefix_padding_duration=0.5,
+                max_buffered_speech=max_buffered_speech,
+                activation_threshold=0.5,
+                sample_rate=MODEL_RATE,
+            )
+            for fixture in fixtures:
+                audio = resample(fixture["audio"], fixture["sample_rate"], rate)
+                frames = split_frames(audio, rate, frame_ms)
+                model = onnx_model.OnnxModel(onnx_session=session, sample_rate=MODEL_RATE)
+                expected = reference_events(model, opts, frames)
+                for mode in FRAME_MODES:
+                    got = await patched_events(vad_module, session, opts, frames, mode)
+                    mismatch, max_diff = compare(expected, got, prob_tolerance)
+                    offsets = check_sample_offsets(got, audio, rate)
+                    failed += (mismatch is not None) + (offsets is not None)
+                    name = f"{fixture['name']} {rate // 1000}kHz {frame_ms}ms frames, {max_buffered_speech:g}s buffer, {mode}"
+                    print(
+                        f"{'ok  ' if mismatch is None else 'FAIL'} {name:<50} {len(expected):>5} events"
+                        f"  max |dp| {max_diff:.1e}" + (f"  {mismatch}" if mismatch else "")
+                    )
+                    print(f"{'ok  ' if offsets is None else 'FAIL'} {name:<50} sample offsets" + (f"  {offsets}" if offsets else ""))
+
+                got = await patched_events(vad_module, session, opts, frames, "copy", engine)
+                mismatch, max_offset = compare_boundaries(expected, got, ENGINE_BOUNDARY_TOLERANCE)
+                failed += mismatch is not None
+                name = f"{fixture['name']} {rate // 1000}kHz {frame_ms}ms frames, {max_buffered_speech:g}s buffer, engine"
+                print(
+                    f"{'ok  ' if mismatch is None else 'FAIL'} {name:<50} speech boundaries"
+                    f"  max offset {max_offset * 1000:.0f}ms" + (f"  {mismatch}" if mismatch else "")
+                )
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vad-module", help="patched vad.py to check instead of the installed one")
+    parser.add_argument("--fixtures", type=int, default=2, help="synthetic fixtures per case")
+    args = parser.parse_args()
+    # the 1s buffer case fills the speech buffer on purpose
+    logging.getLogger("livekit.plugins.silero").setLevel(logging.ERROR)
+
+    failed = asyncio.run(run(patched_vad_module(args.vad_module), synthetic_fixtures(args.fixtures)))
+    if failed:
+        print(f"{failed} equivalence check(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+
+import httpx
+import openai as openai_sdk
+from livekit.agents import JobProcess
+from livekit.plugins import openai
+
+logger = logging.getLogger("client-registry")
+logger.setLevel(logging.INFO)
+
+# Same per-kind timeouts as the livekit openai plugin's own clients
+LLM_TIMEOUT = httpx.Timeout(timeout=30, connect=10, read=5, pool=5)
+STT_TIMEOUT = httpx.Timeout(5.0)
+TTS_TIMEOUT = httpx.Timeout(5.0)
+
+POOL_LIMITS = httpx.Limits(max_connections=1000, max_keepalive_connections=100, keepalive_expiry=120)
+WARM_UP_TIMEOUT = 2.0  # prewarm shares the 10s process init timeout
+
+# Which client a request belongs to, by API path
+_ENDPOINTS = {
+    "/chat/completions": "llm",
+    "/audio/transcriptions": "stt",
+    "/audio/speech": "tts",
+}
+
+
+class _ConnectionStats:
+    """Counts requests and new connections per client from httpcore trace events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict] = {}
+
+    def _entry(self, kind: str) -> dict:
+        return self._stats.setdefault(kind, {"requests": 0, "new_connections": 0, "connect_seconds": 0.0})
+
+    async def on_request(self, request: httpx.Request):
+        path = request.url.path
+        kind = next((k for suffix, k in _ENDPOINTS.items() if path.endswith(suffix)), "other")
+        with self._lock:
+            self._entry(kind)["requests"] += 1
+        request.extensions["trace"] = self._tracer(kind)
+
+    def _tracer(self, kind: str):
+        started = 0.0
+
+        async def trace(name: str, info: dict):
+            nonlocal started
+            if name == "connection.connect_tcp.started":
+                started = time.perf_counter()
+            elif name == "connection.connect_tcp.complete":
+                with self._lock:
+                    self._entry(kind)["new_connections"] += 1
+            elif name == "connection.start_tls.complete":
+                with self._lock:
+                    self._entry(kind)["connect_seconds"] += time.perf_counter() - started
+
+        return trace
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            result = {}
+            for kind, entry in self._stats.items():
+                reused = entry["requests"] - entry["new_connections"]
+                result[kind] = {
+                    **entry,
+                    "reused": reused,
+                    "reuse_rate": reused / entry["requests"] if entry["requests"] else 0.0,
+                }
+            return result
+
+
+class ClientRegistry:
+    """One OpenAI connection pool for every LLM/STT/TTS the worker builds.
+
+    The plugin classes each create their own httpx pool, so every job paid TCP and
+    TLS setup for the LLM, STT and TTS separately. Here they share one keep-alive
+    pool (per-kind timeouts via with_options, which reuses the HTTP client) and
+    the instances themselves are reused across callers.
+
+    httpx async pools belong to the event loop they run on, so there is one
+    registry per loop: per job process with the process executor, per job thread
+    with JOB_EXECUTOR=thread.
+    """
+
+    def __init__(self, *, api_key: str | None = None, base_url: str | None = None):
+        self._connection_stats = _ConnectionStats()
+        self._http = httpx.AsyncClient(
+            timeout=LLM_TIMEOUT,
+            follow_redirects=True,
+            limits=POOL_LIMITS,
+            event_hooks={"request": [self._connection_stats.on_request]},
+        )
+        self._client = openai_sdk.AsyncClient(api_key=api_key, base_url=base_url, http_client=self._http)
+        self._instances: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        self._warm_ups = 0
+
+    @property
+    def client(self) -> openai_sdk.AsyncClient:
+        return self._client
+
+    def _get(self, kind: str, factory, timeout: httpx.Timeout, **options):
+        key = (kind, tuple(sorted(options.items())))
+        with self._lock:
+            instance = self._instances.get(key)
+            if instance is None:
+                instance = factory(client=self._client.with_options(timeout=timeout), **options)
+                self._instances[key] = instance
+        return instance
+
+    def llm(self, **options) -> openai.LLM:
+        return self._get("llm", openai.LLM, LLM_TIMEOUT, **options)
+
+    def stt(self, **options) -> openai.STT:
+        return self._get("stt", openai.STT, STT_TIMEOUT, **options)
+
+    def tts(self, **options) -> openai.TTS:
+        return self._get("tts", openai.TTS, TTS_TIMEOUT, **options)
+
+    async def warm_up(self, timeout: float = WARM_UP_TIMEOUT) -> bool:
+        """Opens a keep-alive connection to the API (TCP + TLS) without calling a model."""
+        started = time.perf_counter()
+        try:
+            # any status will do, this is only about the connection
+            await self._http.head(str(self._client.base_url), timeout=timeout)
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not warm up the OpenAI connection: {e}")
+            return False
+        self._warm_ups += 1
+        logger.info(f"OpenAI connection warm in {time.perf_counter() - started:.2f}s")
+        return True
+
+    def stats(self) -> dict:
+        return {"warm_ups": self._warm_ups, "clients": self._connection_stats.snapshot()}
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+_registries: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ClientRegistry]" = weakref.WeakKeyDictionary()
+_registries_lock = threading.Lock()
+
+
+def get_registry(loop: asyncio.AbstractEventLoop | None = None) -> ClientRegistry:
+    """The registry of the given (default: current) event loop, created on first use."""
+    if loop is None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = asyncio.get_event_loop()
+    with _registries_lock:
+        registry = _registries.get(loop)
+        if registry is None:
+            registry = _registries[loop] = ClientRegistry()
+        return registry
+
+
+def prewarm(proc: JobProcess):
+    """WorkerOptions.prewarm_fnc: builds the registry for the job's loop and opens its connection.
+
+    Prewarm runs on the job's event loop before it starts, so the warm connection
+    is still in the pool when the job begins (if it waited less than keepalive_expiry).
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        return  # the job fails on the missing key anyway, with a clearer error
+    loop = asyncio.get_event_loop()
+    registry = get_registry(loop)
+    proc.userdata["clients"] = registry
+    if not loop.is_running():
+        loop.run_until_complete(registry.warm_up())
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+from livekit.agents import llm
+
+logger = logging.getLogger("completion")
+logger.setLevel(logging.INFO)
+
+CHARS_PER_TOKEN = 4  # rough, but stable; no tokenizer dependency
+
+
+@dataclass
+class Completion:
+    text: str
+    stop_reason: str  # "end", "lines", "max_chars" or "max_tokens"
+    ttft: float | None  # seconds to the first text chunk
+    elapsed: float
+
+    @property
+    def finished(self) -> bool:
+        """The model ended the text, or gave all the lines asked for; not cut off by a cap."""
+        return self.stop_reason in ("end", "lines")
+
+
+# Per-label timings for this process
+_stats: dict[str, dict] = {}
+_stats_lock = threading.Lock()
+
+
+def _entry(label: str) -> dict:
+    return _stats.setdefault(
+        label, {"calls": 0, "stopped_early": 0, "timeouts": 0, "ttft_total": 0.0, "ttft_max": 0.0, "total": 0.0}
+    )
+
+
+def _record(label: str, result: Completion):
+    with _stats_lock:
+        entry = _entry(label)
+        entry["calls"] += 1
+        entry["total"] += result.elapsed
+        if result.stop_reason != "end":
+            entry["stopped_early"] += 1
+        if result.ttft is not None:
+            entry["ttft_total"] += result.ttft
+            entry["ttft_max"] = max(entry["ttft_max"], result.ttft)
+
+
+def _record_timeout(label: str):
+    with _stats_lock:
+        entry = _entry(label)
+        entry["calls"] += 1
+        entry["timeouts"] += 1
+
+
+def completion_stats() -> dict:
+    with _stats_lock:
+        return {
+            label: {**entry, "ttft_avg": entry["ttft_total"] / max(1, entry["calls"] - entry["timeouts"])}
+            for label, entry in _stats.items()
+        }
+
+
+class _Accumulator:
+    """Collects streamed text in a list and checks the stop conditions as it goes."""
+
+    def __init__(self, max_lines: int | None, max_chars: int | None, max_tokens: int | None):
+        self.max_lines = max_lines
+        self.max_chars = max_chars
+        self.max_chars_for_tokens = max_tokens * CHARS_PER_TOKEN if max_tokens else None
+        self.parts: list[str] = []
+        self.size = 0
+        self.lines: list[str] = []  # complete, non-empty lines
+        self._line: list[str] = []
+
+    def add(self, delta: str) -> str | None:
+        """Adds a chunk; returns the stop reason once a condition is met."""
+        self.parts.append(delta)
+        self.size += len(delta)
+
+        if self.max_lines is not None:
+            *done, rest = delta.split("\n")
+            for piece in done:
+                self._line.append(piece)
+                line = "".join(self._line).strip()
+                self._line = []
+                if line:
+                    self.lines.append(line)
+                    if len(self.lines) >= self.max_lines:
+                        return "lines"
+            self._line.append(rest)
+
+        if self.max_chars is not None and self.size >= self.max_chars:
+            return "max_chars"
+        if self.max_chars_for_tokens is not None and self.size >= self.max_chars_for_tokens:
+            return "max_tokens"
+        return None
+
+    def text(self, stop_reason: str) -> str:
+        if stop_reason == "lines":
+            return "\n".join(self.lines)
+        text = "".join(self.parts)
+        if stop_reason == "max_chars":
+            return text[: self.max_chars]
+        return text
+
+
+async def complete(
+    llm_client: llm.LLM,
+    prompt: str | llm.ChatContext,
+    *,
+    label: str = "completion",
+    max_lines: int | None = None,
+    max_chars: int | None = None,
+    max_tokens: int | None = None,
+    deadline: float | None = None,
+    temperature: float | None = None,
+) -> Completion:
+    """Streams a completion and stops reading as soon as the caller has what it needs.
+
+    - max_lines: stop after this many complete non-empty lines (text is those lines),
+    - max_chars: stop once this much text arrived (text is cut to it),
+    - max_tokens: stop once about this many tokens arrived (estimated from characters,
+      the plugin's chat() takes no max_tokens),
+    - deadline: seconds for the whole call, raises asyncio.TimeoutError.
+    The stream is closed when a condition is met, which also ends the generation.
+    A string prompt is sent as a single system message.
+    """
+    if isinstance(prompt, str):
+        chat_ctx = llm.ChatContext()
+        chat_ctx.messages.append(llm.ChatMessage(role="system", content=prompt))
+    else:
+        chat_ctx = prompt
+
+    started = time.perf_counter()
+    ttft = None
+    acc = _Accumulator(max_lines, max_chars, max_tokens)
+    stream = llm_client.chat(chat_ctx=chat_ctx, temperature=temperature)
+
+    async def _read() -> str:
+        nonlocal ttft
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if not content:
+                continue
+            if ttft is None:
+                ttft = time.perf_counter() - started
+            reason = acc.add(content)
+            if reason is not None:
+                return reason
+        return "end"
+
+    try:
+        stop_reason = await asyncio.wait_for(_read(), deadline)
+    except asyncio.TimeoutError:
+        _record_timeout(label)
+        ttft_text = f"{ttft:.2f}s" if ttft is not None else "-"
+        deadline_text = f"{deadline:.1f}s" if deadline is not None else "no deadline"
+        logger.warning(f"{label}: no complete answer after {deadline_text} (ttft {ttft_text}, {acc.size} chars so far)")
+        raise
+    finally:
+        await stream.aclose()
+
+    result = Completion(text=acc.text(stop_reason), stop_reason=stop_reason, ttft=ttft, elapsed=time.perf_counter() - started)
+    _record(label, result)
+    ttft_text = f"{ttft:.2f}s" if ttft is not None else "-"
+    logger.info(f"{label}: ttft {ttft_text}, total {result.elapsed:.2f}s, {acc.size} chars, stop={stop_reason}")
+    return result
@@ -0,0 +1,194 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger("content-cache")
+logger.setLevel(logging.INFO)
+
+# Shared by every job process on the host (and by the UI container via the example/ volume)
+CACHE_DIR = os.environ.get("INTERVIEW_CACHE_DIR", os.path.join("example", ".cache"))
+
+DEFAULT_TTL = 7 * 24 * 3600  # 1 week
+DEFAULT_MAX_MEMORY_ENTRIES = 256
+DEFAULT_MAX_DISK_ENTRIES = 5000
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace so re-uploads of the same document hash identically."""
+    return _WHITESPACE_RE.sub(" ", text or "").strip()
+
+
+def content_key(*parts: str) -> str:
+    """Builds a stable cache key from already-normalized parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    return digest.hexdigest()
+
+
+class ContentCache:
+    """Two-tier (in-memory LRU + SQLite on disk) cache for JSON-serializable values.
+
+    The SQLite file lives in CACHE_DIR, so all job processes on a worker host share
+    the disk tier while each process keeps its own memory tier.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        *,
+        ttl: float = DEFAULT_TTL,
+        max_memory_entries: int = DEFAULT_MAX_MEMORY_ENTRIES,
+        max_disk_entries: int = DEFAULT_MAX_DISK_ENTRIES,
+    ):
+        self.path = path or os.path.join(CACHE_DIR, "content_cache.sqlite3")
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._disk_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._disk_ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        if not self._disk_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+            conn.commit()
+            self._disk_ready = True
+        return conn
+
+    def _remember(self, key: str, created_at: float, value: Any):
+        with self._lock:
+            self._memory[key] = (created_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _count(self, stat: str, n: int = 1):
+        with self._lock:
+            self._stats[stat] += n
+
+    def get_memory(self, key: str) -> Any | None:
+        """Memory-tier lookup only. Never touches disk."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if now - created_at > self.ttl:
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            return value
+
+    def get(self, key: str) -> Any | None:
+        value = self.get_memory(key)
+        if value is not None:
+            return value
+
+        now = time.time()
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT value, created_at FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] <= self.ttl:
+                    conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+                    conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache lookup failed: {e}")
+            row = None
+
+        if row is None or now - row[1] > self.ttl:
+            self._count("misses")
+            return None
+
+        value = json.loads(row[0])
+        self._remember(key, row[1], value)
+        self._count("disk_hits")
+        return value
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        self._remember(key, now, value)
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now),
+                )
+                evicted = conn.execute("DELETE FROM cache WHERE created_at < ?", (now - self.ttl,)).rowcount
+                evicted += conn.execute(
+                    "DELETE FROM cache WHERE key IN ("
+                    " SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                ).rowcount
+                conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache write failed: {e}")
+            return
+
+        self._count("writes")
+        if evicted:
+            self._count("evictions", evicted)
+
+    async def aget(self, key: str) -> Any | None:
+        """Async lookup: memory hits return inline, disk reads run off the event loop."""
+        value = self.get_memory(key)
+        if value is not None:
+            return value
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any):
+        await asyncio.to_thread(self.set, key, value)
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+_default_cache: ContentCache | None = None
+
+
+def get_default_cache() -> ContentCache:
+    """Process-wide cache instance backed by the shared on-disk tier."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ContentCache()
+    return _default_cache
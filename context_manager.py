@@ -0,0 +1,199 @@
+import logging
+import time
+
+from livekit.agents import llm
+
+from completion import CHARS_PER_TOKEN, complete
+from session_scheduler import SessionScheduler
+
+logger = logging.getLogger("context-manager")
+logger.setLevel(logging.INFO)
+
+DEFAULT_TOKEN_BUDGET = 3000
+DEFAULT_KEEP_TURNS = 4
+# Start summarizing once the prompt reaches this share of the budget, so the
+# summary is usually ready before the budget is actually hit
+SUMMARIZE_AT = 0.75
+SUMMARY_BATCH_TURNS = 2  # folded turns per summary call; until then they are sent verbatim
+SUMMARY_MAX_TOKENS = 500
+SUMMARY_DEADLINE = 30.0
+
+MESSAGE_OVERHEAD = 4  # role/separator tokens per message
+
+SUMMARY_PREFIX = "Summary of the earlier part of the interview:\n"
+SUMMARY_PROMPT = """
+You are keeping notes for an AI interviewer.
+Update the summary of the interview so far with the new messages below.
+Keep every fact the interviewer may need later: what the candidate said about their experience,
+skills and projects, which questions were already asked, and any instructions still in effect.
+Be concise. Return only the updated summary, no preamble.
+
+CURRENT SUMMARY:
+{summary}
+
+NEW MESSAGES:
+{messages}
+"""
+
+
+def estimate_tokens(message: llm.ChatMessage) -> int:
+    content = message.content
+    if isinstance(content, list):
+        content = " ".join(part for part in content if isinstance(part, str))
+    chars = len(content or "")
+    for call in message.tool_calls or []:
+        chars += len(call.function_info.name) + len(call.raw_arguments or "")
+    return MESSAGE_OVERHEAD + chars // CHARS_PER_TOKEN
+
+
+def _render(message: llm.ChatMessage) -> str:
+    content = message.content
+    if isinstance(content, list):
+        content = " ".join(part for part in content if isinstance(part, str))
+    if message.tool_calls:
+        content = f"(called {', '.join(c.function_info.name for c in message.tool_calls)}) {content or ''}"
+    return f"{message.role}: {content or ''}".strip()
+
+
+class ChatContextManager:
+    """Keeps the prompt sent to the LLM within a token budget.
+
+    Used as the VoiceAssistant's before_llm_cb, so it only rewrites the per-reply
+    copy of the chat context; agent.chat_ctx (and the transcript built from it)
+    keeps the full history. Under the budget the copy is sent untouched. Over it,
+    the copy becomes:
+    - the leading system messages, unchanged (a stable prefix for provider-side
+      prompt caching),
+    - the latest stage instruction from the folded part,
+    - a summary of the folded turns, computed in the background,
+    - turns not summarized yet, oldest dropped first if they don't fit,
+    - the last `keep_turns` turns verbatim.
+    Cuts are only made before user messages, so tool calls stay with their results.
+
+    After a function call, VoiceAssistant answers with a second LLM call that does
+    not go through before_llm_cb: it sends this reply's (compacted) copy plus the
+    tool call and its results, and those are not counted against the budget.
+    agent.chat_ctx is never compacted, since the transcript is built from it.
+    """
+
+    def __init__(
+        self,
+        summary_llm: llm.LLM,
+        *,
+        scheduler: SessionScheduler,
+        token_budget: int = DEFAULT_TOKEN_BUDGET,
+        keep_turns: int = DEFAULT_KEEP_TURNS,
+    ):
+        self._llm = summary_llm
+        self._scheduler = scheduler
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+
+        self._summary = ""
+        self._summarized = 0  # history messages (after the prefix) the summary covers
+        self._summary_task = None
+        self._stats = {
+            "replies": 0,
+            "compacted": 0,
+            "summaries": 0,
+            "truncated": 0,  # replies that dropped turns the summary didn't cover yet
+            "max_prompt_tokens": 0,
+            "max_sent_tokens": 0,
+        }
+
+    @property
+    def session_id(self) -> str:
+        return self._scheduler.session_id
+
+    async def before_llm_cb(self, assistant, chat_ctx: llm.ChatContext):
+        """VoiceAssistant before_llm_cb: compacts chat_ctx in place, the default LLM call follows."""
+        self._stats["replies"] += 1
+        messages = chat_ctx.messages
+        total = sum(estimate_tokens(m) for m in messages)
+        self._stats["max_prompt_tokens"] = max(self._stats["max_prompt_tokens"], total)
+
+        prefix_len = 0
+        while prefix_len < len(messages) and messages[prefix_len].role == "system":
+            prefix_len += 1
+        # never fold the played-but-uncommitted reply the assistant appends to the copy,
+        # so indices into the folded part stay valid across replies
+        cut = min(self._recent_cut(messages, prefix_len), len(assistant.chat_ctx.messages))
+
+        unsummarized = messages[prefix_len + self._summarized : cut]
+        if total >= self.token_budget * SUMMARIZE_AT and sum(m.role == "user" for m in unsummarized) >= SUMMARY_BATCH_TURNS:
+            self._start_summary(messages[prefix_len:cut])
+
+        if total <= self.token_budget:
+            self._stats["max_sent_tokens"] = max(self._stats["max_sent_tokens"], total)
+            return None
+
+        chat_ctx.messages = self._compact(messages, prefix_len, cut)
+        sent = sum(estimate_tokens(m) for m in chat_ctx.messages)
+        self._stats["compacted"] += 1
+        self._stats["max_sent_tokens"] = max(self._stats["max_sent_tokens"], sent)
+        logger.info(f"[{self.session_id}] Compacted LLM context: {total} -> {sent} tokens ({len(messages)} -> {len(chat_ctx.messages)} messages)")
+        if sent > self.token_budget:
+            logger.warning(f"[{self.session_id}] The last {self.keep_turns} turns alone exceed the {self.token_budget} token budget.")
+        return None
+
+    def _recent_cut(self, messages: list[llm.ChatMessage], prefix_len: int) -> int:
+        """Index of the user message that starts the last keep_turns turns."""
+        turns = 0
+        for i in range(len(messages) - 1, prefix_len - 1, -1):
+            if messages[i].role == "user":
+                turns += 1
+                if turns == self.keep_turns:
+                    return i
+        return prefix_len
+
+    def _compact(self, messages: list[llm.ChatMessage], prefix_len: int, cut: int) -> list[llm.ChatMessage]:
+        prefix, folded, recent = messages[:prefix_len], messages[prefix_len:cut], messages[cut:]
+        summarized = min(self._summarized, len(folded))
+
+        pinned = [m for m in folded if m.role == "system"][-1:]
+        header = [*prefix, *pinned]
+        if self._summary and summarized:
+            header.append(llm.ChatMessage(role="system", content=SUMMARY_PREFIX + self._summary))
+
+        # folded turns the summary doesn't cover yet: keep what fits, newest first
+        pending = [m for m in folded[summarized:] if m.role != "system"]
+        budget = self.token_budget - sum(estimate_tokens(m) for m in [*header, *recent])
+        start = 0
+        used = 0
+        for i in range(len(pending) - 1, -1, -1):
+            used += estimate_tokens(pending[i])
+            if used > budget:
+                start = next((j for j in range(i + 1, len(pending)) if pending[j].role == "user"), len(pending))
+                self._stats["truncated"] += 1
+                break
+        return [*header, *pending[start:], *recent]
+
+    def _start_summary(self, folded: list[llm.ChatMessage]):
+        if self._summary_task is not None and not self._summary_task.done():
+            return
+        new = [m for m in folded[self._summarized :] if m.role != "system"]
+        self._summary_task = self._scheduler.spawn(self._summarize(new, len(folded)), name="context_summary")
+
+    async def _summarize(self, messages: list[llm.ChatMessage], covered: int):
+        started = time.perf_counter()
+        prompt = SUMMARY_PROMPT.format(
+            summary=self._summary or "(none yet)",
+            messages="\n".join(_render(m) for m in messages),
+        )
+        result = await complete(
+            self._llm, prompt, label="context_summary", max_tokens=SUMMARY_MAX_TOKENS, deadline=SUMMARY_DEADLINE
+        )
+        text = result.text.strip()
+        if not text:
+            logger.warning(f"[{self.session_id}] Empty context summary, keeping the previous one.")
+            return
+        self._summary = text
+        self._summarized = covered
+        self._stats["summaries"] += 1
+        logger.info(
+            f"[{self.session_id}] Summarized {len(messages)} messages in {time.perf_counter() - started:.2f}s "
+            f"({covered} folded messages covered, summary ~{len(text) // CHARS_PER_TOKEN} tokens)"
+        )
+
+    def stats(self) -> dict:
+        return {**self._stats, "summarized_messages": self._summarized}
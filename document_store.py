@@ -0,0 +1,280 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from content_cache import CACHE_DIR, content_key, normalize_text
+
+logger = logging.getLogger("document-store")
+logger.setLevel(logging.INFO)
+
+DOCUMENT_DB = os.path.join(CACHE_DIR, "documents.sqlite3")
+
+DOCUMENT_KINDS = ("resume", "jd")
+
+# Room metadata keys: a document reference, or the inline text (older dispatchers)
+METADATA_REFS = {"resume": "resume_ref", "jd": "jd_ref"}
+METADATA_TEXTS = {"resume": "resume_text", "jd": "job_description"}
+
+
+def resume_id(data: bytes) -> str:
+    """A resume is identified by the hash of the uploaded file."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def jd_id(text: str) -> str:
+    """A JD is identified by its text, so whitespace-only edits map to the same document."""
+    return content_key("jd", normalize_text(text))
+
+
+def resume_id_for_file(path: str) -> str:
+    with open(path, "rb") as f:
+        return resume_id(f.read())
+
+
+def documents_key(resume_ref: str | None, jd_ref: str | None) -> str | None:
+    """Identifies an interview session by its resume and JD, None unless both are known.
+
+    The upload UI and the agent derive it from the same document ids, so the UI
+    can find the artifacts of the interview run on its own uploads.
+    """
+    if not resume_ref or not jd_ref:
+        return None
+    return content_key("documents", resume_ref, jd_ref)
+
+
+def normalize_jd(text: str) -> str:
+    """Unifies line endings and strips trailing whitespace; keeps the markdown layout."""
+    text = text.lstrip("\ufeff").replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(line.rstrip() for line in text.split("\n")).strip()
+
+
+class DocumentStore:
+    """Parsed resumes and JDs keyed by content hash, plus the current upload of each kind.
+
+    The upload UI registers a document as soon as it is saved and fills in its
+    text once preprocessing finishes (status pending -> ready | failed). Agent
+    jobs look documents up here instead of parsing files on the critical path.
+    """
+
+    def __init__(self, path: str = DOCUMENT_DB):
+        self.path = path
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        if not self._ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " doc_id TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " name TEXT,"
+                " text TEXT,"
+                " status TEXT NOT NULL,"  # pending | ready | failed
+                " error TEXT,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            # The file each kind was last uploaded to, to tell whether it changed since
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                " kind TEXT PRIMARY KEY,"
+                " doc_id TEXT NOT NULL,"
+                " path TEXT NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.commit()
+            self._ready = True
+        return conn
+
+    def add(self, kind: str, doc_id: str, *, name: str | None = None, text: str | None = None):
+        """Registers a document; without text it stays pending until set_text()."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            # re-adding a known document never drops its parsed text
+            conn.execute(
+                "INSERT INTO documents (doc_id, kind, name, text, status, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (doc_id) DO UPDATE SET"
+                " name = COALESCE(excluded.name, documents.name),"
+                " text = COALESCE(excluded.text, documents.text),"
+                " status = CASE WHEN excluded.text IS NOT NULL THEN 'ready' ELSE documents.status END,"
+                " updated_at = excluded.updated_at",
+                (doc_id, kind, name, text, "ready" if text is not None else "pending", now, now),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def set_text(self, doc_id: str, text: str):
+        self._update(doc_id, text=text, status="ready", error=None)
+
+    def set_failed(self, doc_id: str, error: str):
+        self._update(doc_id, status="failed", error=error)
+
+    def _update(self, doc_id: str, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        conn = self._connect()
+        try:
+            conn.execute(
+                f"UPDATE documents SET {assignments}, updated_at = ? WHERE doc_id = ?",
+                (*fields.values(), time.time(), doc_id),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get(self, doc_id: str) -> dict | None:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT doc_id, kind, name, text, status, error FROM documents WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        return dict(zip(("doc_id", "kind", "name", "text", "status", "error"), row))
+
+    def text(self, doc_id: str) -> str | None:
+        """Parsed text of a ready document, None if unknown or not parsed (yet)."""
+        doc = self.get(doc_id)
+        return doc["text"] if doc and doc["status"] == "ready" else None
+
+    def set_upload(self, kind: str, doc_id: str, path: str):
+        """Marks `path` (already written) as the current upload of `kind`."""
+        stat = os.stat(path)
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO uploads (kind, doc_id, path, mtime_ns, size, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, doc_id, os.path.abspath(path), stat.st_mtime_ns, stat.st_size, time.time()),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def upload(self, kind: str, path: str | None = None) -> dict | None:
+        """The current upload of `kind` (its document plus "path"), or None if there is none
+        or `path` is not that file anymore.
+
+        Only stats the file: a copy dropped into example/ by hand (different path,
+        size or mtime) is not mistaken for the preprocessed upload.
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT doc_id, path, mtime_ns, size FROM uploads WHERE kind = ?", (kind,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        doc_id, upload_path, mtime_ns, size = row
+        if path is not None:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return None
+            if os.path.abspath(path) != upload_path or (stat.st_mtime_ns, stat.st_size) != (mtime_ns, size):
+                return None
+        doc = self.get(doc_id)
+        return {**doc, "path": upload_path} if doc else None
+
+
+_default_store: DocumentStore | None = None
+
+
+def get_default_document_store() -> DocumentStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = DocumentStore()
+    return _default_store
+
+
+def documents_from_metadata(metadata: str, documents: DocumentStore | None = None) -> dict[str, str]:
+    """Resume and JD text from room metadata, keyed "resume" / "jd" ("" when not given),
+    and the references they were loaded from, keyed "resume_ref" / "jd_ref" ("" for inline text).
+
+    Accepts references into the document store ({"resume_ref": ..., "jd_ref": ...},
+    ids as printed by `python document_store.py add`) and the inline text
+    ({"resume_text": ..., "job_description": ...}); a reference wins when both are set.
+    Raises LookupError for a reference this host can't resolve, rather than
+    interviewing against some other document.
+    """
+    texts = {kind: "" for kind in DOCUMENT_KINDS}
+    texts.update({METADATA_REFS[kind]: "" for kind in DOCUMENT_KINDS})
+    if not metadata:
+        return texts
+    try:
+        data = json.loads(metadata)
+        if not isinstance(data, dict):
+            raise ValueError("not a JSON object")
+    except ValueError as e:
+        logger.warning(f"Failed to parse room metadata: {e}")
+        return texts
+
+    documents = documents or get_default_document_store()
+    for kind in DOCUMENT_KINDS:
+        ref = data.get(METADATA_REFS[kind])
+        if ref:
+            text = documents.text(ref)
+            if text is None:
+                raise LookupError(f"{kind} {ref} is not in the document store (or not parsed yet)")
+            texts[kind] = text
+            texts[METADATA_REFS[kind]] = ref
+            logger.info(f"Loaded {kind} {ref[:12]} from the document store ({len(text)} chars)")
+        elif data.get(METADATA_TEXTS[kind]):
+            texts[kind] = data[METADATA_TEXTS[kind]]
+            logger.info(f"Loaded {kind} from inline metadata ({len(texts[kind])} chars)")
+    return texts
+
+
+def _add(documents: DocumentStore, kind: str, path: str) -> str:
+    with open(path, "rb") as f:
+        data = f.read()
+    if kind == "jd":
+        text = normalize_jd(data.decode("utf-8", errors="replace"))
+        doc_id = jd_id(text)
+    else:
+        from content_cache import get_default_cache
+        from pdf_extract import extract_pdf_text
+
+        doc_id = resume_id(data)
+        text = asyncio.run(extract_pdf_text(path, get_default_cache()))
+    documents.add(kind, doc_id, name=os.path.basename(path), text=text)
+    return doc_id
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Parsed resumes and JDs, referenced from room metadata.")
+    parser.add_argument("--db", default=DOCUMENT_DB)
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="parse and store documents, print the room metadata referencing them")
+    add.add_argument("--resume", help="resume PDF")
+    add.add_argument("--jd", help="job description (text/markdown)")
+    show = sub.add_parser("show", help="print a stored document")
+    show.add_argument("doc_id")
+    args = parser.parse_args()
+
+    store = DocumentStore(args.db)
+    if args.command == "add":
+        metadata = {}
+        for kind, path in (("resume", args.resume), ("jd", args.jd)):
+            if path:
+                metadata[METADATA_REFS[kind]] = _add(store, kind, path)
+        print(json.dumps(metadata))
+    else:
+        print(json.dumps(store.get(args.doc_id), indent=2))
@@ -0,0 +1,181 @@
+import logging
+from collections import deque
+from dataclasses import dataclass
+
+logger = logging.getLogger("endpointing")
+logger.setLevel(logging.INFO)
+
+
+@dataclass(frozen=True)
+class StageWindows:
+    """Silence (seconds) needed to end a turn in one interview stage."""
+
+    base: float  # an ordinary pause
+    shortest: float  # the pause is already longer than any the speaker resumed after
+    longest: float  # cap while lengthening for long answers / hesitations
+
+
+# Keyed by InterviewStage name; the base matches the old fixed min_silence_duration
+STAGE_WINDOWS = {
+    "SELF_INTRODUCTION": StageWindows(base=2.0, shortest=1.2, longest=3.0),
+    "PAST_EXPERIENCE": StageWindows(base=2.0, shortest=1.4, longest=3.5),
+    "RESUME_QUESTIONS": StageWindows(base=2.0, shortest=1.4, longest=3.5),
+    "FEEDBACK": StageWindows(base=1.5, shortest=1.0, longest=2.0),
+}
+DEFAULT_WINDOWS = StageWindows(base=2.0, shortest=1.2, longest=3.0)
+
+# Shape of the smoothed probability inside a pause. It always decays from the
+# threshold first (below 0.15 within ~2 windows of silence), so a low value alone
+# says nothing about the answer being finished; it only rules out noisy pauses.
+CLEAN_PAUSE_PROB = 0.15
+HESITATION_REBOUND = 0.2  # climbed back this much without crossing the threshold: "um", breathing
+
+# The evidence for a finished answer is the speaker's own pause history: once a
+# pause is longer than every recent pause they resumed speaking after (plus a
+# margin), it is unlikely to be another mid-answer pause.
+PAUSE_HISTORY = 20  # resumed pauses remembered per session
+MIN_PAUSE_HISTORY = 3  # fewer than this: always the full base window
+MIN_RECORDED_PAUSE = 0.25  # shorter dips are between words, not pauses
+PAUSE_MARGIN = 0.5  # seconds over the longest resumed pause before a pause counts as final
+
+MIN_COMPLETE_SPEECH = 2.0  # shorter utterances ("yes", "ok") keep the base window
+LONG_ANSWER = 30.0  # answers longer than this get more room to think
+LONG_ANSWER_RAMP = 60.0  # seconds over LONG_ANSWER to reach the longest window
+HESITATION_EXTRA = 0.5
+HESITATION_MEMORY = 1.0  # a rebound only counts for this long; a bump early in a pause doesn't stretch it
+
+
+class EndpointingPolicy:
+    """Decides how much silence ends the candidate's turn.
+
+    One policy per session holds the interview stage and the stats; every VAD
+    stream of the session gets its own tracker(). Only one of them records the
+    pauses and turn ends the policy learns from (the stream whose END_OF_SPEECH
+    ends the turn); the others use the same windows without recording. The window starts from the
+    stage's base and then:
+    - shrinks, down to the stage's shortest, once a clean pause after a real
+      answer outlasts every recent pause the speaker resumed after (plus
+      PAUSE_MARGIN); without enough pause history it never shrinks,
+    - grows for long answers, where a pause is more likely a thoughtful one,
+    - grows when the probability climbs back up without crossing the threshold
+      (hesitation).
+    """
+
+    def __init__(self, stage: str | None = None, session_id: str = "unknown"):
+        self.session_id = session_id
+        self.stage = stage
+        self._stats = {"turns": 0, "shortened": 0, "lengthened": 0, "latency_saved": 0.0}
+        self._resumed_pauses: deque[float] = deque(maxlen=PAUSE_HISTORY)
+
+    @property
+    def windows(self) -> StageWindows:
+        return STAGE_WINDOWS.get(self.stage, DEFAULT_WINDOWS)
+
+    def set_stage(self, stage: str):
+        if stage != self.stage:
+            logger.info(f"[{self.session_id}] Endpointing stage: {self.stage} -> {stage} ({self.windows_for(stage)})")
+            self.stage = stage
+
+    @staticmethod
+    def windows_for(stage: str | None) -> StageWindows:
+        return STAGE_WINDOWS.get(stage, DEFAULT_WINDOWS)
+
+    def tracker(self, *, records: bool = True) -> "EndpointTracker":
+        return EndpointTracker(self, records=records)
+
+    def final_pause(self) -> float | None:
+        """Silence after which this speaker has never resumed lately, None without enough history."""
+        if len(self._resumed_pauses) < MIN_PAUSE_HISTORY:
+            return None
+        return max(self._resumed_pauses) + PAUSE_MARGIN
+
+    def silence_window(self, speech_duration: float, probability: float, hesitating: bool) -> float:
+        w = self.windows
+        extra = 0.0
+        if speech_duration > LONG_ANSWER:
+            extra = (w.longest - w.base) * min(1.0, (speech_duration - LONG_ANSWER) / LONG_ANSWER_RAMP)
+
+        window = w.base
+        if hesitating:
+            window = w.base + HESITATION_EXTRA
+        elif probability < CLEAN_PAUSE_PROB and speech_duration >= MIN_COMPLETE_SPEECH:
+            final_pause = self.final_pause()
+            if final_pause is not None:
+                window = min(w.base, final_pause)
+        return min(max(window + extra, w.shortest), w.longest)
+
+    def _record_pause(self, pause: float, window: float):
+        if pause < MIN_RECORDED_PAUSE:
+            return
+        self._resumed_pauses.append(pause)
+        if pause >= 0.5:
+            logger.info(f"[{self.session_id}] Speech resumed after a {pause:.2f}s pause (turn would end at {window:.2f}s)")
+
+    def _record_endpoint(self, speech_duration: float, window: float, probability: float):
+        saved = self.windows.base - window
+        self._stats["turns"] += 1
+        self._stats["latency_saved"] += saved
+        if saved > 0:
+            self._stats["shortened"] += 1
+        elif saved < 0:
+            self._stats["lengthened"] += 1
+        logger.info(
+            f"[{self.session_id}] End of turn after {window:.2f}s of silence "
+            f"(stage={self.stage}, speech={speech_duration:.1f}s, p={probability:.2f}, "
+            f"saved {saved:+.2f}s vs {self.windows.base:.1f}s)"
+        )
+
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+
+class EndpointTracker:
+    """Per-VAD-stream state: the shape of the current pause.
+
+    The patched VADStream calls update() on every window while the user is
+    speaking and ends the turn once the pause reaches the returned window.
+    With records=False, the pauses and turn ends it sees are not added to the
+    policy's history and stats (another stream of the session records them).
+    """
+
+    def __init__(self, policy: EndpointingPolicy, *, records: bool = True):
+        self._policy = policy
+        self._records = records
+        self._reset()
+
+    def _reset(self):
+        self._pause = 0.0
+        self._pause_min = 1.0
+        self._rebound_at: float | None = None
+        self._probability = 0.0
+        self._window = self._policy.windows.base
+
+    @property
+    def window(self) -> float:
+        """The silence that ends the current turn, as of the last update()."""
+        return self._window
+
+    def update(
+        self, samples_index: int, probability: float, speech_duration: float, silence_duration: float
+    ) -> float:
+        """Returns the silence that ends the turn, given the pause so far (0 while speaking)."""
+        if silence_duration == 0.0:
+            if self._pause > 0.0 and self._records:
+                self._policy._record_pause(self._pause, self._window)
+            self._reset()
+            return self._window
+
+        self._pause = silence_duration
+        self._probability = probability
+        self._pause_min = min(self._pause_min, probability)
+        if probability - self._pause_min >= HESITATION_REBOUND:
+            self._rebound_at = silence_duration
+        hesitating = self._rebound_at is not None and silence_duration - self._rebound_at < HESITATION_MEMORY
+        # the stream's speech_duration keeps counting through the pause itself
+        self._window = self._policy.silence_window(speech_duration - silence_duration, probability, hesitating)
+        return self._window
+
+    def end_of_speech(self, samples_index: int, speech_duration: float):
+        if self._records:
+            self._policy._record_endpoint(speech_duration, self._window, self._probability)
+        self._reset()
@@ -1,8 +1,17 @@
 
 import streamlit as st
 import os
+import sys
+import json
 import shutil
 
+# Shared storage modules live at the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from artifact_store import get_default_store
+from artifact_watch import ArtifactWatcher
+from document_store import documents_key
+from upload_prep import UploadPreprocessor
+
 # Page Config
 st.set_page_config(page_title="AI Interview Manager", page_icon="🤖")
 
@@ -13,30 +22,60 @@ st.markdown("Upload your Resume and Job Description here. The Agent will automat
 EXAMPLE_DIR = "example"
 os.makedirs(EXAMPLE_DIR, exist_ok=True)
 
+READY_CHECK_SECONDS = 2  # how often the page checks the readiness signals (no file reads)
+
+
+@st.cache_resource
+def get_upload_preprocessor() -> UploadPreprocessor:
+    # Extracts text and precomputes questions/title in the background (upload_prep.py)
+    return UploadPreprocessor(EXAMPLE_DIR)
+
+
+preprocessor = get_upload_preprocessor()
+PREP_LABELS = {
+    "pending": "⏳ Preparing in the background...",
+    "ready": "✅ Ready for the interview",
+    "failed": "⚠️ Could not be prepared ahead, the agent will process it when the interview starts",
+}
+
 # 1. Job Description Upload
 st.header("1. Job Description")
 jd_file = st.file_uploader("Upload JD (Markdown/Text)", type=["md", "txt"])
 if jd_file:
-    # Save to example/example_JD.md
-    with open(os.path.join(EXAMPLE_DIR, "example_JD.md"), "wb") as f:
-        f.write(jd_file.getbuffer())
+    jd_id = preprocessor.save_jd(jd_file.name, jd_file.getvalue())
     st.success(f"✅ Saved Job Description: {jd_file.name}")
 
 # 2. Resume Upload
 st.header("2. Resume")
 resume_file = st.file_uploader("Upload Resume (PDF)", type=["pdf"])
 if resume_file:
-    # Clear existing PDFs first to avoid abiguity
-    for f in os.listdir(EXAMPLE_DIR):
-        if f.endswith(".pdf"):
-            os.remove(os.path.join(EXAMPLE_DIR, f))
-    
-    # Save new one
-    save_path = os.path.join(EXAMPLE_DIR, resume_file.name)
-    with open(save_path, "wb") as f:
-        f.write(resume_file.getbuffer())
+    resume_id = preprocessor.save_resume(resume_file.name, resume_file.getvalue())
     st.success(f"✅ Saved Resume: {resume_file.name}")
 
+
+@st.fragment(run_every=READY_CHECK_SECONDS)
+def preparation_status(doc_ids: list[str]):
+    statuses = [preprocessor.status(doc_id) for doc_id in doc_ids]
+    if "failed" in statuses:
+        st.warning(PREP_LABELS["failed"])
+    elif "pending" in statuses:
+        st.info(PREP_LABELS["pending"])
+    else:
+        st.success(PREP_LABELS["ready"])
+
+
+uploaded_ids = []
+if jd_file:
+    uploaded_ids.append(jd_id)
+if resume_file:
+    uploaded_ids.append(resume_id)
+if uploaded_ids:
+    preparation_status(uploaded_ids)
+if jd_file and resume_file:
+    with st.expander("Room metadata for this upload"):
+        # Compact dispatch payload, resolved against the document store on this host
+        st.code(json.dumps({"resume_ref": resume_id, "jd_ref": jd_id}), language="json")
+
 st.markdown("---")
 st.header("3. Start Interview")
 st.info("Files are updated! Please verify your agent is running.")
@@ -50,43 +89,98 @@ if st.button("How to Connect?"):
 
 st.markdown("---")
 st.header("4. Interview Feedback")
-st.markdown("Once the interview is complete, the assessment will appear here.")
+st.markdown("Once the interview is complete, the assessment will appear here automatically.")
+
+# Each interview writes its own files (artifact_store.py). This page only shows the
+# session of the documents uploaded above, or of the room entered here; never
+# another candidate's.
+artifacts = get_default_store()
+room_name = st.text_input("Room name (optional)", help="Show this room's latest session instead of the one for your uploads.")
+room_name = room_name.strip() or None
+if room_name:
+    session = {"room": room_name}
+elif jd_file and resume_file:
+    session = {"documents": documents_key(resume_id, jd_id)}
+else:
+    session = None
+
+
+@st.cache_resource
+def get_artifact_watcher() -> ArtifactWatcher:
+    # One watchdog observer for every browser session of this server
+    watcher = ArtifactWatcher(artifacts)
+    watcher.start()
+    return watcher
+
+
+watcher = get_artifact_watcher()
 
-assessment_path = os.path.join(EXAMPLE_DIR, "assessment.md")
 
-# Simple polling logic (Streamlit auto-reruns on interaction, but for real-time we might need a refresh button or st.empty)
-if st.button("Check for Assessment"):
-    if os.path.exists(assessment_path):
-        with open(assessment_path, "r") as f:
-            content = f.read()
-        
-        st.success("Assessment Generated!")
+def load_latest(kind: str, session: dict) -> tuple[str | None, str | None]:
+    """(job_id, content) of the session's latest `kind` artifact, read from disk only when a new one was written."""
+    session_key = tuple(session.items())
+    if st.session_state.get("artifacts_session") != session_key:
+        # another session (new uploads or room): nothing cached applies to it
+        st.session_state["artifacts_session"] = session_key
+        st.session_state["artifacts"] = {}
+    cache = st.session_state["artifacts"]
+    cached = cache.get(kind)
+    version = watcher.version(kind) if watcher.running else None
+    if cached is not None and version is not None and cached["version"] == version:
+        return cached["job_id"], cached["content"]
+
+    job_id = artifacts.latest(kind, **session)
+    content = None
+    mtime = None
+    if job_id:
+        try:
+            mtime = os.stat(artifacts.path(job_id, kind)).st_mtime_ns
+        except FileNotFoundError:
+            job_id = None
+    if job_id and cached is not None and (cached["job_id"], cached["mtime"]) == (job_id, mtime):
+        content = cached["content"]
+    elif job_id:
+        content = artifacts.get(job_id, kind)
+    cache[kind] = {"version": version, "job_id": job_id, "mtime": mtime, "content": content}
+    return job_id, content
+
+
+@st.fragment(run_every=READY_CHECK_SECONDS)
+def session_outputs(session: dict):
+    # Re-runs on its own; reads files only when this session's artifact changed
+    label = f"room {session['room']}" if "room" in session else "your uploaded resume and job description"
+    st.caption(f"Showing the interview for {label}.")
+    job_id, content = load_latest("assessment", session)
+    if content:
+        st.success(f"Assessment Generated! (session {job_id})")
         st.markdown(content)
         st.download_button(
             label="Download Assessment",
             data=content,
-            file_name="assessment.md",
+            file_name=f"assessment-{job_id}.md",
             mime="text/markdown"
         )
     else:
-        st.warning("Assessment not yet generated. Please finish the interview first.")
+        st.info("Waiting for the assessment... finish the interview and it will show up here.")
 
-st.markdown("---")
-st.header("5. Transcript Download")
-transcript_path = os.path.join(EXAMPLE_DIR, "transcript.json")
-
-if st.button("Check for Transcript"):
-    if os.path.exists(transcript_path):
-        with open(transcript_path, "r") as f:
-            transcript_content = f.read()
-            
-        st.success("Transcript Available!")
+    st.markdown("---")
+    st.header("5. Transcript Download")
+    job_id, transcript_content = load_latest("transcript", session)
+    if transcript_content:
+        st.success(f"Transcript Available! (session {job_id})")
         st.download_button(
             label="Download Transcript (JSON)",
             data=transcript_content,
-            file_name="transcript.json",
+            file_name=f"transcript-{job_id}.json",
             mime="application/json"
         )
     else:
-        st.warning("Transcript not found. Finish the interview first.")
+        st.info("The transcript will be available here once the interview ends.")
+
 
+if session is not None:
+    session_outputs(session)
+else:
+    st.info("Upload your resume and job description above (or enter the room name) to see your interview's results here.")
+    st.markdown("---")
+    st.header("5. Transcript Download")
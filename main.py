@@ -1,14 +1,15 @@
 
 import asyncio
 import logging
-import time
 import os
+import sys
 from enum import Enum, auto
 from typing import Annotated
 import json
 
 from dotenv import load_dotenv
 from livekit.agents import (
+    JobExecutorType,
     WorkerOptions,
     JobContext,
     cli,
@@ -16,16 +17,59 @@ from livekit.agents import (
 )
 from livekit.agents.job import AutoSubscribe
 from livekit.agents.voice_assistant import VoiceAssistant, AssistantTranscriptionOptions
-from livekit.plugins import openai, silero
 from livekit import rtc
 
+from artifact_store import get_default_store
+from assessment_queue import AssessmentQueue
+from client_registry import get_registry
+from client_registry import prewarm as prewarm_clients
+from completion import completion_stats
+from context_manager import ChatContextManager
+from document_store import documents_from_metadata
+from endpointing import EndpointingPolicy
 from resume_processor import ResumeProcessor
+from session_prep import SessionPrep
+from session_scheduler import SessionScheduler, wait_for_disconnect
+from speculative_stt import SpeculativeSTT
+from transcript_store import TranscriptCheckpointer, TranscriptStore
+from tts_cache import CachedTTS, tts_cache_for_job
+from tts_cache import prewarm as prewarm_tts
+from vad_runtime import log_vad_metrics, prewarm as prewarm_vad, vad_for_job, vad_stream_patched
 
 load_dotenv()
 
 logger = logging.getLogger("mock-interview")
 logger.setLevel(logging.INFO)
 
+# Per-step deadlines for session prep (seconds)
+QUESTIONS_PREP_TIMEOUT = 20.0
+JOB_TITLE_PREP_TIMEOUT = 8.0
+VAD_PREP_TIMEOUT = 30.0
+
+# Stage time limits (seconds)
+INTRO_TIME_LIMIT = 60.0
+EXPERIENCE_TIME_LIMIT = 300.0  # 5 minutes
+
+# Pause after which the user's segment is sent to STT ahead of the 2s end of speech
+SPECULATIVE_STT_PAUSE = 0.4
+
+# Prompt budget per LLM reply; older turns are folded into a running summary
+# (agent.chat_ctx and the saved transcript keep everything)
+CONTEXT_TOKEN_BUDGET = 3000
+CONTEXT_KEEP_TURNS = 4
+
+# JOB_EXECUTOR=thread runs jobs as threads of one process, so concurrent sessions
+# share the Silero session and its batched inference engine (see vad_runtime)
+JOB_EXECUTOR_TYPE = JobExecutorType(os.getenv("JOB_EXECUTOR", JobExecutorType.PROCESS.value))
+
+# Fixed lines, synthesized once per worker host (tts_cache) and played from memory
+GREETING = "Hello! Welcome to the interview."
+INTRO_REQUEST = "Please briefly introduce yourself in 1 minute."
+INTRO_TIME_UP = "Time's up! Thank you for the introduction. Let's move on."
+EXPERIENCE_TIME_UP = "We are running out of time for this section. Let's move to the conclusion."
+GOODBYE = "Thank you for your time. We will review your application and get back to you. Goodbye!"
+FIXED_UTTERANCES = (GREETING, INTRO_REQUEST, INTRO_TIME_UP, EXPERIENCE_TIME_UP, GOODBYE)
+
 class InterviewStage(Enum):
     SELF_INTRODUCTION = auto()
     PAST_EXPERIENCE = auto()
@@ -53,13 +97,25 @@ RESUME_PROMPT_TEMPLATE = """
 """
 
 class InterviewManager:
-    def __init__(self, resume_processor: ResumeProcessor, job_id: str = "unknown"):
+    def __init__(self, resume_processor: ResumeProcessor, job_id: str = "unknown", scheduler: SessionScheduler | None = None):
         self.stage = InterviewStage.SELF_INTRODUCTION
+        # Adapts the end-of-turn silence to the stage; shared by the session's VAD streams
+        self.endpointing = EndpointingPolicy(stage=self.stage.name, session_id=job_id)
         self.agent: VoiceAssistant | None = None
         self.job_id = job_id
+        self.scheduler = scheduler or SessionScheduler(job_id)
         self.resume_processor = resume_processor
         self.resume_questions = []
         self.transcript = []
+        self.checkpointer = TranscriptCheckpointer(TranscriptStore(), job_id, self.get_transcript_json)
+        self.assessment_queue = AssessmentQueue()
+
+    def attach_agent(self, agent: VoiceAssistant):
+        """Binds the assistant and checkpoints the transcript on every committed turn."""
+        self.agent = agent
+        for event in ("user_speech_committed", "agent_speech_committed", "agent_speech_interrupted"):
+            agent.on(event, lambda *_: self.checkpointer.notify())
+        self.checkpointer.start()
 
     def get_transcript(self):
         # In a real app we'd capture actual text, here we rely on what we have or VAD events
@@ -77,6 +133,10 @@ class InterviewManager:
             return "Already in Past Experience stage."
 
         self.stage = InterviewStage.PAST_EXPERIENCE
+        self.endpointing.set_stage(self.stage.name)
+        self.scheduler.cancel_deadline("self_introduction")
+        # Only a real stage change starts the timer, so repeated tool calls don't stack timers
+        self.scheduler.set_deadline("past_experience", EXPERIENCE_TIME_LIMIT, self._on_experience_time_limit)
         
         if self.agent:
             # USE SPECIFIC RESUME QUESTION HERE
@@ -90,26 +150,40 @@ class InterviewManager:
                     content=f"Transition triggered. Reason: {reason}. Update instructions: {PAST_EXP_PROMPT}. IMMEDIATE ACTION: Ask the candidate this specific question based on their resume: '{question}'",
                 )
             )
+            self.checkpointer.notify()
             # Removed explicit agent.say to prevent double speaking. LLM will generate response based on new prompt.
             
         return "Transition successful. Stage is now PAST_EXPERIENCE. Proceed with the question."
 
-    async def monitor_experience_duration(self, agent: VoiceAssistant):
+    async def _on_intro_time_limit(self):
+        """Hard limit of 1 minute for the Self-Introduction stage."""
+        if self.stage == InterviewStage.SELF_INTRODUCTION:
+            logger.info("Self-Introduction time limit reached.")
+            agent = self.agent
+
+            # Log last user input if possible (retrieving from chat context)
+            if agent.chat_ctx.messages and agent.chat_ctx.messages[-1].role == "user":
+                logger.info(f"User cached input before timeout: {agent.chat_ctx.messages[-1].content}")
+            else:
+                logger.info("User cached input not found or last message was system/agent.")
+
+            await agent.say(INTRO_TIME_UP, allow_interruptions=False)
+            await self.transition_to_experience(f"Time limit reached ({INTRO_TIME_LIMIT:.0f}s)")
+
+    async def _on_experience_time_limit(self):
         """Hard limit of 5 minutes for Past Experience (Resume Question) stage."""
-        logger.info("Starting 5-minute timer for Past Experience stage.")
-        await asyncio.sleep(300) # 5 minutes
         if self.stage == InterviewStage.PAST_EXPERIENCE:
             logger.info("Past Experience time limit reached (5 mins).")
-            await agent.say("We are running out of time for this section. Let's move to the conclusion.", allow_interruptions=False)
+            await self.agent.say(EXPERIENCE_TIME_UP, allow_interruptions=False)
             await self.end_interview()
     
 
             
-    def get_transcript_json(self):
-        """Returns the transcript as a JSON-serializable list."""
+    def get_transcript_json(self, start: int = 0):
+        """Returns the transcript (from message index `start`) as a JSON-serializable list."""
         if self.agent and self.agent.chat_ctx:
             transcript = []
-            for m in self.agent.chat_ctx.messages:
+            for m in self.agent.chat_ctx.messages[start:]:
                 # Filter out system messages for cleaner history if desired, but user might want debug info.
                 # Let's keep everything but maybe mark system?
                 transcript.append({
@@ -120,75 +194,48 @@ class InterviewManager:
             return transcript
         return []
 
-    def save_transcript(self):
-        """Saves or appends the current transcript to transcript.json."""
-        if not self.agent or not self.agent.chat_ctx:
-            return
-
-        try:
-            transcript_new_session = {
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "job_id": self.job_id,
-                "transcript": self.get_transcript_json()
-            }
-            
-            transcript_path = "example/transcript.json"
-            all_transcripts = []
-            
-            # Read existing
-            if os.path.exists(transcript_path):
-                try:
-                    with open(transcript_path, "r") as f:
-                        data = json.load(f)
-                        if isinstance(data, list):
-                            all_transcripts = data
-                        else:
-                            all_transcripts = [{"legacy": True, "data": data}]
-                except json.JSONDecodeError:
-                    pass
-            
-            # Check if we already saved this job_id in this run to avoid duplicates if called multiple times?
-            # Or just append. Appending multiple times might duplicate if called on update.
-            # Ideally we update the existing entry if job_id matches!
-            
-            updated = False
-            for i, session in enumerate(all_transcripts):
-                if session.get("job_id") == self.job_id:
-                     all_transcripts[i] = transcript_new_session
-                     updated = True
-                     break
-            
-            if not updated:
-                all_transcripts.append(transcript_new_session)
-            
-            with open(transcript_path, "w") as f:
-                json.dump(all_transcripts, f, indent=2)
-            logger.info("Transcript saved to example/transcript.json")
-        except Exception as e:
-            logger.error(f"Failed to save transcript: {e}")
+    async def save_transcript(self):
+        """Writes any messages not yet checkpointed to the transcript store."""
+        await self.checkpointer.flush()
 
     async def end_interview(self):
         logger.info("Ending interview and generating assessment.")
         self.stage = InterviewStage.FEEDBACK
+        self.endpointing.set_stage(self.stage.name)
+        self.scheduler.cancel_deadline("self_introduction")
+        self.scheduler.cancel_deadline("past_experience")
         
-        transcript = self.get_transcript()
+        transcript = self.get_transcript_json()
         
-        self.save_transcript()
+        await self.save_transcript()
 
         if self.agent:
-            await self.agent.say("Thank you for your time. We will review your application and get back to you. Goodbye!", allow_interruptions=False)
-            
-            # Generate assessment in background
-            asyncio.create_task(self._generate_assessment_silent(transcript))
-            
+            # Queued on disk before the goodbye, so the report survives this process;
+            # the assessment consumer (assessment_queue.py) generates it
+            payload = {"jd_text": self.resume_processor.jd_text, "transcript": transcript}
+            try:
+                await asyncio.to_thread(self.assessment_queue.enqueue, self.job_id, payload)
+            except Exception as e:
+                logger.error(f"Could not queue the assessment, generating it in this job instead: {e}")
+                self.scheduler.spawn(self._generate_assessment_silent(transcript), name="assessment", critical=True)
+
+            await self.agent.say(GOODBYE, allow_interruptions=False)
+
     async def _generate_assessment_silent(self, transcript):
         try:
             logger.info("Generating assessment in background...")
-            await self.resume_processor.generate_assessment(self.agent.llm, transcript)
+            await self.resume_processor.generate_assessment(self.agent.llm, transcript, job_id=self.job_id)
             logger.info("Assessment generated successfully.")
         except Exception as e:
             logger.error(f"Failed to generate assessment: {e}")
 
+async def register_artifacts(job_id: str, **owner):
+    """Indexes this job's outputs under its room/candidate; the interview goes on without it."""
+    try:
+        await asyncio.to_thread(get_default_store().register_job, job_id, **owner)
+    except Exception as e:
+        logger.warning(f"Could not register job {job_id} in the artifact store: {e}")
+
 async def wait_for_participant(room: rtc.Room) -> rtc.RemoteParticipant:
     if room.remote_participants:
         return list(room.remote_participants.values())[0]
@@ -206,32 +253,30 @@ async def wait_for_participant(room: rtc.Room) -> rtc.RemoteParticipant:
     await event.wait()
     return participant
 
-async def entrypoint(ctx: JobContext):
+async def load_session_documents(ctx: JobContext) -> ResumeProcessor | None:
+    """Connects to the room and loads its resume and JD; None if they can't be found."""
     await ctx.connect(auto_subscribe=AutoSubscribe.AUDIO_ONLY)
     logger.info(f"Room connected: {ctx.room.name}")
+    await register_artifacts(ctx.job.id, room=ctx.room.name)
     
-    # Metadata parsing for Production Resume/JD
-    resume_text = ""
-    jd_text = ""
+    # Resume/JD from the room metadata: references into the local document store
+    # (resume_ref / jd_ref) or inline text; missing ones come from example/
     try:
-        if ctx.room.metadata:
-            logger.info(f"Parsing room metadata: {ctx.room.metadata[:50]}...")
-            data = json.loads(ctx.room.metadata)
-            resume_text = data.get("resume_text", "")
-            jd_text = data.get("job_description", "")
-            if resume_text or jd_text:
-                logger.info(f"Loaded dynamic context from metadata (Resume len: {len(resume_text)}, JD len: {len(jd_text)})")
-    except Exception as e:
-        logger.warning(f"Failed to parse room metadata: {e}")
+        documents = await asyncio.to_thread(documents_from_metadata, ctx.room.metadata)
+    except LookupError as e:
+        logger.error(f"Critical Error: {e}")
+        return None
 
     # Initialize Resume Processor with potential overrides
     rp = ResumeProcessor(
         example_dir="example", 
-        resume_text=resume_text, 
-        jd_text=jd_text
+        resume_text=documents["resume"], 
+        jd_text=documents["jd"],
+        resume_ref=documents["resume_ref"] or None,
+        jd_ref=documents["jd_ref"] or None,
     )
     try:
-        rp.load_documents()
+        await rp.load_documents()
     except FileNotFoundError as e:
         logger.error(f"Critical Error: {e}")
         # We need a way to communicate this to the user even if connection is fresh
@@ -240,21 +285,87 @@ async def entrypoint(ctx: JobContext):
         # User asked to "holds the process".
         # If we return here, the worker might restart. 
         # But let's at least stop the interview logic.
+        return None
+    if rp.documents_key:
+        # lets the upload UI find this interview's outputs by the documents it uploaded
+        await register_artifacts(ctx.job.id, documents=rp.documents_key)
+    return rp
+
+async def entrypoint(ctx: JobContext):
+    # Shared LLM/STT/TTS clients of this job's loop; the prewarmed connection may
+    # have idled out while the process waited for a job, so refresh it early
+    clients = get_registry()
+    warm_up_task = asyncio.create_task(clients.warm_up())
+    try:
+        rp = await load_session_documents(ctx)
+    except BaseException:
+        warm_up_task.cancel()
+        raise
+    if rp is None:
+        warm_up_task.cancel()
         return
+    # The prep requests below then reuse the warm connection instead of racing
+    # it with one of their own (warm_up gives up after WARM_UP_TIMEOUT)
+    await warm_up_task
 
-    manager = InterviewManager(rp, job_id=ctx.job.id)
+    scheduler = SessionScheduler(ctx.job.id)
+    manager = InterviewManager(rp, job_id=ctx.job.id, scheduler=scheduler)
     
-    # Pre-generate questions if resume is present
-    # We need an LLM instance. We can create a temporary one or wait?
-    # Let's create one.
-    temp_llm = openai.LLM()
+    # Session prep: question generation, title extraction, VAD loading and the
+    # participant wait are independent, so run them side by side instead of
+    # paying for each one on the candidate-visible cold start.
+    temp_llm = clients.llm()
+    prep = SessionPrep()
     if rp.resume_text:
         logger.info("Generating interview questions...")
-        manager.resume_questions = await rp.generate_questions(temp_llm)
-        logger.info(f"Generated questions: {manager.resume_questions}")
+        questions_task = prep.start("questions", rp.generate_questions(temp_llm), timeout=QUESTIONS_PREP_TIMEOUT, fallback=[])
+
+        # Questions are only needed once the introduction is over, so nothing waits on them.
+        def _on_questions_ready(task: asyncio.Task):
+            if task.cancelled() or task.exception():
+                return
+            manager.resume_questions = task.result()
+            logger.info(f"Generated questions: {manager.resume_questions}")
+
+        questions_task.add_done_callback(_on_questions_ready)
     else:
         logger.warning("No resume text found, skipping question generation.")
 
+    job_title = "exciting"
+    if rp.jd_text:
+        prep.start("job_title", rp.extract_job_title(temp_llm), timeout=JOB_TITLE_PREP_TIMEOUT, fallback=job_title)
+
+    # Voice Assistant with VAD=2.0s (User Request) and threshold=0.6.
+    # The ONNX session is prewarmed per worker process; this only falls back to
+    # loading it here if prewarm did not run.
+    # min_silence_duration is the fallback; the endpointing policy picks the actual window per pause
+    vad_options = dict(
+        min_silence_duration=2.0,
+        activation_threshold=0.6,
+        max_buffered_speech=300.0,
+        endpointing=manager.endpointing,
+    )
+    prep.start(
+        "vad",
+        asyncio.to_thread(
+            vad_for_job,
+            ctx.proc,
+            # VoiceAssistant only reads probability/speaking from per-window events
+            inference_frames="none",
+            **vad_options,
+        ),
+        timeout=VAD_PREP_TIMEOUT,
+    )
+    # Same endpointing for the STT side, but with per-window audio so the
+    # segment can be transcribed during the end-of-speech pause. Its streams use
+    # the policy's windows; only the assistant's VAD records pauses into it.
+    prep.start(
+        "stt_vad",
+        asyncio.to_thread(vad_for_job, ctx.proc, inference_frames="lazy", endpointing_records=False, **vad_options),
+        timeout=VAD_PREP_TIMEOUT,
+    )
+    prep.start("participant", wait_for_participant(ctx.room), timeout=None)
+
     # Tool Context
     fnc_ctx = llm.FunctionContext()
 
@@ -262,7 +373,6 @@ async def entrypoint(ctx: JobContext):
     async def transition_to_experience(
         reason: Annotated[str, llm.TypeInfo(description="Reason for transition")]
     ):
-        asyncio.create_task(manager.monitor_experience_duration(agent))
         return await manager.transition_to_experience(reason)
         
     @fnc_ctx.ai_callable(description="Call when candidate has answered the technical question and interview is over.")
@@ -277,64 +387,84 @@ async def entrypoint(ctx: JobContext):
         llm.ChatMessage(role="system", content=SELF_INTRO_PROMPT)
     )
 
-    # Voice Assistant with VAD=2.0s (User Request) and threshold=0.6
+    try:
+        vad = await prep.get("vad")
+        stt_vad = await prep.get("stt_vad")
+    except BaseException:
+        await prep.aclose()
+        raise
+
+    tts_cache = tts_cache_for_job(ctx.proc, FIXED_UTTERANCES)
+    context = ChatContextManager(
+        temp_llm, scheduler=scheduler, token_budget=CONTEXT_TOKEN_BUDGET, keep_turns=CONTEXT_KEEP_TURNS
+    )
     agent = VoiceAssistant(
-        vad=silero.VAD.load(
-            min_silence_duration=2.0, 
-            activation_threshold=0.6,
-            max_buffered_speech=300.0,
-        ), 
-        stt=openai.STT(),
-        llm=openai.LLM(),
-        tts=openai.TTS(),
+        vad=vad,
+        stt=SpeculativeSTT(stt=clients.stt(), vad=stt_vad, speculative_pause=SPECULATIVE_STT_PAUSE),
+        llm=clients.llm(),
+        tts=CachedTTS(clients.tts(), tts_cache),
         chat_ctx=initial_ctx,
         fnc_ctx=fnc_ctx,
+        before_llm_cb=context.before_llm_cb,
         transcription=AssistantTranscriptionOptions(
             agent_transcription=True,
             user_transcription=True,
         ),
     )
     
-    manager.agent = agent
+    manager.attach_agent(agent)
 
-    participant = await wait_for_participant(ctx.room)
+    try:
+        participant = await prep.get("participant")
+    except BaseException:
+        await prep.aclose()
+        raise
     agent.start(ctx.room, participant)
-    
-    # Job Title extraction
-    job_title = "exciting"
+    await register_artifacts(ctx.job.id, candidate=participant.identity)
+
+    # The opening line only needs the agent and the participant, so it plays
+    # while the job title may still be in flight.
+    await agent.say(GREETING, allow_interruptions=False)
+
     if rp.jd_text:
-        job_title = await rp.extract_job_title(temp_llm)
+        job_title = await prep.get("job_title")
         logger.info(f"Extracted Job Title: {job_title}")
 
-    await agent.say("Hello! Welcome to the interview.", allow_interruptions=False)
     await agent.say(f"I see you've applied for the {job_title} role.", allow_interruptions=False)
-    await agent.say("Please briefly introduce yourself in 1 minute.", allow_interruptions=True)
+    await agent.say(INTRO_REQUEST, allow_interruptions=True)
     
-    async def monitor_intro_duration():
-        await asyncio.sleep(60)
-        if manager.stage == InterviewStage.SELF_INTRODUCTION:
-            logger.info("Self-Introduction time limit reached.")
-            
-            # Log last user input if possible (retrieving from chat context)
-            if agent.chat_ctx.messages and agent.chat_ctx.messages[-1].role == "user":
-                logger.info(f"User cached input before timeout: {agent.chat_ctx.messages[-1].content}")
-            else:
-                logger.info("User cached input not found or last message was system/agent.")
-                
-            await agent.say("Time's up! Thank you for the introduction. Let's move on.", allow_interruptions=False)
-            await manager.transition_to_experience("Time limit reached (60s)")
-
-    asyncio.create_task(monitor_intro_duration())
+    scheduler.set_deadline("self_introduction", INTRO_TIME_LIMIT, manager._on_intro_time_limit)
 
-    # Loop
     try:
-        while ctx.room.connection_state == rtc.ConnectionState.CONN_CONNECTED:
-            await asyncio.sleep(1)
-            # Optional: Periodic save
-            # if time.time() % 30 == 0: manager.save_transcript()
+        await wait_for_disconnect(ctx.room)
     finally:
         logger.info("Session disconnected. Saving final transcript...")
-        manager.save_transcript()
+        await manager.save_transcript()
+        try:
+            transcript = json.dumps(manager.get_transcript_json(), indent=2)
+            await asyncio.to_thread(get_default_store().put, ctx.job.id, "transcript", transcript)
+        except Exception as e:
+            logger.error(f"Failed to store the session transcript: {e}")
+        # a prep step can outlive the session, e.g. questions when the candidate leaves early
+        await prep.aclose()
+        await scheduler.aclose()
+        await manager.checkpointer.aclose()
+        logger.info(f"Content cache stats: {rp.cache.stats()}")
+        log_vad_metrics(vad, ctx.job.id)
+        log_vad_metrics(stt_vad, ctx.job.id)
+        logger.info(f"Speculative STT stats: {agent.stt.stats()}")
+        logger.info(f"Endpointing stats: {manager.endpointing.stats()}")
+        logger.info(f"TTS cache stats: {tts_cache.stats()}")
+        logger.info(f"LLM context stats: {context.stats()}")
+        logger.info(f"OpenAI connection stats: {clients.stats()}")
+        logger.info(f"LLM completion stats: {completion_stats()}")
+
+
+def prewarm(proc):
+    """Loads the Silero VAD, the OpenAI connection and the fixed lines' audio once per worker process."""
+    prewarm_vad(proc)
+    prewarm_clients(proc)
+    prewarm_tts(proc, FIXED_UTTERANCES)
 
 
 import subprocess
@@ -354,12 +484,20 @@ def pre_start_cleanup():
     except Exception as e:
         logger.warning(f"Could not apply VAD patch at runtime: {e}. Assuming patched at build time.")
 
+    # This process imported vad.py above, before the patch: restart once so
+    # thread-executor jobs load the patched class too (job processes import it fresh)
+    if not vad_stream_patched() and os.environ.get("VAD_PATCH_RESTARTED") != "1":
+        logger.info("Restarting to load the patched VAD...")
+        os.environ["VAD_PATCH_RESTARTED"] = "1"
+        os.execv(sys.executable, [sys.executable, *sys.argv])
+
 if __name__ == "__main__":
     pre_start_cleanup()
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint,
-
+            prewarm_fnc=prewarm,
+            job_executor_type=JOB_EXECUTOR_TYPE,
         ),
     )
 
@@ -1,30 +1,65 @@
 
 import os
+import sys
 import textwrap
 
 import importlib.util
-spec = importlib.util.find_spec("livekit.plugins.silero")
-if not spec or not spec.origin:
-    print("Could not find livekit.plugins.silero")
-    exit(1)
-target_file = os.path.join(os.path.dirname(spec.origin), "vad.py")
+
+# Patches the installed silero vad.py, or the copy of it given as the only argument
+if len(sys.argv) > 1:
+    target_file = sys.argv[1]
+else:
+    spec = importlib.util.find_spec("livekit.plugins.silero")
+    if not spec or not spec.origin:
+        print("Could not find livekit.plugins.silero")
+        exit(1)
+    target_file = os.path.join(os.path.dirname(spec.origin), "vad.py")
 print(f"Targeting file: {target_file}")
 
 new_vad_stream_code = """
 class VADStream(agents.vad.VADStream):
     def __init__(
-        self, vad: VAD, opts: _VADOptions, model: onnx_model.OnnxModel
+        self,
+        vad: VAD,
+        opts: _VADOptions,
+        model: onnx_model.OnnxModel,
+        *,
+        inference_engine=None,
+        max_backlog: float | None = 0.5,
+        inference_frames: str = "copy",
+        endpointing=None,
     ) -> None:
         super().__init__()
         self._opts, self._model = opts, model
         self._loop = asyncio.get_event_loop()
 
-        self._executor = ThreadPoolExecutor(max_workers=1)
-        self._task.add_done_callback(lambda _: self._executor.shutdown(wait=False))
+        # what INFERENCE_DONE events carry in `frames`: "copy" (a new frame per
+        # window), "lazy" (a slice of a shared history, made a frame only when read) or "none"
+        if inference_frames not in ("copy", "lazy", "none"):
+            raise ValueError(f"invalid inference_frames: {inference_frames}")
+        self._inference_frames = inference_frames
+
+        # optional per-stream endpoint tracker (endpointing.EndpointTracker in the
+        # app): decides the silence that ends speech instead of min_silence_duration
+        self._endpointing = endpointing
+
+        # inference_engine: optional worker-level engine that batches windows
+        # across streams (see vad_engine.BatchedVADEngine in the app).
+        # Without it, windows run on the process-wide inference pool.
+        self._inference = None
+        if inference_engine is not None:
+            self._inference = inference_engine.register()
+            self._task.add_done_callback(lambda _: self._inference.close())
+
+        # when more than max_backlog seconds of audio are waiting, windows are
+        # coalesced (the last probability is reused) until the stream catches up.
+        # None disables it, e.g. for offline runs that push audio faster than realtime
+        self._max_backlog = max_backlog
+        self._metrics = _InferenceMetrics()
         self._exp_filter = utils.ExpFilter(alpha=0.35)
 
         self._input_sample_rate = 0
-        self._speech_buffer: np.ndarray | None = None
+        self._speech_buffer: _SpeechBuffer | None = None
         self._speech_buffer_max_reached = False
         self._prefix_padding_samples = 0  # (input_sample_rate)
 
@@ -59,7 +94,7 @@ class VADStream(agents.vad.VADStream):
                 self._opts.prefix_padding_duration * self._input_sample_rate
             )
 
-            self._speech_buffer.resize(
+            self._speech_buffer.max_samples = (
                 int(self._opts.max_buffered_speech * self._input_sample_rate)
                 + self._prefix_padding_samples
             )
@@ -71,7 +106,6 @@ class VADStream(agents.vad.VADStream):
     async def _main_task(self):
         try:
             inference_f32_data = np.empty(self._model.window_size_samples, dtype=np.float32)
-            speech_buffer_index: int = 0
 
             # "pub_" means public, these values are exposed to the users through events
             pub_speaking = False
@@ -83,14 +117,20 @@ class VADStream(agents.vad.VADStream):
             speech_threshold_duration = 0.0
             silence_threshold_duration = 0.0
 
-            input_frames = []
-            inference_frames = []
+            # preallocated once the input sample rate is known; windows are read
+            # from them as views, so the hot loop does not merge or copy frames
+            input_ring: _AudioRingBuffer | None = None
+            inference_ring: _AudioRingBuffer | None = None
             resampler: rtc.AudioResampler | None = None
 
             # used to avoid drift when the sample_rate ratio is not an integer
             input_copy_remaining_fract = 0.0
 
             extra_inference_time = 0.0
+            last_raw_p: float | None = None
+
+            # "lazy" frames are slices of append-only blocks the windows are copied into
+            window_history: _WindowHistory | None = None
 
             async for input_frame in self._input_ch:
                 if not isinstance(input_frame, rtc.AudioFrame):
@@ -104,12 +144,25 @@ class VADStream(agents.vad.VADStream):
                         self._opts.prefix_padding_duration * self._input_sample_rate
                     )
 
-                    self._speech_buffer = np.empty(
-                        int(self._opts.max_buffered_speech * self._input_sample_rate)
+                    # grows in chunks as speech comes in, up to max_buffered_speech
+                    self._speech_buffer = _SpeechBuffer(
+                        chunk_samples=max(
+                            self._input_sample_rate, 2 * self._prefix_padding_samples
+                        ),
+                        max_samples=int(
+                            self._opts.max_buffered_speech * self._input_sample_rate
+                        )
                         + self._prefix_padding_samples,
-                        dtype=np.int16,
                     )
 
+                    # 0.5s of headroom each; the rings grow if a burst ever exceeds that
+                    input_ring = _AudioRingBuffer(self._input_sample_rate // 2)
+                    inference_ring = _AudioRingBuffer(
+                        max(self._opts.sample_rate // 2, self._model.window_size_samples)
+                    )
+                    if self._inference_frames == "lazy":
+                        window_history = _WindowHistory(self._input_sample_rate)
+
                     if self._input_sample_rate != self._opts.sample_rate:
                         # resampling needed: the input sample rate isn't the same as the model's
                         # sample rate used for inference
@@ -124,40 +177,58 @@ class VADStream(agents.vad.VADStream):
                     continue
 
                 assert self._speech_buffer is not None
+                assert input_ring is not None and inference_ring is not None
 
-                input_frames.append(input_frame)
+                # AudioFrame.data is an int16 memoryview, so these are views, not copies
+                input_samples = np.frombuffer(input_frame.data, dtype=np.int16)
+                input_ring.write(input_samples)
                 if resampler is not None:
                     # the resampler may have a bit of latency, but it is OK to ignore since it should be
                     # negligible
-                    inference_frames.extend(resampler.push(input_frame))
+                    for resampled_frame in resampler.push(input_frame):
+                        inference_ring.write(np.frombuffer(resampled_frame.data, dtype=np.int16))
                 else:
-                    inference_frames.append(input_frame)
+                    inference_ring.write(input_samples)
 
-                while True:
+                frame_duration = input_frame.samples_per_channel / self._input_sample_rate
+
+                while len(inference_ring) >= self._model.window_size_samples:
                     start_time = time.perf_counter()
 
-                    available_inference_samples = sum(
-                        [frame.samples_per_channel for frame in inference_frames]
+                    # audio waiting for inference: what is left in the ring plus
+                    # the frames still queued in the input channel
+                    backlog = (
+                        len(inference_ring) / self._opts.sample_rate
+                        + self._input_ch.qsize() * frame_duration
                     )
-                    if available_inference_samples < self._model.window_size_samples:
-                        break  # not enough samples to run inference
-
-                    input_frame = utils.merge_frames(input_frames)
-                    inference_frame = utils.merge_frames(inference_frames)
-
-                    # convert data to f32
-                    np.divide(
-                        inference_frame.data[: self._model.window_size_samples],
-                        np.iinfo(np.int16).max,
-                        out=inference_f32_data,
-                        dtype=np.float32,
+                    coalesce = (
+                        self._max_backlog is not None
+                        and backlog > self._max_backlog
+                        and last_raw_p is not None
                     )
 
-                    # run the inference
-                    p = await self._loop.run_in_executor(
-                        self._executor, self._model, inference_f32_data
-                    )
-                    p = self._exp_filter.apply(exp=1.0, sample=p)
+                    if coalesce:
+                        raw_p = last_raw_p
+                    else:
+                        # convert data to f32
+                        np.divide(
+                            inference_ring.peek(self._model.window_size_samples),
+                            np.iinfo(np.int16).max,
+                            out=inference_f32_data,
+                            dtype=np.float32,
+                        )
+
+                        # run the inference
+                        if self._inference is not None:
+                            raw_p = await asyncio.wrap_future(
+                                self._inference.submit(inference_f32_data)
+                            )
+                        else:
+                            raw_p = await asyncio.wrap_future(
+                                _submit_inference(self._model, inference_f32_data)
+                            )
+                        last_raw_p = raw_p
+                    p = self._exp_filter.apply(exp=1.0, sample=raw_p)
 
                     window_duration = (
                         self._model.window_size_samples / self._opts.sample_rate
@@ -174,39 +245,16 @@ class VADStream(agents.vad.VADStream):
                     to_copy_int = int(to_copy)
                     input_copy_remaining_fract = to_copy - to_copy_int
 
+                    # the input samples matching this inference window
+                    input_window = input_ring.peek(min(to_copy_int, len(input_ring)))
+
                     # copy the inference window to the speech buffer
-                    available_space = len(self._speech_buffer) - speech_buffer_index
-                    to_copy_buffer = min(to_copy_int, available_space)
-                    if to_copy_buffer > 0:
-                        # FIX: Use np.frombuffer to safely copy bytes to int16 array
-                        data_bytes = input_frame.data[:to_copy_buffer * 2] # 2 bytes per sample
-                        
-                        # Handle potential shortness
-                        if len(data_bytes) < to_copy_buffer * 2:
-                             # Just use what we have, though this implies logic mismatch
-                             pass
-
-                        data_int16 = np.frombuffer(data_bytes, dtype=np.int16)
-                        
-                        # CRITICAL FIX: Handle race condition where speech_buffer shrunk
-                        dest_slice = self._speech_buffer[
-                            speech_buffer_index : speech_buffer_index + to_copy_buffer
-                        ]
-                        
-                        if len(data_int16) > len(dest_slice):
-                            # Truncate source data to match shrunk buffer
-                            data_int16 = data_int16[:len(dest_slice)]
-                            # logger.warning(f"Truncated VAD data from {len(data_bytes)//2} to {len(dest_slice)} due to buffer resize")
-
-                        self._speech_buffer[
-                            speech_buffer_index : speech_buffer_index + len(data_int16)
-                        ] = data_int16
-                        
-                        speech_buffer_index += len(data_int16)
-                    
+                    if self._speech_buffer.available > 0:
+                        self._speech_buffer.write(input_window)
+
                     elif not self._speech_buffer_max_reached:
                         # reached self._opts.max_buffered_speech (padding is included)
-                        speech_buffer_max_reached = True
+                        self._speech_buffer_max_reached = True
                         logger.warning(
                             "max_buffered_speech reached, ignoring further data for the current speech input"
                         )
@@ -216,45 +264,53 @@ class VADStream(agents.vad.VADStream):
                         0.0,
                         extra_inference_time + inference_duration - window_duration,
                     )
-                    if inference_duration > SLOW_INFERENCE_THRESHOLD:
+                    slow = inference_duration > SLOW_INFERENCE_THRESHOLD
+                    if slow:
                         logger.warning(
                             "inference is slower than realtime",
                             extra={"delay": extra_inference_time},
                         )
+                    self._metrics.record(
+                        inference_duration,
+                        extra_inference_time,
+                        backlog,
+                        coalesced=coalesce,
+                        slow=slow,
+                    )
 
                     def _reset_write_cursor():
-                        nonlocal speech_buffer_index, speech_buffer_max_reached
                         assert self._speech_buffer is not None
 
-                        if speech_buffer_index <= self._prefix_padding_samples:
+                        if len(self._speech_buffer) <= self._prefix_padding_samples:
                             return
 
-                        padding_data = self._speech_buffer[
-                            speech_buffer_index
-                            - self._prefix_padding_samples : speech_buffer_index
-                        ]
-
                         self._speech_buffer_max_reached = False
-                        self._speech_buffer[: self._prefix_padding_samples] = padding_data
-                        speech_buffer_index = self._prefix_padding_samples
+                        self._speech_buffer.keep_tail(self._prefix_padding_samples)
 
-                    def _copy_speech_buffer() -> rtc.AudioFrame:
-                        # copy the data from speech_buffer
+                    def _speech_frames() -> list[rtc.AudioFrame]:
+                        # one zero-copy frame per chunk of the current speech
                         assert self._speech_buffer is not None
-                        speech_data = self._speech_buffer[:speech_buffer_index].tobytes()
-
-                        return rtc.AudioFrame(
-                            sample_rate=self._input_sample_rate,
-                            num_channels=1,
-                            samples_per_channel=speech_buffer_index,
-                            data=speech_data,
-                        )
+                        return self._speech_buffer.frames(self._input_sample_rate)
 
                     if pub_speaking:
                         pub_speech_duration += window_duration
                     else:
                         pub_silence_duration += window_duration
 
+                    if self._inference_frames == "copy":
+                        window_frames = [
+                            rtc.AudioFrame(
+                                data=input_window.tobytes(),
+                                sample_rate=self._input_sample_rate,
+                                num_channels=1,
+                                samples_per_channel=len(input_window),
+                            )
+                        ]
+                    elif window_history is not None:
+                        window_frames = window_history.append(input_window)
+                    else:
+                        window_frames = []
+
                     self._event_ch.send_nowait(
                         agents.vad.VADEvent(
                             type=agents.vad.VADEventType.INFERENCE_DONE,
@@ -263,14 +319,7 @@ class VADStream(agents.vad.VADStream):
                             speech_duration=pub_speech_duration,
                             probability=p,
                             inference_duration=inference_duration,
-                            frames=[
-                                rtc.AudioFrame(
-                                    data=input_frame.data[:to_copy_int * 2], # FIX: *2 for bytes
-                                    sample_rate=self._input_sample_rate,
-                                    num_channels=1,
-                                    samples_per_channel=to_copy_int,
-                                )
-                            ],
+                            frames=window_frames,
                             speaking=pub_speaking,
                         )
                     )
@@ -291,11 +340,16 @@ class VADStream(agents.vad.VADStream):
                                         samples_index=pub_current_sample,
                                         silence_duration=pub_silence_duration,
                                         speech_duration=pub_speech_duration,
-                                        frames=[_copy_speech_buffer()],
+                                        frames=_speech_frames(),
                                         speaking=True,
                                     )
                                 )
 
+                        if pub_speaking and self._endpointing is not None:
+                            self._endpointing.update(
+                                pub_current_sample, p, pub_speech_duration, 0.0
+                            )
+
                     else:
                         silence_threshold_duration += window_duration
                         speech_threshold_duration = 0.0
@@ -303,11 +357,23 @@ class VADStream(agents.vad.VADStream):
                         if not pub_speaking:
                             _reset_write_cursor()
 
+                        min_silence_duration = self._opts.min_silence_duration
+                        if pub_speaking and self._endpointing is not None:
+                            min_silence_duration = self._endpointing.update(
+                                pub_current_sample,
+                                p,
+                                pub_speech_duration,
+                                silence_threshold_duration,
+                            )
+
                         if (
                             pub_speaking
-                            and silence_threshold_duration
-                            >= self._opts.min_silence_duration
+                            and silence_threshold_duration >= min_silence_duration
                         ):
+                            if self._endpointing is not None:
+                                self._endpointing.end_of_speech(
+                                    pub_current_sample, pub_speech_duration
+                                )
                             pub_speaking = False
                             pub_speech_duration = 0.0
                             pub_silence_duration = silence_threshold_duration
@@ -318,70 +384,334 @@ class VADStream(agents.vad.VADStream):
                                     samples_index=pub_current_sample,
                                     silence_duration=pub_silence_duration,
                                     speech_duration=pub_speech_duration,
-                                    frames=[_copy_speech_buffer()],
+                                    frames=_speech_frames(),
                                     speaking=False,
                                 )
                             )
 
                             _reset_write_cursor()
 
-                    # remove the frames that were used for inference from the input and inference frames
-                    input_frames = []
-                    inference_frames = []
-
-                    # add the remaining data
-                    if len(input_frame.data) - (to_copy_int * 2) > 0: # FIX: *2 bytes
-                        data = input_frame.data[to_copy_int * 2:] # FIX: *2 bytes
-                        input_frames.append(
-                            rtc.AudioFrame(
-                                data=data,
-                                sample_rate=self._input_sample_rate,
-                                num_channels=1,
-                                samples_per_channel=len(data) // 2,
-                            )
-                        )
-
-                    if len(inference_frame.data) - self._model.window_size_samples > 0:
-                        # This one is tricky. inference_frame.data IS bytes.
-                        # self._model.window_size_samples is samples.
-                        # so we need *2 for bytes slicing?
-                        # wait, inference_frame came from resampler (or input). 
-                        # so correct.
-                        # BUT wait, inference_f32_data usage above: 
-                        # inference_frame.data[: self._model.window_size_samples]
-                        # Inference frame data is bytes int16?
-                        # np.divide on bytes acts on BYTES (0-255).
-                        # This is ALSO buggy if not converted to int16 first?
-                        # Actually np.divide might handle raw buffer? 
-                        # No. np.divide( inference_frame.data... )
-                        # If inference_frame.data is bytes, it's dividing byte values.
-                        # It should be viewed as int16.
-                        # Let's check how inference_f32_data is filled.
-                        # np.divide(inference_frame.data[:...], ... out=inference_f32_data)
-                        pass # I'll blindly trust the original code logic for inference parts for now unless obvious
-                        # Wait, checking original code:
-                        # np.divide(inference_frame.data[: self._model.window_size_samples] ...)
-                        # This confirms the plugin code was assuming data[...] accesses samples.
-                        # If data is bytes, this accesses BYTES.
-                        # So it passes the first 512 BYTES (256 samples) and treats them as 512 values (0-255)?
-                        # Yes, this looks BROKEN if AudioFrame.data is bytes.
-                        # I should fix this too.
-                        
-                        data = inference_frame.data[
-                            self._model.window_size_samples * 2 : # FIX: *2
-                        ]
-                        inference_frames.append(
-                            rtc.AudioFrame(
-                                data=data,
-                                sample_rate=self._opts.sample_rate,
-                                num_channels=1,
-                                samples_per_channel=len(data) // 2,
-                            )
-                        )
+                    # drop the samples that were used for inference; whatever is
+                    # left stays in the rings for the next window
+                    inference_ring.consume(self._model.window_size_samples)
+                    input_ring.consume(len(input_window))
 
         except Exception as e:
             logger.exception("VAD _main_task crashed")
             raise e
+
+    def inference_metrics(self) -> dict:
+        "Inference timing and backpressure counters for this stream."
+        return self._metrics.as_dict()
+
+
+# Streams without an inference engine share one pool per process, sized to the
+# cores, instead of a thread each. Concurrent session.run calls are safe.
+import os
+import threading
+
+_pool: ThreadPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_pool_stats = {
+    "workers": 0,
+    "submitted": 0,
+    "in_flight": 0,
+    "max_in_flight": 0,
+    "queue_wait": 0.0,
+    "max_queue_wait": 0.0,
+}
+
+
+def _get_inference_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = os.cpu_count() or 1
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="silero-vad")
+            _pool_stats["workers"] = workers
+        return _pool
+
+
+def _submit_inference(model: onnx_model.OnnxModel, data: np.ndarray):
+    submitted_at = time.perf_counter()
+
+    def _run():
+        # time spent waiting for a free worker shows contention between streams
+        wait = time.perf_counter() - submitted_at
+        with _pool_lock:
+            _pool_stats["queue_wait"] += wait
+            _pool_stats["max_queue_wait"] = max(_pool_stats["max_queue_wait"], wait)
+        try:
+            return model(data)
+        finally:
+            with _pool_lock:
+                _pool_stats["in_flight"] -= 1
+
+    pool = _get_inference_pool()
+    with _pool_lock:
+        _pool_stats["submitted"] += 1
+        _pool_stats["in_flight"] += 1
+        _pool_stats["max_in_flight"] = max(_pool_stats["max_in_flight"], _pool_stats["in_flight"])
+    return pool.submit(_run)
+
+
+class _InferenceMetrics:
+    __slots__ = (
+        "windows",
+        "coalesced",
+        "slow",
+        "inference_time",
+        "max_inference_time",
+        "extra_inference_time",
+        "max_extra_inference_time",
+        "max_backlog",
+    )
+
+    def __init__(self) -> None:
+        self.windows = 0
+        self.coalesced = 0
+        self.slow = 0
+        self.inference_time = 0.0
+        self.max_inference_time = 0.0
+        self.extra_inference_time = 0.0
+        self.max_extra_inference_time = 0.0
+        self.max_backlog = 0.0
+
+    def record(
+        self,
+        inference_duration: float,
+        extra_inference_time: float,
+        backlog: float,
+        *,
+        coalesced: bool,
+        slow: bool,
+    ) -> None:
+        self.windows += 1
+        self.coalesced += coalesced
+        self.slow += slow
+        self.inference_time += inference_duration
+        self.max_inference_time = max(self.max_inference_time, inference_duration)
+        self.extra_inference_time = extra_inference_time
+        self.max_extra_inference_time = max(self.max_extra_inference_time, extra_inference_time)
+        self.max_backlog = max(self.max_backlog, backlog)
+        _totals.windows += 1
+        _totals.coalesced += coalesced
+        _totals.slow += slow
+        _totals.inference_time += inference_duration
+        _totals.max_inference_time = max(_totals.max_inference_time, inference_duration)
+        _totals.max_extra_inference_time = max(_totals.max_extra_inference_time, extra_inference_time)
+        _totals.max_backlog = max(_totals.max_backlog, backlog)
+
+    def as_dict(self) -> dict:
+        metrics = {name: getattr(self, name) for name in self.__slots__}
+        metrics["avg_inference_time"] = (
+            self.inference_time / self.windows if self.windows else 0.0
+        )
+        return metrics
+
+
+_totals = _InferenceMetrics()
+
+
+def inference_metrics() -> dict:
+    "Process-wide VAD inference metrics: pool contention and totals over all streams."
+    with _pool_lock:
+        pool = dict(_pool_stats)
+    pool["avg_queue_wait"] = (
+        pool["queue_wait"] / pool["submitted"] if pool["submitted"] else 0.0
+    )
+    return {"pool": pool, "streams": _totals.as_dict()}
+
+
+class _SpeechBuffer:
+    # Speech of the current utterance, kept in fixed-size chunks allocated as
+    # speech comes in, so memory follows the actual speech length rather than
+    # max_buffered_speech. Chunks handed out by frames() are never written to
+    # again: appends only go past what was exported, and keep_tail() starts on
+    # fresh chunks once frames were taken.
+    def __init__(self, chunk_samples: int, max_samples: int) -> None:
+        self._chunk_samples = chunk_samples
+        self.max_samples = max_samples
+        self._chunks: list[np.ndarray] = []
+        self._size = 0
+        self._exported = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def available(self) -> int:
+        return max(0, self.max_samples - self._size)
+
+    def write(self, samples: np.ndarray) -> int:
+        n = min(len(samples), self.available)
+        written = 0
+        while written < n:
+            index, offset = divmod(self._size, self._chunk_samples)
+            if index == len(self._chunks):
+                self._chunks.append(np.empty(self._chunk_samples, dtype=np.int16))
+            count = min(n - written, self._chunk_samples - offset)
+            self._chunks[index][offset : offset + count] = samples[written : written + count]
+            written += count
+            self._size += count
+        return n
+
+    def keep_tail(self, n: int) -> None:
+        # drop everything but the last n samples (the prefix padding)
+        n = min(n, self._size)
+        start = self._size - n
+        first, offset = divmod(start, self._chunk_samples)
+        if not self._exported and self._size <= self._chunk_samples:
+            # everything is still in the first chunk, move the tail in place
+            chunk = self._chunks[0]
+            chunk[:n] = chunk[offset : offset + n]
+            del self._chunks[1:]
+            self._size = n
+            return
+
+        tail = np.concatenate(
+            [self._chunks[first][offset:]] + self._chunks[first + 1 :]
+        )[:n]
+        if self._exported:
+            # frames still reference the old chunks
+            self._chunks = []
+            self._exported = False
+        else:
+            del self._chunks[1:]
+        self._size = 0
+        self.write(tail)
+
+    def frames(self, sample_rate: int) -> list[rtc.AudioFrame]:
+        if self._size == 0:
+            return [rtc.AudioFrame(b"", sample_rate, 1, 0)]
+        self._exported = True
+        frames = []
+        remaining = self._size
+        for chunk in self._chunks:
+            if remaining <= 0:
+                break
+            count = min(remaining, self._chunk_samples)
+            # a uint8 view over the whole slice lets AudioFrame keep it without copying
+            frames.append(
+                rtc.AudioFrame(
+                    data=memoryview(chunk[:count].view(np.uint8)),
+                    sample_rate=sample_rate,
+                    num_channels=1,
+                    samples_per_channel=count,
+                )
+            )
+            remaining -= count
+        return frames
+
+
+class _WindowHistory:
+    # Append-only int16 blocks that "lazy" windows copy their input samples into
+    # (a memcpy into preallocated space, no allocation per window). A full block
+    # is replaced, never rewritten, since held payloads still slice it.
+    __slots__ = ("_sample_rate", "_block", "_used")
+
+    def __init__(self, sample_rate: int) -> None:
+        self._sample_rate = sample_rate
+        self._block = np.empty(sample_rate, dtype=np.int16)  # 1s per block
+        self._used = 0
+
+    def append(self, samples: np.ndarray) -> _LazyFrames:
+        n = len(samples)
+        if self._used + n > len(self._block):
+            self._block = np.empty(max(self._sample_rate, n), dtype=np.int16)
+            self._used = 0
+        offset = self._used
+        self._block[offset : offset + n] = samples
+        self._used += n
+        return _LazyFrames(self._block, offset, n, self._sample_rate)
+
+
+class _LazyFrames:
+    # Stands in for the [AudioFrame] of an INFERENCE_DONE event: a block, an
+    # offset and a length. The frame, a zero-copy view of the block, is only
+    # built when the payload is read.
+    __slots__ = ("_block", "_offset", "_samples", "_sample_rate", "_frame")
+
+    def __init__(self, block: np.ndarray, offset: int, samples: int, sample_rate: int) -> None:
+        self._block = block
+        self._offset = offset
+        self._samples = samples
+        self._sample_rate = sample_rate
+        self._frame: rtc.AudioFrame | None = None
+
+    def _get(self) -> rtc.AudioFrame:
+        if self._frame is None:
+            data = self._block[self._offset : self._offset + self._samples]
+            self._frame = rtc.AudioFrame(
+                data=memoryview(data.view(np.uint8)),
+                sample_rate=self._sample_rate,
+                num_channels=1,
+                samples_per_channel=self._samples,
+            )
+        return self._frame
+
+    def __len__(self) -> int:
+        return 1
+
+    def __iter__(self):
+        return iter((self._get(),))
+
+    def __getitem__(self, index):
+        return [self._get()][index]
+
+    def __repr__(self) -> str:
+        return repr([self._get()])
+
+
+class _AudioRingBuffer:
+    # Preallocated int16 ring buffer. Every sample is written twice (at i and
+    # i + capacity), so any run of up to `capacity` unread samples can be
+    # returned by peek() as a single contiguous view, even across the wrap point.
+    def __init__(self, capacity: int) -> None:
+        self._capacity = capacity
+        self._buf = np.zeros(capacity * 2, dtype=np.int16)
+        self._read = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def write(self, samples: np.ndarray) -> None:
+        n = len(samples)
+        if self._size + n > self._capacity:
+            self._grow(self._size + n)
+
+        cap = self._capacity
+        start = (self._read + self._size) % cap
+        first = min(n, cap - start)
+        self._buf[start : start + first] = samples[:first]
+        self._buf[start + cap : start + cap + first] = samples[:first]
+        rest = n - first
+        if rest > 0:
+            self._buf[:rest] = samples[first:]
+            self._buf[cap : cap + rest] = samples[first:]
+        self._size += n
+
+    def peek(self, n: int) -> np.ndarray:
+        # view over the next n unread samples, only valid until the next write()
+        assert n <= self._size
+        return self._buf[self._read : self._read + n]
+
+    def consume(self, n: int) -> None:
+        n = min(n, self._size)
+        self._read = (self._read + n) % self._capacity
+        self._size -= n
+
+    def _grow(self, min_capacity: int) -> None:
+        capacity = self._capacity
+        while capacity < min_capacity:
+            capacity *= 2
+        data = self.peek(self._size).copy()
+        self._capacity = capacity
+        self._buf = np.zeros(capacity * 2, dtype=np.int16)
+        self._read = 0
+        self._size = 0
+        self.write(data)
 """
 
 with open(target_file, "r") as f:
@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+
+from pypdf import PdfReader
+
+from content_cache import ContentCache, content_key
+
+logger = logging.getLogger("pdf-extract")
+logger.setLevel(logging.INFO)
+
+# Caps for untrusted uploads: a large or scanned PDF should not stall a session
+MAX_PDF_BYTES = 10 * 1024 * 1024
+MAX_PDF_PAGES = 20
+MAX_TEXT_CHARS = 100_000
+EXTRACT_TIMEOUT = 20.0
+
+# Bump when extraction output changes so cached text is not reused
+EXTRACT_VERSION = "pdf-text-v1"
+
+def _extract_text(path: str, max_pages: int, max_chars: int, deadline: float) -> str:
+    """Runs on a worker thread. Stops at max_pages / max_chars, gives up between pages after the deadline."""
+    reader = PdfReader(path)
+    parts = []
+    total = 0
+    for page in reader.pages[:max_pages]:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"PDF extraction of {path} ran past its deadline")
+        page_text = (page.extract_text() or "") + "\n"
+        parts.append(page_text)
+        total += len(page_text)
+        if total >= max_chars:
+            break
+    return "".join(parts)[:max_chars]
+
+
+def _file_fingerprint(path: str) -> tuple[str, int, int]:
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest(), stat.st_mtime_ns, stat.st_size
+
+
+def pick_resume(paths: list[str]) -> str:
+    """Newest PDF wins; ties are broken by file name so the choice is stable."""
+    return sorted(paths, key=lambda p: (-os.stat(p).st_mtime_ns, os.path.basename(p)))[0]
+
+
+async def extract_pdf_text(
+    path: str,
+    cache: ContentCache,
+    *,
+    timeout: float = EXTRACT_TIMEOUT,
+    max_bytes: int = MAX_PDF_BYTES,
+    max_pages: int = MAX_PDF_PAGES,
+    max_chars: int = MAX_TEXT_CHARS,
+) -> str:
+    """Extracts text from a PDF on a worker thread, caching by file hash and mtime.
+
+    A thread rather than a process pool: a spawned worker re-imports the agent's
+    whole __main__, which cost more than the extraction itself on every fresh
+    job process. The caps bound the work; the thread also stops between pages
+    once `timeout` has passed, since it can't be killed.
+    """
+    file_hash, mtime_ns, size = await asyncio.to_thread(_file_fingerprint, path)
+    if size > max_bytes:
+        raise ValueError(f"{path} is {size} bytes, above the {max_bytes} byte limit")
+
+    key = content_key(EXTRACT_VERSION, file_hash, str(mtime_ns), str(max_pages), str(max_chars))
+    cached = await cache.aget(key)
+    if cached is not None:
+        logger.info(f"Using cached text for {path}")
+        return cached
+
+    deadline = time.monotonic() + timeout
+    try:
+        text = await asyncio.wait_for(
+            asyncio.to_thread(_extract_text, path, max_pages, max_chars, deadline), timeout
+        )
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"PDF extraction of {path} took longer than {timeout}s")
+
+    await cache.aset(key, text)
+    return text
@@ -1,31 +1,101 @@
 
+import asyncio
 import logging
 import os
 import glob
-from pypdf import PdfReader
 from livekit.agents import llm
 
+from artifact_store import get_default_store
+from assessment import AssessmentPipeline
+from completion import complete
+from content_cache import ContentCache, content_key, get_default_cache, normalize_text
+from document_store import (
+    DocumentStore,
+    documents_key,
+    get_default_document_store,
+    jd_id,
+    normalize_jd,
+    resume_id_for_file,
+)
+from pdf_extract import extract_pdf_text, pick_resume
+
 logger = logging.getLogger("resume-processor")
 logger.setLevel(logging.INFO)
 
+# Bump these whenever the matching prompt (or its post-processing) changes,
+# so stale cached outputs are not reused.
+QUESTIONS_PROMPT_VERSION = "questions-v2"
+JOB_TITLE_PROMPT_VERSION = "job-title-v1"
+
+QUESTION_COUNT = 1
+QUESTIONS_MAX_TOKENS = 300
+QUESTIONS_DEADLINE = 20.0
+MAX_JOB_TITLE_CHARS = 50
+JOB_TITLE_DEADLINE = 8.0
+
 class ResumeProcessor:
 
-    def __init__(self, example_dir: str = "example", resume_text: str = "", jd_text: str = ""):
+    def __init__(
+        self,
+        example_dir: str = "example",
+        resume_text: str = "",
+        jd_text: str = "",
+        cache: ContentCache | None = None,
+        documents: DocumentStore | None = None,
+        resume_ref: str | None = None,
+        jd_ref: str | None = None,
+    ):
         self.example_dir = example_dir
         self.resume_text = resume_text
         self.jd_text = jd_text
+        # Document ids (see document_store.py); unknown for inline text
+        self.resume_ref = resume_ref
+        self.jd_ref = jd_ref
+        self.cache = cache or get_default_cache()
+        self.documents = documents or get_default_document_store()
+        self.assessment_stats: dict = {}
+
+    def _questions_cache_key(self) -> str:
+        return content_key(
+            QUESTIONS_PROMPT_VERSION, normalize_text(self.resume_text), normalize_text(self.jd_text)
+        )
+
+    def _job_title_cache_key(self) -> str:
+        return content_key(JOB_TITLE_PROMPT_VERSION, normalize_text(self.jd_text))
 
-    def load_documents(self):
-        """Loads JD and Resume from text overrides or files."""
+    @property
+    def documents_key(self) -> str | None:
+        """Session key shared with the upload UI, None unless both documents are identified."""
+        return documents_key(self.resume_ref, self.jd_ref)
+
+    async def _prepared(self, kind: str, path: str) -> dict | None:
+        """The document the upload UI already prepared for this exact file (see upload_prep.py)."""
+        try:
+            upload = await asyncio.to_thread(self.documents.upload, kind, path)
+        except Exception as e:
+            logger.warning(f"Document store lookup failed: {e}")
+            return None
+        if upload is None or upload["status"] != "ready":
+            return None
+        return upload
+
+    async def load_documents(self):
+        """Loads JD and Resume from text overrides, the uploads prepared by the UI, or files."""
         # Load JD
         if self.jd_text:
             logger.info("Using provided Job Description text.")
         else:
             jd_path = os.path.join(self.example_dir, "example_JD.md")
-            if os.path.exists(jd_path):
+            prepared = await self._prepared("jd", jd_path)
+            if prepared:
+                self.jd_text = prepared["text"]
+                self.jd_ref = prepared["doc_id"]
+                logger.info(f"Using prepared Job Description for {jd_path}")
+            elif os.path.exists(jd_path):
                 try:
                     with open(jd_path, "r") as f:
                         self.jd_text = f.read()
+                    self.jd_ref = jd_id(normalize_jd(self.jd_text))
                     logger.info(f"Loaded Job Description from {jd_path}")
                 except Exception as e:
                     logger.error(f"Failed to read JD: {e}")
@@ -34,22 +104,27 @@ class ResumeProcessor:
                 raise FileNotFoundError(f"Job Description not found at {jd_path}")
 
 
-        # Load Resume (First PDF in directory)
+        # Load Resume (newest PDF in directory)
         if self.resume_text:
              logger.info("Using provided Resume text.")
         else:
             pdf_files = glob.glob(os.path.join(self.example_dir, "*.pdf"))
             if pdf_files:
-                resume_path = pdf_files[0]
-                try:
-                    reader = PdfReader(resume_path)
-                    text = ""
-                    for page in reader.pages:
-                        text += page.extract_text() + "\n"
-                    self.resume_text = text
-                    logger.info(f"Loaded Resume from {resume_path}")
-                except Exception as e:
-                    logger.error(f"Failed to read Resume PDF: {e}")
+                resume_path = pick_resume(pdf_files)
+                if len(pdf_files) > 1:
+                    logger.warning(f"Found {len(pdf_files)} PDFs, using the newest: {resume_path}")
+                prepared = await self._prepared("resume", resume_path)
+                if prepared:
+                    self.resume_text = prepared["text"]
+                    self.resume_ref = prepared["doc_id"]
+                    logger.info(f"Using prepared Resume text for {resume_path}")
+                else:
+                    try:
+                        self.resume_text = await extract_pdf_text(resume_path, self.cache)
+                        self.resume_ref = await asyncio.to_thread(resume_id_for_file, resume_path)
+                        logger.info(f"Loaded Resume from {resume_path}")
+                    except Exception as e:
+                        logger.error(f"Failed to read Resume PDF: {e}")
             else:
                 logger.error("No PDF resume found in example directory.")
                 raise FileNotFoundError("No PDF resume found in example directory.")
@@ -63,6 +138,12 @@ class ResumeProcessor:
                 "How do your skills align with this role?"
             ]
 
+        cache_key = self._questions_cache_key()
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
+            logger.info("Using cached interview questions.")
+            return cached
+
         prompt = f"""
         You are an expert technical interviewer.
         
@@ -73,36 +154,28 @@ class ResumeProcessor:
         {self.resume_text[:2000]}
         
         TASK:
-        Generate 1 deep, expert-level interview question.
+        Generate {QUESTION_COUNT} deep, expert-level interview question(s).
         The questions must:
         1. Connect the candidate's specific past experience (from Resume) to the specific requirements of the Job.
         2. Be professional, challenging, and insightful.
         3. Do NOT include greetings or extraneous text. Just the questions, one per line.
         """
 
-        # We'll use a ChatContext to get the response since LLM is designed for chat
-        # Or we can use llm.chat check if available
-        # In 0.8.0, usually: stream = await llm.chat(chat_ctx=...)
-        
-        chat_ctx = llm.ChatContext()
-        chat_ctx.messages.append(llm.ChatMessage(role="system", content=prompt))
-        
-        # We need to collect the full response
-        stream = llm_client.chat(chat_ctx=chat_ctx)
-        full_text = ""
-        async for chunk in stream:
-            # 0.8.0 chunk behavior check: chunk.choices[0].delta.content?
-            # Or just chunk.content if it's a simplification
-            # Let's assume standard OpenAI plugin behavior: chunk.choices[0].delta.content
-            # Actually, looking at 0.8.0 examples, it might be simpler.
-            # Let's inspect the chunk object if debugging, but for now assume standard API.
-            # Wait, livekit-agents LLM stream yields ChatChunk
-            if chunk.choices:
-                 content = chunk.choices[0].delta.content
-                 if content:
-                     full_text += content
+        # Only QUESTION_COUNT questions are kept, so stop reading once that many lines arrived
+        result = await complete(
+            llm_client,
+            prompt,
+            label="questions",
+            max_lines=QUESTION_COUNT,
+            max_tokens=QUESTIONS_MAX_TOKENS,
+            deadline=QUESTIONS_DEADLINE,
+        )
+        full_text = result.text
 
         questions = [q.strip() for q in full_text.split('\n') if q.strip()]
+        if not result.finished and questions:
+            # cut off by a cap: the last question may stop mid-sentence
+            questions.pop()
         # Filter out numbering if LLM adds it "1. ..."
         clean_questions = []
         for q in questions:
@@ -112,55 +185,45 @@ class ResumeProcessor:
             elif q.startswith('- '):
                 q = q[2:].strip()
             clean_questions.append(q)
-            
-        return clean_questions[:1]
 
-    async def generate_assessment(self, llm_client: llm.LLM, interview_transcript: str):
-        """Generates a markdown assessment of the candidate."""
-        prompt = f"""
-        You are a hiring manager making a decision.
-        
-        JOB DESCRIPTION:
-        {self.jd_text[:1500]}
-        
-        INTERVIEW TRANSCRIPT:
-        {interview_transcript}
-        
-        TASK:
-        Evaluate the candidate. Produce a markdown report named 'Assessment'.
-        
-        Format:
-        # Interview Assessment
-        
-        **Decision**: [Proceed / Hold / Reject]
-        
-        **Reasoning**:
-        [Detailed explanation citing specific evidence from the transcript and matching it to JD requirements]
+        questions = clean_questions[:QUESTION_COUNT]
+        if not result.finished:
+            # not cached, so the next session for these documents asks the model again
+            logger.warning(f"Questions were cut off ({result.stop_reason}), not caching them.")
+        elif questions:
+            await self.cache.aset(cache_key, questions)
+        return questions
+
+    async def generate_assessment(
+        self, llm_client: llm.LLM, interview_transcript: list[dict] | str, job_id: str | None = None
+    ):
+        """Generates a markdown assessment of the candidate (see assessment.AssessmentPipeline).
+
+        With a job_id it is saved in that job's artifact directory, otherwise to example_dir.
         """
-        
-        chat_ctx = llm.ChatContext()
-        chat_ctx.messages.append(llm.ChatMessage(role="system", content=prompt))
-        
-        stream = llm_client.chat(chat_ctx=chat_ctx)
-        full_text = ""
-        async for chunk in stream:
-            if chunk.choices:
-                 content = chunk.choices[0].delta.content
-                 if content:
-                     full_text += content
-                     
-        # Save to file
-        with open(os.path.join(self.example_dir, "assessment.md"), "w") as f:
-            f.write(full_text)
-        
-        return full_text
+        pipeline = AssessmentPipeline(llm_client)
+        full_text = await pipeline.run(self.jd_text, interview_transcript)
+        self.assessment_stats = pipeline.stats
+
+        if job_id:
+            await asyncio.to_thread(get_default_store().put, job_id, "assessment", full_text)
+        else:
+            with open(os.path.join(self.example_dir, "assessment.md"), "w") as f:
+                f.write(full_text)
+
         return full_text
-        
+
     async def extract_job_title(self, llm_client: llm.LLM) -> str:
         """Extracts the job title from the JD."""
         if not self.jd_text:
             return "Candidate"
-            
+
+        cache_key = self._job_title_cache_key()
+        cached = await self.cache.aget(cache_key)
+        if cached is not None:
+            logger.info("Using cached job title.")
+            return cached
+
         prompt = f"""
         Extract the job title from the following Job Description.
         Return ONLY the job title. No extra words.
@@ -169,20 +232,23 @@ class ResumeProcessor:
         {self.jd_text[:1000]}
         """
         
-        chat_ctx = llm.ChatContext()
-        chat_ctx.messages.append(llm.ChatMessage(role="system", content=prompt))
-        
-        stream = llm_client.chat(chat_ctx=chat_ctx)
-        full_text = ""
-        async for chunk in stream:
-            if chunk.choices:
-                 content = chunk.choices[0].delta.content
-                 if content:
-                     full_text += content
-        
-        title = full_text.strip()
+        # A title longer than MAX_JOB_TITLE_CHARS is rejected anyway, so stop reading there
+        result = await complete(
+            llm_client,
+            prompt,
+            label="job_title",
+            max_lines=1,
+            max_chars=MAX_JOB_TITLE_CHARS + 1,
+            deadline=JOB_TITLE_DEADLINE,
+        )
+
+        title = result.text.strip()
+        if not result.finished:
+            logger.warning(f"Job title was cut off ({result.stop_reason}), not caching it.")
+            return "Candidate"
         # Fallback cleanup
-        if len(title) > 50 or "job description" in title.lower():
+        if len(title) > MAX_JOB_TITLE_CHARS or "job description" in title.lower():
              return "Candidate" # Fail safe
-             
+
+        await self.cache.aset(cache_key, title)
         return title
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable
+
+logger = logging.getLogger("session-prep")
+logger.setLevel(logging.INFO)
+
+# Sentinel for steps that have no sensible fallback (e.g. VAD). Failures re-raise.
+NO_FALLBACK = object()
+
+
+class SessionPrep:
+    """Runs the independent pre-greeting steps of a job concurrently.
+
+    Each step gets its own deadline. When a step times out or fails, its fallback
+    value is returned instead so the interview can still start.
+    """
+
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._started_at = time.perf_counter()
+
+    def start(
+        self,
+        name: str,
+        coro: Awaitable[Any],
+        *,
+        timeout: float | None,
+        fallback: Any = NO_FALLBACK,
+    ) -> asyncio.Task:
+        if name in self._tasks:
+            raise ValueError(f"Session prep step '{name}' already started")
+        task = asyncio.create_task(self._run_step(name, coro, timeout, fallback), name=f"prep:{name}")
+        self._tasks[name] = task
+        return task
+
+    async def get(self, name: str) -> Any:
+        """Waits for a step and returns its result (or fallback)."""
+        return await self._tasks[name]
+
+    def done(self, name: str) -> bool:
+        return self._tasks[name].done()
+
+    async def aclose(self):
+        """Cancels any step that is still pending (e.g. the room closed early)."""
+        pending = [t for t in self._tasks.values() if not t.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _run_step(self, name: str, coro: Awaitable[Any], timeout: float | None, fallback: Any):
+        step_start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(coro, timeout)
+        except asyncio.TimeoutError:
+            if fallback is NO_FALLBACK:
+                logger.error(f"Session prep step '{name}' timed out after {timeout}s.")
+                raise
+            logger.warning(f"Session prep step '{name}' timed out after {timeout}s, using fallback.")
+            return fallback
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if fallback is NO_FALLBACK:
+                logger.error(f"Session prep step '{name}' failed: {e}")
+                raise
+            logger.warning(f"Session prep step '{name}' failed ({e}), using fallback.")
+            return fallback
+
+        now = time.perf_counter()
+        logger.info(
+            f"Session prep step '{name}' finished in {now - step_start:.2f}s "
+            f"({now - self._started_at:.2f}s since prep start)"
+        )
+        return result
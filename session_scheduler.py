@@ -0,0 +1,188 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import weakref
+from typing import Awaitable, Callable
+
+from livekit import rtc
+
+logger = logging.getLogger("session-scheduler")
+logger.setLevel(logging.INFO)
+
+
+class Timer:
+    """Handle for a deadline in the TimerHeap."""
+
+    __slots__ = ("deadline", "callback", "cancelled")
+
+    def __init__(self, deadline: float, callback: Callable[[], None]):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerHeap:
+    """All stage deadlines of a worker process in one heap, driven by a single task.
+
+    Cancelled timers are dropped lazily when they reach the top of the heap.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._heap: list[tuple[float, int, Timer]] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self):
+        return sum(1 for _, _, t in self._heap if not t.cancelled)
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> Timer:
+        timer = Timer(self._loop.time() + delay, callback)
+        heapq.heappush(self._heap, (timer.deadline, next(self._seq), timer))
+        if self._heap[0][2] is timer:
+            self._wakeup.set()  # new earliest deadline
+        if self._task is None or self._task.done():
+            self._task = self._loop.create_task(self._drive(), name="timer-heap")
+        return timer
+
+    async def _drive(self):
+        while True:
+            while self._heap and self._heap[0][2].cancelled:
+                heapq.heappop(self._heap)
+
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            timeout = self._heap[0][0] - self._loop.time()
+            if timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, timer = heapq.heappop(self._heap)
+            if timer.cancelled:
+                continue
+            timer.cancelled = True  # fired timers can't fire twice
+            try:
+                timer.callback()
+            except Exception:
+                logger.exception("Timer callback failed")
+
+
+_heaps: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, TimerHeap]" = weakref.WeakKeyDictionary()
+
+
+def get_timer_heap() -> TimerHeap:
+    """The timer heap for the running event loop (one per job process)."""
+    loop = asyncio.get_running_loop()
+    heap = _heaps.get(loop)
+    if heap is None:
+        heap = _heaps[loop] = TimerHeap(loop)
+    return heap
+
+
+class SessionScheduler:
+    """Owns every timer and background task of one interview session.
+
+    Deadlines are named, so setting one again replaces it instead of stacking a
+    second timer. aclose() cancels all of them when the session ends.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self._heap = get_timer_heap()
+        self._deadlines: dict[str, Timer] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._critical_tasks: set[asyncio.Task] = set()
+        self._closed = False
+
+    def set_deadline(self, name: str, delay: float, callback: Callable[[], Awaitable[None]]):
+        """Runs `callback` after `delay` seconds, replacing any deadline with the same name."""
+        self.cancel_deadline(name)
+        if self._closed:
+            return
+
+        def _fire():
+            self._deadlines.pop(name, None)
+            logger.info(f"[{self.session_id}] Deadline '{name}' reached.")
+            self.spawn(callback(), name=f"deadline:{name}")
+
+        self._deadlines[name] = self._heap.call_later(delay, _fire)
+        logger.info(f"[{self.session_id}] Deadline '{name}' set for {delay:.0f}s.")
+
+    def cancel_deadline(self, name: str):
+        timer = self._deadlines.pop(name, None)
+        if timer is not None:
+            timer.cancel()
+            logger.info(f"[{self.session_id}] Deadline '{name}' cancelled.")
+
+    def has_deadline(self, name: str) -> bool:
+        return name in self._deadlines
+
+    def spawn(self, coro: Awaitable, *, name: str | None = None, critical: bool = False) -> asyncio.Task:
+        """Starts a session task. Critical tasks get a grace period in aclose() instead of being cancelled."""
+        task = asyncio.ensure_future(coro)
+        if name:
+            task.set_name(name)
+        tasks = self._critical_tasks if critical else self._tasks
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        task.add_done_callback(self._log_task_error)
+        return task
+
+    def _log_task_error(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"[{self.session_id}] Task {task.get_name()} failed: {task.exception()}")
+
+    async def aclose(self, grace: float = 60.0):
+        """Cancels all deadlines and tasks; critical tasks may finish within `grace` seconds."""
+        self._closed = True
+        for name in list(self._deadlines):
+            self.cancel_deadline(name)
+
+        current = asyncio.current_task()
+        tasks = [t for t in self._tasks if t is not current]
+        for task in tasks:
+            task.cancel()
+
+        critical = [t for t in self._critical_tasks if t is not current]
+        if critical:
+            _, pending = await asyncio.wait(critical, timeout=grace)
+            for task in pending:
+                logger.warning(f"[{self.session_id}] Cancelling {task.get_name()} after {grace}s grace period.")
+                task.cancel()
+            tasks.extend(pending)
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def wait_for_disconnect(room: rtc.Room):
+    """Waits for the room to disconnect, driven by room events instead of polling."""
+    disconnected = asyncio.Event()
+
+    def _on_state_changed(state: rtc.ConnectionState):
+        if state == rtc.ConnectionState.CONN_DISCONNECTED:
+            disconnected.set()
+
+    def _on_disconnected(*_):
+        disconnected.set()
+
+    room.on("connection_state_changed", _on_state_changed)
+    room.on("disconnected", _on_disconnected)
+    try:
+        if room.connection_state == rtc.ConnectionState.CONN_DISCONNECTED:
+            return
+        await disconnected.wait()
+    finally:
+        room.off("connection_state_changed", _on_state_changed)
+        room.off("disconnected", _on_disconnected)
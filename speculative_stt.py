@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import time
+
+from livekit import rtc
+from livekit.agents import utils
+from livekit.agents.stt import STT, SpeechEvent, SpeechEventType, SpeechStream, STTCapabilities
+from livekit.agents.vad import VAD, VADEventType
+
+logger = logging.getLogger("speculative-stt")
+logger.setLevel(logging.INFO)
+
+# Pause after which the segment heard so far is sent to STT ahead of END_OF_SPEECH
+DEFAULT_SPECULATIVE_PAUSE = 0.4
+# ...but not before the pause is this close to ending the turn: about one STT round trip,
+# so the transcript is ready at the end of speech without sending every short pause
+DEFAULT_SPECULATIVE_LEAD = 1.0
+# Speculations per turn; each discarded one re-sends the whole segment so far
+DEFAULT_MAX_SPECULATIONS = 3
+
+
+class SpeculativeSTT(STT):
+    """Streaming adapter for a non-streaming STT that transcribes during the end-of-speech pause.
+
+    Works like livekit's stt.StreamAdapter (VAD segments the audio, each segment is
+    sent to `recognize`), but once a pause is within `speculative_lead` seconds of
+    the silence that ends the turn (and at least `speculative_pause` long), the
+    segment heard so far is already sent to STT. If the VAD then ends the turn,
+    that transcript is used; if speech resumes first, it is thrown away and the
+    turn is transcribed as usual. Within a turn, a pause must outlast every pause
+    the user already resumed after to be sent again, and at most `max_speculations`
+    are sent.
+    Endpointing itself (the VAD's endpoint tracker or min_silence_duration) is
+    unchanged.
+
+    The VAD must attach audio to INFERENCE_DONE events (vad_runtime's
+    inference_frames="lazy" or "copy"); without it this falls back to plain
+    END_OF_SPEECH transcription.
+    """
+
+    def __init__(
+        self,
+        *,
+        stt: STT,
+        vad: VAD,
+        speculative_pause: float = DEFAULT_SPECULATIVE_PAUSE,
+        speculative_lead: float = DEFAULT_SPECULATIVE_LEAD,
+        max_speculations: int = DEFAULT_MAX_SPECULATIONS,
+        activation_threshold: float | None = None,
+    ) -> None:
+        super().__init__(capabilities=STTCapabilities(streaming=True, interim_results=False))
+        self._stt = stt
+        self._vad = vad
+        self._speculative_pause = speculative_pause
+        self._speculative_lead = speculative_lead
+        self._max_speculations = max_speculations
+        # same threshold the VAD uses to tell speech from silence
+        if activation_threshold is None:
+            activation_threshold = vad._opts.activation_threshold
+        self._activation_threshold = activation_threshold
+        # speculative_audio: seconds sent to STT ahead of end of speech; wasted_audio:
+        # the part of it whose transcript was discarded
+        self._stats = {
+            "turns": 0,
+            "speculated": 0,
+            "hits": 0,
+            "discarded": 0,
+            "capped": 0,
+            "saved": 0.0,
+            "speculative_audio": 0.0,
+            "wasted_audio": 0.0,
+        }
+
+    @property
+    def wrapped_stt(self) -> STT:
+        return self._stt
+
+    async def recognize(self, buffer: utils.AudioBuffer, *, language: str | None = None) -> SpeechEvent:
+        return await self._stt.recognize(buffer=buffer, language=language)
+
+    def stream(self, *, language: str | None = None) -> SpeechStream:
+        return SpeculativeSpeechStream(self, language=language)
+
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+
+class SpeculativeSpeechStream(SpeechStream):
+    def __init__(self, adapter: SpeculativeSTT, *, language: str | None = None) -> None:
+        super().__init__()
+        self._adapter = adapter
+        self._language = language
+        self._vad_stream = adapter._vad.stream()
+        self._window = adapter._vad.capabilities.update_interval
+        # the patched VADStream's endpoint tracker, when the VAD has an endpointing policy
+        self._endpoint = getattr(self._vad_stream, "_endpointing", None)
+
+    def _speculation_pause(self, longest_resumed: float) -> float:
+        """The pause at which to start transcribing: one lead before the turn would end,
+        and longer than the pauses the user resumed after in this turn."""
+        if self._endpoint is not None:
+            end = self._endpoint.window
+        else:
+            end = self._adapter._vad._opts.min_silence_duration
+        start = max(self._adapter._speculative_pause, end - self._adapter._speculative_lead)
+        return max(start, longest_resumed + self._window)
+
+    async def _recognize(self, buffer: utils.AudioBuffer) -> SpeechEvent:
+        return await self._adapter._stt.recognize(buffer=buffer, language=self._language)
+
+    async def _speculate(self, segment: rtc.AudioFrame) -> tuple[SpeechEvent, float]:
+        result = await self._recognize(segment)
+        return result, time.perf_counter()
+
+    @utils.log_exceptions(logger=logger)
+    async def _main_task(self) -> None:
+        stats = self._adapter._stats
+
+        async def _forward_input():
+            """forward input to vad"""
+            async for frame in self._input_ch:
+                if isinstance(frame, self._FlushSentinel):
+                    self._vad_stream.flush()
+                    continue
+                self._vad_stream.push_frame(frame)
+            self._vad_stream.end_input()
+
+        async def _segments():
+            speaking = False
+            # audio of the current turn: the frames merged at the last speculation (or
+            # START_OF_SPEECH's), and the windows since, whose frames aren't read until
+            # the next speculation (so "lazy" windows are never built if none comes)
+            segment: list[rtc.AudioFrame] = []
+            windows: list = []
+            pause = 0.0
+            speculation: asyncio.Task | None = None
+            speculated_at = 0.0
+            speculated_audio = 0.0
+            speculations = 0  # in the current turn
+            capped = False
+            longest_resumed = 0.0  # longest pause of the current turn that speech resumed after
+            window_audio = True
+
+            def _discard():
+                nonlocal speculation
+                if speculation is not None:
+                    speculation.cancel()
+                    speculation = None
+                    stats["discarded"] += 1
+                    stats["wasted_audio"] += speculated_audio
+
+            async for event in self._vad_stream:
+                if event.type == VADEventType.START_OF_SPEECH:
+                    speaking = True
+                    segment = list(event.frames)
+                    windows = []
+                    pause = 0.0
+                    speculations = 0
+                    capped = False
+                    longest_resumed = 0.0
+                    _discard()
+                    self._event_ch.send_nowait(SpeechEvent(type=SpeechEventType.START_OF_SPEECH))
+
+                elif event.type == VADEventType.INFERENCE_DONE and speaking:
+                    if not event.frames:
+                        if window_audio:
+                            logger.warning("VAD events carry no audio, speculative transcription disabled.")
+                            window_audio = False
+                        continue
+                    windows.append(event.frames)
+
+                    if event.probability >= self._adapter._activation_threshold:
+                        if pause >= self._adapter._speculative_pause:
+                            logger.info(f"Speech resumed after a {pause:.2f}s pause.")
+                        longest_resumed = max(longest_resumed, pause)
+                        pause = 0.0
+                        _discard()  # the user kept talking, that transcript is stale
+                        continue
+
+                    pause += self._window
+                    if speculation is None and pause >= self._speculation_pause(longest_resumed):
+                        if speculations >= self._adapter._max_speculations:
+                            if not capped:
+                                capped = True
+                                stats["capped"] += 1
+                            continue
+                        logger.info(f"Pause of {pause:.2f}s, transcribing the segment ahead of end of speech.")
+                        merged = utils.merge_frames([*segment, *(f for frames in windows for f in frames)])
+                        segment, windows = [merged], []
+                        speculation = asyncio.create_task(self._speculate(merged))
+                        speculated_at = time.perf_counter()
+                        speculated_audio = merged.samples_per_channel / merged.sample_rate
+                        speculations += 1
+                        stats["speculated"] += 1
+                        stats["speculative_audio"] += speculated_audio
+
+                elif event.type == VADEventType.END_OF_SPEECH:
+                    speaking = False
+                    stats["turns"] += 1
+                    self._event_ch.send_nowait(SpeechEvent(type=SpeechEventType.END_OF_SPEECH))
+
+                    result = None
+                    if speculation is not None:
+                        task, speculation = speculation, None
+                        started_waiting = time.perf_counter()
+                        try:
+                            result, done_at = await task
+                        except Exception as e:
+                            logger.warning(f"Speculative transcription failed, retrying on the full segment: {e}")
+                            stats["wasted_audio"] += speculated_audio
+                        else:
+                            # the part of the STT round trip that ran during the pause
+                            saved = min(done_at, started_waiting) - speculated_at
+                            stats["hits"] += 1
+                            stats["saved"] += saved
+                            logger.info(f"Used speculative transcript, saved {saved:.2f}s of STT latency.")
+
+                    if result is None:
+                        result = await self._recognize(utils.merge_frames(event.frames))
+
+                    segment, windows = [], []
+                    if result.alternatives:
+                        self._event_ch.send_nowait(
+                            SpeechEvent(
+                                type=SpeechEventType.FINAL_TRANSCRIPT,
+                                alternatives=[result.alternatives[0]],
+                            )
+                        )
+
+            _discard()
+
+        tasks = [
+            asyncio.create_task(_forward_input(), name="forward_input"),
+            asyncio.create_task(_segments(), name="speculative_recognize"),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await utils.aio.gracefully_cancel(*tasks)
@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+logger = logging.getLogger("transcript-store")
+logger.setLevel(logging.INFO)
+
+TRANSCRIPT_DIR = os.path.join("example", "transcripts")
+LEGACY_TRANSCRIPT_PATH = os.path.join("example", "transcript.json")
+
+_UNSAFE_CHARS_RE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+@contextmanager
+def _locked(f):
+    """Exclusive advisory lock shared by every process writing to the store."""
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    try:
+        yield f
+    finally:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write(path: str, data: str):
+    """Writes to a temp file in the same directory and renames it into place."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class TranscriptStore:
+    """Append-only transcript storage: one JSONL segment per session.
+
+    Layout under `root`:
+        sessions/<job_id>.jsonl   header line, then one line per message
+        index.jsonl               one line per session, in creation order
+
+    A session's segment path is derived from its job_id, so lookups are O(1) and
+    saving only appends the new messages, regardless of how much history exists.
+    """
+
+    def __init__(self, root: str = TRANSCRIPT_DIR):
+        self.root = root
+        self.sessions_dir = os.path.join(root, "sessions")
+        self.index_path = os.path.join(root, "index.jsonl")
+
+    def segment_path(self, job_id: str) -> str:
+        safe = _UNSAFE_CHARS_RE.sub("_", job_id)
+        if safe != job_id or not safe:
+            # Keep distinct ids distinct after sanitizing
+            safe = f"{safe}-{hashlib.sha1(job_id.encode()).hexdigest()[:8]}"
+        return os.path.join(self.sessions_dir, f"{safe}.jsonl")
+
+    def append(self, job_id: str, messages: list[dict]) -> int:
+        """Appends messages to the session's segment, creating it on first use."""
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        path = self.segment_path(job_id)
+        with open(path, "a") as f, _locked(f):
+            lines = []
+            created = f.seek(0, os.SEEK_END) == 0
+            if created:
+                lines.append(json.dumps({
+                    "type": "session",
+                    "job_id": job_id,
+                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                }))
+            lines.extend(json.dumps({"type": "message", **m}) for m in messages)
+            if not lines:
+                return 0
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        if created:
+            self._append_index({"job_id": job_id, "segment": os.path.basename(path)})
+        return len(messages)
+
+    def _append_index(self, entry: dict):
+        with open(self.index_path, "a") as f, _locked(f):
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load(self, job_id: str) -> dict | None:
+        """Returns one session in the legacy transcript.json entry format."""
+        path = self.segment_path(job_id)
+        if not os.path.exists(path):
+            return None
+        session = {"timestamp": None, "job_id": job_id, "transcript": []}
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from a crashed writer; everything before it is intact
+                    logger.warning(f"Skipping corrupt line in {path}")
+                    continue
+                kind = record.pop("type", None)
+                if kind == "session":
+                    session["timestamp"] = record.get("timestamp")
+                elif kind == "message":
+                    session["transcript"].append(record)
+        return session
+
+    def job_ids(self) -> Iterator[str]:
+        """All stored sessions, oldest first."""
+        if not os.path.exists(self.index_path):
+            return
+        seen = set()
+        with open(self.index_path, "r") as f:
+            for line in f:
+                try:
+                    job_id = json.loads(line)["job_id"]
+                except (json.JSONDecodeError, KeyError):
+                    continue
+                if job_id not in seen:
+                    seen.add(job_id)
+                    yield job_id
+
+    def export_legacy(self, path: str | None = None, legacy_path: str | None = LEGACY_TRANSCRIPT_PATH) -> list[dict]:
+        """Compacts the store into the legacy transcript.json list.
+
+        Sessions that only exist in the old `legacy_path` file are kept. When `path`
+        is given, the result is written there atomically.
+        """
+        sessions = [s for s in (self.load(job_id) for job_id in self.job_ids()) if s is not None]
+        stored_ids = {s["job_id"] for s in sessions}
+
+        legacy_sessions = []
+        if legacy_path and os.path.exists(legacy_path):
+            try:
+                with open(legacy_path, "r") as f:
+                    data = json.load(f)
+                if isinstance(data, list):
+                    legacy_sessions = [s for s in data if s.get("job_id") not in stored_ids]
+                else:
+                    legacy_sessions = [{"legacy": True, "data": data}]
+            except json.JSONDecodeError:
+                logger.warning(f"Ignoring unreadable legacy transcript file {legacy_path}")
+
+        all_transcripts = legacy_sessions + sessions
+        if path:
+            atomic_write(path, json.dumps(all_transcripts, indent=2))
+            logger.info(f"Exported {len(all_transcripts)} transcripts to {path}")
+        return all_transcripts
+
+
+class TranscriptCheckpointer:
+    """Writes a live session's transcript to the store as it grows.
+
+    Call notify() whenever a turn is committed. Bursts of notifications within
+    `debounce` seconds are coalesced into one write, and each write only appends
+    the messages added since the previous flush. Disk I/O runs in a worker thread
+    so it never blocks the event loop driving the audio.
+    """
+
+    def __init__(
+        self,
+        store: TranscriptStore,
+        job_id: str,
+        source: Callable[[int], list[dict]],
+        *,
+        debounce: float = 2.0,
+    ):
+        self.store = store
+        self.job_id = job_id
+        self.debounce = debounce
+        # source(start) returns the transcript messages from index `start` onwards
+        self._source = source
+        self._flushed_count = 0
+        self._dirty = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name=f"transcript-checkpoint:{self.job_id}")
+
+    def notify(self):
+        self._dirty.set()
+
+    async def _run(self):
+        while True:
+            await self._dirty.wait()
+            await asyncio.sleep(self.debounce)
+            self._dirty.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Appends any unsaved messages now. Returns how many were written."""
+        async with self._flush_lock:
+            new_messages = self._source(self._flushed_count)
+            if not new_messages:
+                return 0
+            try:
+                await asyncio.to_thread(self.store.append, self.job_id, new_messages)
+            except Exception as e:
+                logger.error(f"Transcript checkpoint failed for {self.job_id}: {e}")
+                self._dirty.set()  # retry on the next debounce tick
+                return 0
+            self._flushed_count += len(new_messages)
+            logger.info(f"Transcript checkpoint for {self.job_id}: +{len(new_messages)} messages")
+            return len(new_messages)
+
+    async def aclose(self):
+        """Stops the background writer and writes whatever is left."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Export stored transcripts to the legacy transcript.json format.")
+    parser.add_argument("--root", default=TRANSCRIPT_DIR)
+    parser.add_argument("--out", default=LEGACY_TRANSCRIPT_PATH)
+    args = parser.parse_args()
+    TranscriptStore(args.root).export_legacy(args.out, legacy_path=args.out)
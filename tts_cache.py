@@ -0,0 +1,260 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+import wave
+
+from livekit.agents import JobProcess, utils
+from livekit.agents.tts import TTS, ChunkedStream, SynthesizedAudio, TTSCapabilities
+
+from content_cache import CACHE_DIR, content_key, normalize_text
+
+logger = logging.getLogger("tts-cache")
+logger.setLevel(logging.INFO)
+
+# OpenAI's "pcm" response format: 24kHz, 16-bit little-endian, mono
+OPENAI_PCM_SAMPLE_RATE = 24000
+OPENAI_PCM_CHANNELS = 1
+
+DEFAULT_MODEL = "tts-1"
+DEFAULT_VOICE = "alloy"
+DEFAULT_SPEED = 1.0
+
+# Prewarm has to fit in the worker's initialize_process_timeout (10s) together with
+# the VAD load; lines still missing by then are synthesized on first use.
+PREWARM_TIMEOUT = 6.0
+
+# Set TTS_PREWARM=0 to only load clips already on disk at prewarm
+TTS_PREWARM = os.getenv("TTS_PREWARM", "1") != "0"
+
+
+def clip_key(text: str, *, model: str, voice: str, speed: float) -> str:
+    return content_key(normalize_text(text), model, voice, f"{speed:g}")
+
+
+class TTSClipCache:
+    """PCM clips of the agent's fixed lines, in memory and as WAV files on disk.
+
+    Keyed by text, model, voice and speed, so changing the voice doesn't replay
+    stale audio. The files live in CACHE_DIR/tts and are shared by every job
+    process on the host; each process keeps its own copy in memory.
+    """
+
+    def __init__(self, utterances=(), *, directory: str | None = None):
+        self.directory = directory or os.path.join(CACHE_DIR, "tts")
+        self.utterances = {normalize_text(text) for text in utterances}
+        self._clips: dict[str, tuple[bytes, int, int]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "loaded": 0, "synthesized": 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def cacheable(self, text: str) -> bool:
+        return normalize_text(text) in self.utterances
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._clips
+
+    def get(self, key: str) -> tuple[bytes, int, int] | None:
+        with self._lock:
+            clip = self._clips.get(key)
+            if clip is not None:
+                self._stats["hits"] += 1
+        return clip
+
+    def record_miss(self):
+        with self._lock:
+            self._stats["misses"] += 1
+
+    def load(self, key: str) -> bool:
+        """Loads a clip from disk into memory, returns False if it isn't there."""
+        try:
+            with wave.open(self._path(key), "rb") as f:
+                clip = (f.readframes(f.getnframes()), f.getframerate(), f.getnchannels())
+        except FileNotFoundError:
+            return False
+        except (wave.Error, EOFError) as e:
+            logger.warning(f"Ignoring unreadable TTS clip {key[:12]}: {e}")
+            return False
+        with self._lock:
+            self._clips[key] = clip
+            self._stats["loaded"] += 1
+        return True
+
+    def store(self, key: str, pcm: bytes, sample_rate: int, num_channels: int):
+        """Keeps a clip in memory and writes it to disk (atomically, other processes may be reading)."""
+        with self._lock:
+            self._clips[key] = (bytes(pcm), sample_rate, num_channels)
+            self._stats["synthesized"] += 1
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with wave.open(tmp, "wb") as f:
+                f.setnchannels(num_channels)
+                f.setsampwidth(2)
+                f.setframerate(sample_rate)
+                f.writeframes(pcm)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            logger.warning(f"Could not write TTS clip {key[:12]} to disk: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "clips": len(self._clips)}
+
+
+# Process-level copy, so jobs sharing a process (thread executor) share the clips
+_shared_cache: TTSClipCache | None = None
+_shared_lock = threading.Lock()
+
+
+def _synthesize_pcm(client, text: str, *, model: str, voice: str, speed: float) -> bytes:
+    response = client.audio.speech.create(input=text, model=model, voice=voice, speed=speed, response_format="pcm")
+    return response.content
+
+
+def _load_shared_cache(utterances) -> TTSClipCache:
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = TTSClipCache(utterances)
+        return _shared_cache
+
+
+def prewarm(
+    proc: JobProcess,
+    utterances,
+    *,
+    model: str = DEFAULT_MODEL,
+    voice: str = DEFAULT_VOICE,
+    speed: float = DEFAULT_SPEED,
+    timeout: float = PREWARM_TIMEOUT,
+):
+    """Loads the fixed lines from the disk cache and synthesizes the missing ones.
+
+    Synthesis uses a blocking OpenAI client on a few threads (prewarm runs before
+    the job's event loop). Lines that don't finish within `timeout` keep going in
+    the background and are stored when they arrive.
+    """
+    cache = _load_shared_cache(utterances)
+    proc.userdata["tts_cache"] = cache
+
+    start = time.perf_counter()
+    missing = []
+    for text in utterances:
+        key = clip_key(text, model=model, voice=voice, speed=speed)
+        if key not in cache and not cache.load(key):
+            missing.append((key, text))
+
+    if missing and TTS_PREWARM and os.getenv("OPENAI_API_KEY"):
+        import openai
+
+        client = openai.OpenAI(timeout=timeout)
+
+        def _synthesize(key: str, text: str):
+            pcm = _synthesize_pcm(client, text, model=model, voice=voice, speed=speed)
+            cache.store(key, pcm, OPENAI_PCM_SAMPLE_RATE, OPENAI_PCM_CHANNELS)
+
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=len(missing), thread_name_prefix="tts-prewarm")
+        futures = [pool.submit(_synthesize, key, text) for key, text in missing]
+        done, pending = concurrent.futures.wait(futures, timeout=timeout)
+        pool.shutdown(wait=False)
+        for future in done:
+            if future.exception() is not None:
+                logger.warning(f"Could not pre-synthesize a fixed line: {future.exception()}")
+        if pending:
+            logger.warning(f"{len(pending)} fixed line(s) not synthesized after {timeout:.0f}s, finishing in background.")
+
+    logger.info(
+        f"TTS cache ready in {time.perf_counter() - start:.2f}s "
+        f"({len(utterances) - len(missing)} from disk, {len(missing)} missing)"
+    )
+
+
+def tts_cache_for_job(proc: JobProcess | None, utterances) -> TTSClipCache:
+    """Returns the prewarmed clip cache; without prewarm, fixed lines are cached on first use."""
+    cache: TTSClipCache | None = proc.userdata.get("tts_cache") if proc is not None else None
+    if cache is None:
+        logger.warning("No prewarmed TTS cache found for this process, fixed lines are synthesized on first use.")
+        cache = _load_shared_cache(utterances)
+    return cache
+
+
+class CachedTTS(TTS):
+    """Wraps a non-streaming TTS and plays the cache's fixed lines from memory.
+
+    Any other text goes to the wrapped TTS. A fixed line that isn't cached yet is
+    synthesized by the wrapped TTS once and stored for every later session.
+    """
+
+    def __init__(self, tts: TTS, cache: TTSClipCache) -> None:
+        super().__init__(
+            capabilities=TTSCapabilities(streaming=False),
+            sample_rate=tts.sample_rate,
+            num_channels=tts.num_channels,
+        )
+        self._tts = tts
+        self._cache = cache
+        opts = getattr(tts, "_opts", None)
+        self._model = getattr(opts, "model", DEFAULT_MODEL)
+        self._voice = getattr(opts, "voice", DEFAULT_VOICE)
+        self._speed = getattr(opts, "speed", DEFAULT_SPEED)
+
+    @property
+    def cache(self) -> TTSClipCache:
+        return self._cache
+
+    def synthesize(self, text: str) -> ChunkedStream:
+        key = clip_key(text, model=self._model, voice=self._voice, speed=self._speed)
+        clip = self._cache.get(key)
+        if clip is not None:
+            return _ClipStream(*clip)
+        if self._cache.cacheable(text):
+            self._cache.record_miss()
+            return _RecordingStream(self._tts.synthesize(text), self._cache, key, self.sample_rate, self.num_channels)
+        return self._tts.synthesize(text)
+
+    async def aclose(self) -> None:
+        await self._tts.aclose()
+
+
+class _ClipStream(ChunkedStream):
+    def __init__(self, pcm: bytes, sample_rate: int, num_channels: int) -> None:
+        self._clip = (pcm, sample_rate, num_channels)
+        super().__init__()
+
+    async def _main_task(self):
+        pcm, sample_rate, num_channels = self._clip
+        request_id = utils.shortuuid()
+        segment_id = utils.shortuuid()
+        bstream = utils.audio.AudioByteStream(sample_rate=sample_rate, num_channels=num_channels)
+        for frame in [*bstream.write(pcm), *bstream.flush()]:
+            self._event_ch.send_nowait(SynthesizedAudio(request_id=request_id, segment_id=segment_id, frame=frame))
+
+
+class _RecordingStream(ChunkedStream):
+    """Forwards the wrapped stream and stores its audio once it completed."""
+
+    def __init__(self, stream: ChunkedStream, cache: TTSClipCache, key: str, sample_rate: int, num_channels: int):
+        self._stream = stream
+        self._cache = cache
+        self._key = key
+        self._format = (sample_rate, num_channels)
+        super().__init__()
+
+    async def _main_task(self):
+        pcm = bytearray()
+        try:
+            async for audio in self._stream:
+                pcm += audio.frame.data
+                self._event_ch.send_nowait(audio)
+        finally:
+            await self._stream.aclose()
+        # a failed synthesis just closes the channel early, don't keep a truncated clip
+        task = self._stream._task
+        if pcm and not task.cancelled() and task.exception() is None:
+            await asyncio.to_thread(self._cache.store, self._key, bytes(pcm), *self._format)
@@ -0,0 +1,132 @@
+import asyncio
+import glob
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from content_cache import get_default_cache
+from document_store import DocumentStore, get_default_document_store, jd_id, normalize_jd, resume_id
+from pdf_extract import extract_pdf_text
+
+logger = logging.getLogger("upload-prep")
+logger.setLevel(logging.INFO)
+
+JD_FILE_NAME = "example_JD.md"
+PREP_TIMEOUT = 60.0  # per upload; the agent falls back to live generation meanwhile
+
+
+class UploadPreprocessor:
+    """Saves uploads and prepares them in the background, off the interview's critical path.
+
+    For every new resume or JD: the resume text is extracted, the JD normalized,
+    both stored by content hash (document_store.py), and the interview questions
+    and job title are generated into the shared content cache, where the agent's
+    ResumeProcessor finds them at job start. Runs one upload at a time.
+    """
+
+    def __init__(self, example_dir: str = "example", documents: DocumentStore | None = None):
+        self.example_dir = example_dir
+        self.documents = documents or get_default_document_store()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="upload-prep")
+        self._lock = threading.Lock()
+        self._futures: dict[str, Future] = {}
+
+    def save_jd(self, name: str, data: bytes) -> str:
+        """Writes the JD and queues its preparation; a re-upload of the same file is a no-op."""
+        text = normalize_jd(data.decode("utf-8", errors="replace"))
+        doc_id = jd_id(text)
+        path = os.path.join(self.example_dir, JD_FILE_NAME)
+        if self._is_current("jd", doc_id, path):
+            return doc_id
+
+        with open(path, "wb") as f:
+            f.write(data)
+        self.documents.add("jd", doc_id, name=name, text=text)
+        self.documents.set_upload("jd", doc_id, path)
+        logger.info(f"Saved Job Description {name} ({doc_id[:12]})")
+        self._submit(doc_id)
+        return doc_id
+
+    def save_resume(self, name: str, data: bytes) -> str:
+        """Writes the resume (replacing older PDFs) and queues its preparation."""
+        doc_id = resume_id(data)
+        path = os.path.join(self.example_dir, os.path.basename(name))
+        if self._is_current("resume", doc_id, path):
+            return doc_id
+
+        # Clear existing PDFs first to avoid ambiguity
+        for old in glob.glob(os.path.join(self.example_dir, "*.pdf")):
+            os.remove(old)
+        with open(path, "wb") as f:
+            f.write(data)
+        self.documents.add("resume", doc_id, name=name)
+        self.documents.set_upload("resume", doc_id, path)
+        logger.info(f"Saved Resume {name} ({doc_id[:12]})")
+        self._submit(doc_id)
+        return doc_id
+
+    def status(self, doc_id: str) -> str:
+        """pending | ready | failed; "ready" also means questions and title were attempted."""
+        with self._lock:
+            future = self._futures.get(doc_id)
+        if future is not None and not future.done():
+            return "pending"
+        doc = self.documents.get(doc_id)
+        return doc["status"] if doc else "pending"
+
+    def _is_current(self, kind: str, doc_id: str, path: str) -> bool:
+        # Streamlit hands the same upload back on every rerun
+        upload = self.documents.upload(kind, path)
+        return upload is not None and upload["doc_id"] == doc_id
+
+    def _submit(self, doc_id: str):
+        future = self._executor.submit(self._run, doc_id)
+        with self._lock:
+            self._futures[doc_id] = future
+
+    def _run(self, doc_id: str):
+        try:
+            asyncio.run(asyncio.wait_for(self._prepare(), PREP_TIMEOUT))
+        except Exception as e:
+            logger.warning(f"Preparing upload {doc_id[:12]} failed, the agent will do it live: {e}")
+
+    async def _prepare(self):
+        # Always prepares the current pair, whichever of the two was just uploaded
+        resume = self.documents.upload("resume")
+        jd = self.documents.upload("jd")
+
+        resume_text = None
+        if resume is not None:
+            resume_text = resume["text"]
+            if resume_text is None:
+                try:
+                    resume_text = await extract_pdf_text(resume["path"], get_default_cache())
+                except Exception as e:
+                    await asyncio.to_thread(self.documents.set_failed, resume["doc_id"], f"{type(e).__name__}: {e}")
+                    raise
+                await asyncio.to_thread(self.documents.set_text, resume["doc_id"], resume_text)
+                logger.info(f"Extracted resume text ({len(resume_text)} chars)")
+        jd_text = jd["text"] if jd is not None else None
+
+        if not jd_text:
+            return
+        if not os.getenv("OPENAI_API_KEY"):
+            logger.info("OPENAI_API_KEY is not set, questions and job title are generated by the agent.")
+            return
+
+        # Imported here: the UI only needs the LLM stack once there is something to generate
+        from client_registry import get_registry
+        from resume_processor import ResumeProcessor
+
+        rp = ResumeProcessor(self.example_dir, resume_text=resume_text or "", jd_text=jd_text)
+        clients = get_registry()
+        try:
+            llm_client = clients.llm()
+            steps = [rp.extract_job_title(llm_client)]
+            if resume_text:
+                steps.append(rp.generate_questions(llm_client))
+            await asyncio.gather(*steps)
+        finally:
+            await clients.aclose()
+        logger.info("Interview questions and job title prepared")
@@ -0,0 +1,177 @@
+import logging
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+import numpy as np
+import onnxruntime  # type: ignore
+
+logger = logging.getLogger("vad-engine")
+logger.setLevel(logging.INFO)
+
+# Silero v5 window/context sizes per sample rate
+_WINDOW_SIZES = {8000: (256, 32), 16000: (512, 64)}
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT = 0.004  # batching deadline: a window waits at most 4ms for company
+
+
+class StreamInference:
+    """Per-stream handle on the engine. Holds that stream's recurrent state and context."""
+
+    def __init__(self, engine: "BatchedVADEngine"):
+        self._engine = engine
+        self.context = np.zeros(engine.context_size, dtype=np.float32)
+        self.state = np.zeros((2, 128), dtype=np.float32)
+        self._closed = False
+
+    @property
+    def window_size_samples(self) -> int:
+        return self._engine.window_size_samples
+
+    def submit(self, window: np.ndarray) -> Future:
+        """Queues one f32 window; the Future resolves to the speech probability."""
+        if self._closed:
+            raise RuntimeError("StreamInference is closed")
+        return self._engine._submit(self, window)
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._engine._unregister()
+
+
+class BatchedVADEngine:
+    """Runs Silero windows from every active VAD stream in this process as batched ONNX calls.
+
+    A single runner thread takes the first pending window, waits up to `max_wait`
+    for windows from other streams, then runs them in one `session.run` with the
+    streams' states stacked along the batch axis. Results go back through
+    concurrent Futures, so streams on any event loop (thread job executors) can await them.
+    """
+
+    def __init__(
+        self,
+        session: onnxruntime.InferenceSession,
+        *,
+        sample_rate: int = 16000,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait: float = DEFAULT_MAX_WAIT,
+    ):
+        if sample_rate not in _WINDOW_SIZES:
+            raise ValueError("Silero VAD only supports 8KHz and 16KHz sample rates")
+        self._session = session
+        self.sample_rate = sample_rate
+        self.window_size_samples, self.context_size = _WINDOW_SIZES[sample_rate]
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._sample_rate_nd = np.array(sample_rate, dtype=np.int64)
+        self._input = np.zeros((max_batch_size, self.context_size + self.window_size_samples), dtype=np.float32)
+        self._state = np.zeros((2, max_batch_size, 128), dtype=np.float32)
+
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._active_streams = 0
+        self._stats_lock = threading.Lock()
+        self._stats = {"batches": 0, "windows": 0, "max_batch": 0, "run_time": 0.0}
+        self._thread = threading.Thread(target=self._run, name="vad-engine", daemon=True)
+        self._thread.start()
+
+    def register(self) -> StreamInference:
+        with self._stats_lock:
+            self._active_streams += 1
+        return StreamInference(self)
+
+    def _unregister(self):
+        with self._stats_lock:
+            self._active_streams -= 1
+
+    def _submit(self, stream: StreamInference, window: np.ndarray) -> Future:
+        future: Future = Future()
+        # the caller reuses its window buffer, so copy before handing it to the runner thread
+        self._queue.put((stream, np.array(window, dtype=np.float32, copy=True), future))
+        return future
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats["active_streams"] = self._active_streams
+        stats["avg_batch"] = stats["windows"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            # no point waiting once every open stream has a window in the batch
+            while len(batch) < min(self.max_batch_size, self._active_streams):
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # finish this batch, then stop
+                    break
+                batch.append(item)
+
+            # skip windows whose stream stopped waiting (e.g. its task was cancelled)
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                self._infer(batch)
+            except Exception as e:
+                logger.exception("Batched VAD inference failed")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _infer(self, batch: list):
+        n = len(batch)
+        ctx = self.context_size
+        for i, (stream, window, _) in enumerate(batch):
+            self._input[i, :ctx] = stream.context
+            self._input[i, ctx:] = window
+            self._state[:, i, :] = stream.state
+
+        start = time.perf_counter()
+        out, state = self._session.run(
+            None,
+            {"input": self._input[:n], "state": self._state[:, :n, :], "sr": self._sample_rate_nd},
+        )
+        run_time = time.perf_counter() - start
+
+        for i, (stream, _, future) in enumerate(batch):
+            stream.state[:] = state[:, i, :]
+            stream.context[:] = self._input[i, -ctx:]
+            future.set_result(float(out[i, 0]))
+
+        with self._stats_lock:
+            self._stats["batches"] += 1
+            self._stats["windows"] += n
+            self._stats["max_batch"] = max(self._stats["max_batch"], n)
+            self._stats["run_time"] += run_time
+
+    def close(self):
+        self._queue.put(None)
+
+
+_engines: "weakref.WeakKeyDictionary[onnxruntime.InferenceSession, BatchedVADEngine]" = weakref.WeakKeyDictionary()
+_engines_lock = threading.Lock()
+
+
+def get_engine(session: onnxruntime.InferenceSession, **kwargs) -> BatchedVADEngine:
+    """One engine per ONNX session, shared by all jobs in the process."""
+    with _engines_lock:
+        engine = _engines.get(session)
+        if engine is None:
+            engine = _engines[session] = BatchedVADEngine(session, **kwargs)
+        return engine
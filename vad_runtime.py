@@ -0,0 +1,165 @@
+import dataclasses
+import inspect
+import logging
+import os
+import threading
+import time
+
+from livekit.agents import JobProcess
+from livekit.plugins import silero
+from livekit.plugins.silero import onnx_model
+from livekit.plugins.silero import vad as silero_vad
+
+from endpointing import EndpointingPolicy
+from vad_engine import BatchedVADEngine, get_engine
+
+logger = logging.getLogger("vad-runtime")
+logger.setLevel(logging.INFO)
+
+# Interview defaults: VAD=2.0s silence (User Request) and threshold=0.6
+VAD_DEFAULTS = {
+    "min_silence_duration": 2.0,
+    "activation_threshold": 0.6,
+    "max_buffered_speech": 300.0,
+}
+
+# Set VAD_BATCHING=0 to fall back to one inference thread per stream
+VAD_BATCHING = os.getenv("VAD_BATCHING", "1") != "0"
+
+# Keyword options the patched VADStream accepts (patch_vad_class.py); an unpatched one takes none
+_STREAM_OPTIONS = {"inference_engine", "inference_frames", "endpointing"}
+
+def vad_stream_patched() -> bool:
+    """Whether this process runs the patched VADStream.
+
+    Checked on the loaded class, when it is used: patch_vad_class.py rewrites
+    vad.py on disk, which a process that imported it before never sees.
+    """
+    return _STREAM_OPTIONS <= set(inspect.signature(silero_vad.VADStream.__init__).parameters)
+
+
+# Process-level copies, so jobs sharing a process (thread executor) share one session and engine
+_shared_vad: "InterviewVAD | None" = None
+_shared_lock = threading.Lock()
+
+
+class InterviewVAD(silero.VAD):
+    """silero.VAD whose streams send their windows to a shared BatchedVADEngine.
+
+    inference_frames picks what INFERENCE_DONE events carry: "copy" (a frame per
+    window, the default), "lazy" (copied only when read) or "none". With an
+    endpointing policy, each stream ends speech on the policy's silence window
+    instead of min_silence_duration; endpointing_records=False for a VAD whose
+    streams must not add to the policy's pause history (one VAD records per session).
+    """
+
+    def __init__(
+        self,
+        *,
+        session,
+        opts,
+        inference_engine: BatchedVADEngine | None = None,
+        inference_frames: str = "copy",
+        endpointing: EndpointingPolicy | None = None,
+        endpointing_records: bool = True,
+    ):
+        super().__init__(session=session, opts=opts)
+        self._inference_engine = inference_engine
+        self._inference_frames = inference_frames
+        self._endpointing = endpointing
+        self._endpointing_records = endpointing_records
+
+    def stream(self) -> silero_vad.VADStream:
+        options = {
+            "inference_engine": self._inference_engine,
+            "inference_frames": self._inference_frames,
+            "endpointing": (
+                self._endpointing.tracker(records=self._endpointing_records) if self._endpointing is not None else None
+            ),
+        }
+        kwargs = {}
+        if vad_stream_patched():
+            kwargs = options
+        elif self._inference_frames != "copy" or any(options[k] is not None for k in ("inference_engine", "endpointing")):
+            # an unpatched stream would silently drop them, e.g. end turns after
+            # min_silence_duration instead of the endpointing policy's window
+            raise RuntimeError(
+                "Silero VADStream is not patched in this process: run patch_vad_class.py"
+                " before livekit.plugins.silero is imported"
+            )
+        stream = silero_vad.VADStream(
+            self,
+            self._opts,
+            onnx_model.OnnxModel(onnx_session=self._onnx_session, sample_rate=self._opts.sample_rate),
+            **kwargs,
+        )
+        self._streams.add(stream)
+        return stream
+
+
+def _load_shared_vad() -> "InterviewVAD":
+    global _shared_vad
+    with _shared_lock:
+        if _shared_vad is None:
+            start = time.perf_counter()
+            base = silero.VAD.load(**VAD_DEFAULTS)
+            engine = None
+            if VAD_BATCHING:
+                if vad_stream_patched():
+                    engine = get_engine(base._onnx_session, sample_rate=base._opts.sample_rate)
+                else:
+                    logger.warning("Silero VADStream is not patched (run patch_vad_class.py), batching disabled.")
+            _shared_vad = InterviewVAD(session=base._onnx_session, opts=base._opts, inference_engine=engine)
+            logger.info(f"Loaded Silero VAD in {time.perf_counter() - start:.2f}s (batching={engine is not None})")
+        return _shared_vad
+
+
+def prewarm(proc: JobProcess):
+    """WorkerOptions.prewarm_fnc: loads the Silero ONNX session once per worker process."""
+    vad = _load_shared_vad()
+    proc.userdata["vad"] = vad
+    proc.userdata["vad_engine"] = vad._inference_engine
+
+
+def vad_for_job(
+    proc: JobProcess | None = None,
+    *,
+    inference_frames: str = "copy",
+    endpointing: EndpointingPolicy | None = None,
+    endpointing_records: bool = True,
+    **overrides,
+) -> silero.VAD:
+    """Returns a VAD for one job, reusing the prewarmed ONNX session when available.
+
+    Overrides (min_silence_duration, activation_threshold, max_buffered_speech, ...)
+    only apply to the returned instance; the shared session and batching engine are
+    not reloaded.
+    """
+    base: silero.VAD | None = proc.userdata.get("vad") if proc is not None else None
+    if base is None:
+        logger.warning("No prewarmed VAD found for this process, loading it now.")
+        base = _load_shared_vad()
+
+    changed = {k: v for k, v in overrides.items() if getattr(base._opts, k) != v}
+
+    # a fresh (cheap) instance per job, so its streams can be reported per session
+    return InterviewVAD(
+        session=base._onnx_session,
+        opts=dataclasses.replace(base._opts, **changed) if changed else base._opts,
+        inference_engine=getattr(base, "_inference_engine", None),
+        inference_frames=inference_frames,
+        endpointing=endpointing,
+        endpointing_records=endpointing_records,
+    )
+
+
+def log_vad_metrics(vad: silero.VAD, session_id: str):
+    """Logs inference timing/backpressure for the job's VAD streams and the worker."""
+    for stream in list(vad._streams):
+        if hasattr(stream, "inference_metrics"):
+            logger.info(f"[{session_id}] VAD stream metrics: {stream.inference_metrics()}")
+    if hasattr(silero_vad, "inference_metrics"):
+        logger.info(f"VAD inference metrics (process): {silero_vad.inference_metrics()}")
+    engine = getattr(vad, "_inference_engine", None)
+    if engine is not None:
+        logger.info(f"VAD batching engine stats: {engine.stats()}")
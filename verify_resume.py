@@ -10,7 +10,7 @@ logging.basicConfig(level=logging.INFO)
 
 async def main():
     rp = ResumeProcessor(example_dir="example")
-    rp.load_documents()
+    await rp.load_documents()
     
     print(f"JD Length: {len(rp.jd_text)}")
     print(f"Resume Length: {len(rp.resume_text)}")